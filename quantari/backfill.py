@@ -0,0 +1,232 @@
+import csv
+import logging
+import os
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from psycopg_pool import ConnectionPool
+
+from quantari.timescale_client import TimescaleClient, pool_kwargs
+from quantari.timestamps import from_epoch_us, to_epoch_us
+
+DAY_US = 24 * 60 * 60 * 1_000_000
+
+COLUMNS = ["timestamp", "open", "high", "low", "close", "volume", "symbol", "interval"]
+TYPES = ["timestamptz", *["float8"] * 5, "text", "int4"]
+
+
+def parse_timestamp(value: str | int | float | datetime) -> int:
+    # Epoch seconds or ISO 8601, returned as epoch microseconds
+    if isinstance(value, datetime):
+        return to_epoch_us(value)
+
+    try:
+        return int(float(value) * 1_000_000)
+    except ValueError:
+        return to_epoch_us(value)
+
+
+def read_rows(path: str) -> Iterator[dict]:
+    if path.endswith(".parquet"):
+        # pyarrow is only needed to backfill Parquet files
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from batch.to_pylist()
+    else:
+        with open(path, newline="") as file:
+            yield from csv.DictReader(file)
+
+
+def read_candles(
+    path: str, interval: int, symbol: str | None = None
+) -> Iterator[tuple]:
+    # Rows in the COPY column order, with the timestamp in epoch microseconds
+    for row in read_rows(path):
+        row_symbol = row.get("symbol") or symbol
+        if row_symbol is None:
+            raise ValueError(f"{path} has no symbol column and no symbol was given")
+
+        yield (
+            parse_timestamp(row["timestamp"]),
+            float(row["open"]),
+            float(row["high"]),
+            float(row["low"]),
+            float(row["close"]),
+            float(row["volume"]),
+            row_symbol,
+            interval,
+        )
+
+
+def chunk_candles(
+    candles: Iterable[tuple], chunk_us: int
+) -> Iterator[tuple[str, int, list[tuple]]]:
+    # Candles of each symbol and time range, files are expected to be sorted
+    # by timestamp but may interleave the symbols. A chunk is complete once its
+    # symbol reaches the next range.
+    chunks = {}
+    for candle in candles:
+        symbol = candle[6]
+        start = candle[0] // chunk_us * chunk_us
+
+        if symbol in chunks and chunks[symbol][0] != start:
+            yield symbol, *chunks.pop(symbol)
+        chunks.setdefault(symbol, (start, []))[1].append(candle)
+
+    for symbol, (start, rows) in chunks.items():
+        yield symbol, start, rows
+
+
+class Backfill:
+    CREATE_CHUNKS_TABLE = (
+        "CREATE TABLE IF NOT EXISTS backfill_chunks ("
+        "source TEXT, "
+        "symbol TEXT, "
+        "interval INTEGER, "
+        "start TIMESTAMPTZ, "
+        "rows INTEGER, "
+        "PRIMARY KEY (source, symbol, interval, start));"
+    )
+
+    # Rows of a chunk only live until its transaction commits
+    CREATE_STAGING_TABLE = (
+        "CREATE TEMP TABLE IF NOT EXISTS market_ochl_staging "
+        "(LIKE market_ochl) ON COMMIT DELETE ROWS;"
+    )
+
+    COPY_STAGING = (
+        f"COPY market_ochl_staging ({', '.join(COLUMNS)}) FROM STDIN (FORMAT BINARY)"
+    )
+
+    # Candles already stored, live or by a previous backfill, are kept
+    INSERT_FROM_STAGING = (
+        f"INSERT INTO market_ochl ({', '.join(COLUMNS)}) "
+        f"SELECT {', '.join(COLUMNS)} FROM market_ochl_staging "
+        "ON CONFLICT (symbol, interval, timestamp) DO NOTHING;"
+    )
+
+    # A range of an unsorted file can come back in several chunks
+    MARK_CHUNK = (
+        "INSERT INTO backfill_chunks (source, symbol, interval, start, rows) "
+        "VALUES (%s, %s, %s, %s, %s) "
+        "ON CONFLICT (source, symbol, interval, start) DO NOTHING;"
+    )
+
+    def __init__(self, interval: int, workers: int = 4, chunk_days: int = 30):
+        self.interval = interval
+        self.workers = workers
+        self.chunk_us = chunk_days * DAY_US
+        self.db_client = TimescaleClient()
+        self.pool = None
+        self.completed = set()
+        self.rows = 0
+        self.inserted = 0
+
+    def connect(self) -> None:
+        self.db_client.connect()
+        self.db_client.migrate()
+
+        with self.db_client.get_cursor() as cursor:
+            cursor.execute(self.CREATE_CHUNKS_TABLE)
+
+            # Chunks loaded by a previous run are skipped
+            cursor.execute(
+                "SELECT source, symbol, start FROM backfill_chunks "
+                "WHERE interval = %s;",
+                (self.interval,),
+            )
+            self.completed = {
+                (source, symbol, to_epoch_us(start))
+                for source, symbol, start in cursor.fetchall()
+            }
+
+        # One connection per worker, each chunk is loaded on its own connection
+        kwargs = pool_kwargs()
+        kwargs.update(min_size=self.workers, max_size=self.workers)
+        self.pool = ConnectionPool(
+            " ".join(TimescaleClient.DB_SETTINGS),
+            check=ConnectionPool.check_connection,
+            **kwargs,
+        )
+        self.pool.open(wait=True)
+
+    def close(self) -> None:
+        if self.pool:
+            self.pool.close()
+        self.db_client.close_connection()
+
+    def run(self, paths: list[str], symbol: str | None = None) -> None:
+        started = time.monotonic()
+
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="backfill"
+        ) as executor:
+            pending = set()
+            for path in paths:
+                source = os.path.basename(path)
+                candles = read_candles(path, self.interval, symbol)
+
+                for chunk_symbol, start, rows in chunk_candles(candles, self.chunk_us):
+                    if (source, chunk_symbol, start) in self.completed:
+                        logging.debug(f"Skipping {source} {chunk_symbol} at {start}")
+                        continue
+
+                    # Reading stays at most a few chunks ahead of the workers
+                    if len(pending) >= 2 * self.workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        self.report(done, started)
+
+                    pending.add(
+                        executor.submit(
+                            self.copy_chunk, source, chunk_symbol, start, rows
+                        )
+                    )
+
+            self.report(wait(pending).done, started)
+
+        logging.info(
+            f"Backfill done: {self.rows} candles read, {self.inserted} inserted "
+            f"in {time.monotonic() - started:.1f}s"
+        )
+
+    def report(self, done: set, started: float) -> None:
+        for future in done:
+            rows, inserted = future.result()
+            self.rows += rows
+            self.inserted += inserted
+
+        elapsed = time.monotonic() - started
+        logging.info(
+            f"Backfilled {self.rows} candles ({self.inserted} new) "
+            f"at {self.rows / max(elapsed, 1e-9):.0f} candles/s"
+        )
+
+    def copy_chunk(
+        self, source: str, symbol: str, start: int, rows: list[tuple]
+    ) -> tuple[int, int]:
+        # The chunk is stored and marked as completed in a single transaction
+        with (
+            self.pool.connection() as connection,
+            connection.transaction(),
+            connection.cursor() as cursor,
+        ):
+            cursor.execute(self.CREATE_STAGING_TABLE)
+
+            with cursor.copy(self.COPY_STAGING) as copy:
+                copy.set_types(TYPES)
+                for row in rows:
+                    copy.write_row((from_epoch_us(row[0]), *row[1:]))
+
+            cursor.execute(self.INSERT_FROM_STAGING)
+            inserted = cursor.rowcount
+
+            cursor.execute(
+                self.MARK_CHUNK,
+                (source, symbol, self.interval, from_epoch_us(start), len(rows)),
+            )
+
+        logging.debug(f"Loaded {len(rows)} candles of {symbol} from {source}")
+        return len(rows), inserted
@@ -0,0 +1,206 @@
+import copy
+import logging
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from quantari.backfill import read_candles
+from quantari.indicators import Indicator, IndicatorGraph
+from quantari.strategies import Signals
+from quantari.timescale_client import OHLCV
+
+YEAR_US = 365 * 24 * 60 * 60 * 1_000_000
+
+
+def read_candle_file(path: str, symbol: str | None = None) -> dict[str, np.ndarray]:
+    # CSV or Parquet file in the backfill format, candles of `symbol` only when
+    # the file has several
+    rows = [
+        candle
+        for candle in read_candles(path, 0, symbol or "")
+        if symbol is None or candle[6] == symbol
+    ]
+    rows.sort(key=lambda row: row[0])
+
+    columns = {"timestamp": np.array([row[0] for row in rows], dtype=np.int64)}
+    for index, name in enumerate(OHLCV, 1):
+        columns[name] = np.array([row[index] for row in rows], dtype=np.float64)
+
+    return columns
+
+
+def evaluate_rows(strategy, candles: dict, indicators: dict) -> np.ndarray:
+    # Fallback for strategies without evaluate_batch, one message per candle
+    # with the same indicators the Technical Analysis Unit would publish
+    signals = np.zeros(len(candles["timestamp"]), dtype=np.int8)
+    for row in range(len(signals)):
+        message = {name: float(candles[name][row]) for name in OHLCV}
+        # Indicators not ready yet are left out, like the TAU does
+        message["indicators"] = {}
+        for name, values in indicators.items():
+            value = values[row]
+            if not np.isnan(value).any():
+                message["indicators"][name] = value.tolist()
+
+        signals[row] = strategy.evaluate(message)
+
+    return signals
+
+
+@dataclass
+class BacktestResult:
+    timestamps: np.ndarray
+    signals: np.ndarray
+    positions: np.ndarray
+    equity: np.ndarray
+    trades: dict[str, np.ndarray]
+    stats: dict = field(default_factory=dict)
+
+
+class Backtest:
+    def __init__(
+        self,
+        strategy,
+        indicators: list[Indicator],
+        fee: float = 0.0026,
+        slippage: float = 0.0005,
+        initial_cash: float = 10_000.0,
+    ):
+        # Long only: BUY invests all the cash, SELL closes the position. Orders
+        # of a candle signal are filled at the open of the next candle. Fee and
+        # slippage are fractions of the order value, Kraken taker fee by default.
+        self.strategy = strategy
+        self.indicators = indicators
+        self.fee = fee
+        self.slippage = slippage
+        self.initial_cash = initial_cash
+
+    def run(self, candles: dict[str, np.ndarray], start: int = 0) -> BacktestResult:
+        # Candles before the `start` row only warm up the indicators and the
+        # strategy, trading starts on the `start` row without position
+        started = time.monotonic()
+
+        # Indicators and strategy keep state, each run starts from fresh copies
+        graph = IndicatorGraph(copy.deepcopy(self.indicators))
+        strategy = copy.deepcopy(self.strategy)
+
+        indicators = graph.calculate_ohlcv_batch(candles)
+        if hasattr(strategy, "evaluate_batch"):
+            signals = strategy.evaluate_batch(indicators)
+        else:
+            signals = evaluate_rows(strategy, candles, indicators)
+
+        signals = np.asarray(signals, dtype=np.int8)
+        result = self.simulate(
+            {name: column[start:] for name, column in candles.items()}, signals[start:]
+        )
+
+        logging.debug(
+            f"Backtested {strategy} on {len(signals) - start} candles "
+            f"in {time.monotonic() - started:.3f}s: {result.stats}"
+        )
+        return result
+
+    def simulate(self, candles: dict, signals: np.ndarray) -> BacktestResult:
+        timestamps = candles["timestamp"]
+        opens = np.asarray(candles["open"], dtype=np.float64)
+        closes = np.asarray(candles["close"], dtype=np.float64)
+        count = len(closes)
+
+        # Position wanted after each candle, the last signal that was not HOLD
+        last = np.maximum.accumulate(
+            np.where(signals != Signals.HOLD, np.arange(count), -1)
+        )
+        wanted = (last >= 0) & (signals[np.maximum(last, 0)] == Signals.BUY)
+
+        # Position held during each candle, orders are filled at its open
+        positions = np.zeros(count, dtype=bool)
+        positions[1:] = wanted[:-1]
+        held = np.zeros(count, dtype=bool)
+        held[1:] = positions[:-1]
+
+        entries = positions & ~held
+        exits = held & ~positions
+        buy_prices = opens * (1 + self.slippage)
+        sell_prices = opens * (1 - self.slippage)
+
+        # Equity of each candle relative to the previous one, compounded
+        previous_closes = np.empty(count)
+        previous_closes[0] = closes[0] if count else 0
+        previous_closes[1:] = closes[:-1]
+
+        growth = np.ones(count)
+        holding = positions & held
+        growth[holding] = closes[holding] / previous_closes[holding]
+        growth[entries] = (1 - self.fee) * closes[entries] / buy_prices[entries]
+        growth[exits] = (1 - self.fee) * sell_prices[exits] / previous_closes[exits]
+
+        equity = self.initial_cash * np.cumprod(growth)
+        trades = self.trades(timestamps, entries, exits, buy_prices, sell_prices)
+
+        return BacktestResult(
+            timestamps=timestamps,
+            signals=signals,
+            positions=positions,
+            equity=equity,
+            trades=trades,
+            stats=self.stats(timestamps, equity, positions, trades),
+        )
+
+    def trades(
+        self,
+        timestamps: np.ndarray,
+        entries: np.ndarray,
+        exits: np.ndarray,
+        buy_prices: np.ndarray,
+        sell_prices: np.ndarray,
+    ) -> dict[str, np.ndarray]:
+        # Entries and exits alternate, a position still open at the end has
+        # no exit and is left out
+        entry_rows = np.flatnonzero(entries)
+        exit_rows = np.flatnonzero(exits)
+        entry_rows = entry_rows[: len(exit_rows)]
+
+        entry_prices = buy_prices[entry_rows]
+        exit_prices = sell_prices[exit_rows]
+
+        return {
+            "entry_timestamp": timestamps[entry_rows],
+            "exit_timestamp": timestamps[exit_rows],
+            "entry_price": entry_prices,
+            "exit_price": exit_prices,
+            "return": (1 - self.fee) ** 2 * exit_prices / entry_prices - 1,
+        }
+
+    def stats(
+        self,
+        timestamps: np.ndarray,
+        equity: np.ndarray,
+        positions: np.ndarray,
+        trades: dict[str, np.ndarray],
+    ) -> dict:
+        if not len(equity):
+            return {}
+
+        returns = equity / np.concatenate(([self.initial_cash], equity[:-1])) - 1
+        drawdowns = 1 - equity / np.maximum.accumulate(equity)
+
+        # Sharpe ratio annualized from the median spacing of the candles
+        sharpe = 0.0
+        if len(timestamps) > 1 and returns.std():
+            periods = YEAR_US / np.median(np.diff(timestamps))
+            sharpe = float(returns.mean() / returns.std() * np.sqrt(periods))
+
+        wins = trades["return"] > 0
+
+        return {
+            "candles": len(equity),
+            "final_equity": float(equity[-1]),
+            "total_return": float(equity[-1] / self.initial_cash - 1),
+            "max_drawdown": float(drawdowns.max()),
+            "sharpe": sharpe,
+            "exposure": float(positions.mean()),
+            "trades": len(trades["return"]),
+            "win_rate": float(wins.mean()) if len(wins) else 0.0,
+        }
@@ -0,0 +1,139 @@
+import fcntl
+import json
+import logging
+import os
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+from quantari.timescale_client import OHLCV, TimescaleClient
+from quantari.timestamps import from_epoch_us, to_datetime
+
+DTYPES = {"timestamp": np.int64, **{name: np.float64 for name in OHLCV}}
+
+
+class CandleCache:
+    VERSION = 1
+
+    def __init__(self, path: str | None = None):
+        # One directory per symbol and interval, with a file per column
+        self.path = path or os.getenv("CANDLE_CACHE_PATH", "tmp/candle_cache")
+
+    def directory(self, symbol: str, interval: int) -> str:
+        return os.path.join(self.path, symbol.replace("/", "-"), str(interval))
+
+    def load_index(self, symbol: str, interval: int) -> dict:
+        path = os.path.join(self.directory(symbol, interval), "index.json")
+        if not os.path.exists(path):
+            return {"version": self.VERSION, "rows": 0, "start": None, "end": None}
+
+        with open(path) as file:
+            index = json.load(file)
+
+        if index["version"] != self.VERSION:
+            raise ValueError(f"Unsupported candle cache version {index['version']}")
+
+        return index
+
+    def save_index(self, symbol: str, interval: int, index: dict) -> None:
+        # Written next to the target and renamed, readers never see a torn index
+        path = os.path.join(self.directory(symbol, interval), "index.json")
+        with open(f"{path}.tmp", "w") as file:
+            json.dump(index, file)
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(f"{path}.tmp", path)
+
+    @contextmanager
+    def lock(self, symbol: str, interval: int):
+        # Writers of the same symbol and interval are serialized between processes
+        directory = self.directory(symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+
+        with open(os.path.join(directory, "lock"), "w") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def read(
+        self,
+        symbol: str,
+        interval: int,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> dict[str, np.ndarray]:
+        # Read only views on the memory mapped columns, from start (included) to
+        # end (excluded) in epoch microseconds
+        rows = self.load_index(symbol, interval)["rows"]
+        if not rows:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in DTYPES.items()}
+
+        directory = self.directory(symbol, interval)
+        columns = {
+            name: np.memmap(
+                os.path.join(directory, name), dtype=dtype, mode="r", shape=(rows,)
+            )
+            for name, dtype in DTYPES.items()
+        }
+
+        timestamps = columns["timestamp"]
+        first = 0 if start is None else np.searchsorted(timestamps, start, "left")
+        last = rows if end is None else np.searchsorted(timestamps, end, "left")
+
+        return {name: column[first:last] for name, column in columns.items()}
+
+    def append(self, symbol: str, interval: int, columns: dict[str, np.ndarray]) -> int:
+        # Only candles newer than the cached ones are appended, returns how many
+        with self.lock(symbol, interval):
+            index = self.load_index(symbol, interval)
+            directory = self.directory(symbol, interval)
+
+            timestamps = columns["timestamp"]
+            first = 0
+            if index["end"] is not None:
+                first = int(np.searchsorted(timestamps, index["end"], "right"))
+
+            count = len(timestamps) - first
+            if count <= 0:
+                return 0
+
+            for name, dtype in DTYPES.items():
+                path = os.path.join(directory, name)
+                with open(path, "ab") as file:
+                    # Rows of an interrupted append are not in the index
+                    file.truncate(index["rows"] * np.dtype(dtype).itemsize)
+                    file.write(np.ascontiguousarray(columns[name][first:], dtype).data)
+                    file.flush()
+                    os.fsync(file.fileno())
+
+            index["rows"] += count
+            if index["start"] is None:
+                index["start"] = int(timestamps[first])
+            index["end"] = int(timestamps[-1])
+            self.save_index(symbol, interval, index)
+
+        return count
+
+    def update(
+        self,
+        db_client: TimescaleClient,
+        symbol: str,
+        interval: int,
+        start: str | datetime,
+        end: str | datetime,
+    ) -> int:
+        # Fetches only the candles after the cached ones
+        index = self.load_index(symbol, interval)
+        if index["end"] is not None:
+            start = max(to_datetime(start), from_epoch_us(index["end"] + 1))
+
+        count = 0
+        for chunk in db_client.iter_candles(symbol, start, end, interval):
+            count += self.append(symbol, interval, chunk)
+
+        logging.info(f"Cached {count} new candles of {symbol} ({interval})")
+        return count
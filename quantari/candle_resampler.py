@@ -0,0 +1,74 @@
+from quantari.timestamps import from_epoch_us, to_epoch_us
+
+MINUTE_US = 60_000_000
+
+
+class CandleResampler:
+    def __init__(self, base_interval: int, intervals: list[int]):
+        for interval in intervals:
+            if interval <= base_interval or interval % base_interval:
+                raise ValueError(
+                    f"Interval {interval} is not a multiple of {base_interval}"
+                )
+
+        self.base_interval = base_interval
+        self.intervals = sorted(intervals)
+        self.candles = {}
+
+    def update(self, candle: dict) -> list[dict]:
+        # Rolls a closed base candle into every interval. Returns the higher
+        # interval candles that got closed by it.
+        begin = to_epoch_us(candle["interval_begin"])
+        end = begin + self.base_interval * MINUTE_US
+        closed = []
+
+        for interval in self.intervals:
+            length = interval * MINUTE_US
+            bucket = begin - begin % length
+            key = (candle["symbol"], interval)
+            current = self.candles.get(key)
+
+            if current and current["bucket"] > bucket:
+                continue
+
+            # A gap in the base candles leaves the previous one incomplete
+            if current and current["bucket"] < bucket:
+                closed.append(self.to_candle(current))
+                current = None
+
+            if current is None:
+                current = {
+                    "symbol": candle["symbol"],
+                    "interval": interval,
+                    "bucket": bucket,
+                    "open": candle["open"],
+                    "high": candle["high"],
+                    "low": candle["low"],
+                    "close": candle["close"],
+                    "volume": candle["volume"],
+                }
+            else:
+                current["high"] = max(current["high"], candle["high"])
+                current["low"] = min(current["low"], candle["low"])
+                current["close"] = candle["close"]
+                current["volume"] += candle["volume"]
+
+            if end >= bucket + length:
+                closed.append(self.to_candle(current))
+                self.candles.pop(key, None)
+            else:
+                self.candles[key] = current
+
+        return closed
+
+    def to_candle(self, current: dict) -> dict:
+        return {
+            "symbol": current["symbol"],
+            "interval_begin": from_epoch_us(current["bucket"]).isoformat(),
+            "interval": current["interval"],
+            "open": current["open"],
+            "high": current["high"],
+            "low": current["low"],
+            "close": current["close"],
+            "volume": current["volume"],
+        }
@@ -0,0 +1,46 @@
+import logging
+import os
+import pickle
+
+
+class Checkpoint:
+    VERSION = 3
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def save(self, state: dict, offsets: dict[tuple[str, int], int]) -> None:
+        # Written next to the target and renamed, so a crash never leaves a torn file
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "wb") as file:
+            pickle.dump(
+                {"version": self.VERSION, "offsets": offsets, "state": state},
+                file,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temporary_path, self.path)
+        logging.debug(f"Checkpoint saved at offsets {offsets}")
+
+    def load(self) -> tuple[dict, dict[tuple[str, int], int]] | None:
+        if not os.path.exists(self.path):
+            return None
+
+        try:
+            with open(self.path, "rb") as file:
+                snapshot = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError) as e:
+            logging.warning(f"Unable to load checkpoint {self.path}: {e}")
+            return None
+
+        if snapshot.get("version") != self.VERSION:
+            logging.warning(f"Ignoring checkpoint version {snapshot.get('version')}")
+            return None
+
+        return snapshot["state"], snapshot["offsets"]
@@ -6,33 +6,46 @@ from datetime import datetime
 
 from kraken.spot import SpotWSClient
 
+from quantari.candle_resampler import CandleResampler
 from quantari.decorators import catch_and_set_exception
-from quantari.kafka_client import KafkaClient
-from quantari.timescale_client import TimescaleClient
+from quantari.kafka_client import AsyncKafkaClient
+from quantari.timescale_client import AsyncTimescaleClient
+from quantari.write_buffer import WriteBuffer
 
 
 class DataProcessorUnit:
-    def __init__(self):
-        self.db_client = TimescaleClient()
-        self.kafka_producer = KafkaClient()
+    def __init__(self, kafka_producer: AsyncKafkaClient | None = None):
+        self.db_client = AsyncTimescaleClient()
+        self.candle_buffer = WriteBuffer(
+            self.db_client.save_market_data_many, "candles"
+        )
+        self.kafka_producer = kafka_producer or AsyncKafkaClient("quantari-dpu")
         self.kraken_client = None
-        self.last_candle_data = None
+        self.symbols = os.getenv("SYMBOLS", os.getenv("SYMBOL", "")).split(",")
+        self.last_candle_data = {}
+        self.interval = int(os.getenv("INTERVAL_MINS", "1"))
+        self.resampler = CandleResampler(
+            self.interval,
+            [int(i) for i in os.getenv("RESAMPLE_INTERVALS_MINS", "").split(",") if i],
+        )
         self.exception = False
 
     async def close(self) -> None:
         if self.kraken_client:
             await self.kraken_client.close()
-        self.kafka_producer.close_producer()
-        self.db_client.close_connection()
+        await self.candle_buffer.close()
+        self.kafka_producer.close()
+        await self.db_client.close_connection()
 
     @catch_and_set_exception
     async def run(self, shutdown_event) -> None:
         logging.info("Setting up database connection")
-        self.db_client.connect()
-        self.db_client.create_market_table()
+        await self.db_client.connect()
+        await self.db_client.migrate()
+        self.candle_buffer.start()
 
         logging.info("Setting up Kafka producer")
-        self.kafka_producer.create_producer()
+        await self.kafka_producer.create_producer()
 
         logging.info("Setting up Kraken Client")
         self.kraken_client = SpotWSClient(callback=self.on_message)
@@ -44,8 +57,8 @@ class DataProcessorUnit:
         await self.kraken_client.subscribe(
             params={
                 "channel": "ohlc",
-                "symbol": [os.getenv("SYMBOL")],
-                "interval": int(os.getenv("INTERVAL_MINS", 1)),
+                "symbol": self.symbols,
+                "interval": self.interval,
                 "snapshot": False,
             }
         )
@@ -56,23 +69,46 @@ class DataProcessorUnit:
             and not shutdown_event.is_set()
         ):
             await asyncio.sleep(1)
+            # Candles lost by the buffer stop the unit
+            self.candle_buffer.check()
+
+    async def process_market_data(self, data: dict) -> None:
+        await self.publish_candles(self.close_candles(data))
+
+    def close_candles(self, data: dict) -> list[dict]:
+        # We cached the last data of each symbol and only trigger DB/Kafka event on
+        # closure of the candle
+        last_candle_data = self.last_candle_data.get(data["symbol"])
+        self.last_candle_data[data["symbol"]] = data
 
-    def process_market_data(self, data: dict) -> None:
-        # We cached the last data and only trigger DB/Kafka event on closure of the candle
-        if self.last_candle_data and datetime.fromisoformat(
-            self.last_candle_data["interval_begin"]
+        if last_candle_data and datetime.fromisoformat(
+            last_candle_data["interval_begin"]
         ) < datetime.fromisoformat(data["interval_begin"]):
-            self.kafka_producer.publish_market_data(self.last_candle_data)
-            self.db_client.save_market_data(self.last_candle_data)
+            # Higher intervals are built from the closed candle, no extra subscription
+            return [last_candle_data, *self.resampler.update(last_candle_data)]
 
-        self.last_candle_data = data
+        return []
+
+    async def publish_candles(self, candles: list[dict]) -> None:
+        if not candles:
+            return
+
+        # Kafka never waits on the database, candles are written behind in batches
+        await asyncio.gather(
+            *(self.kafka_producer.publish_market_data(data) for data in candles)
+        )
+        await self.candle_buffer.put(candles)
 
     @catch_and_set_exception
     async def on_message(self, message: dict) -> None:
         logging.info(f"Market Data => {message}")
         if message.get("channel") == "ohlc" and message.get("data"):
+            # Candles of all the symbols closed by the message are saved together
+            candles = []
             for data in message["data"]:
-                self.process_market_data(data)
+                candles.extend(self.close_candles(data))
+
+            await self.publish_candles(candles)
 
 
 async def main():
@@ -1,5 +1,23 @@
+from .atr import ATR
+from .bollinger_bands import BollingerBands
+from .donchian_channels import DonchianChannels
 from .ema import EMA
+from .indicator import Indicator
+from .indicator_graph import IndicatorGraph
 from .macd import MACD
+from .multi_symbol_engine import MultiSymbolEngine
+from .rsi import RSI
 from .sma import SMA
 
-__all__ = ["SMA", "EMA", "MACD"]
+__all__ = [
+    "Indicator",
+    "IndicatorGraph",
+    "SMA",
+    "EMA",
+    "MACD",
+    "BollingerBands",
+    "RSI",
+    "ATR",
+    "DonchianChannels",
+    "MultiSymbolEngine",
+]
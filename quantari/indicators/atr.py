@@ -0,0 +1,52 @@
+import numpy as np
+
+from .ema import WilderAverage
+from .indicator import Indicator
+
+
+class ATR(Indicator):
+    def __init__(self, period: int = 14, name: str = None):
+        self.period = period
+        self.average = WilderAverage(period)
+        self.last_close = None
+        self.name = name if name else f"ATR_{self.period}"
+
+    def key(self) -> tuple:
+        return ("ATR", self.period)
+
+    def calculate(self, message: dict) -> float:
+        high = message.get("high")
+        low = message.get("low")
+        close = message.get("close")
+
+        if high is None or low is None or close is None:
+            return None
+
+        true_range = high - low
+        if self.last_close is not None:
+            true_range = max(
+                true_range, abs(high - self.last_close), abs(low - self.last_close)
+            )
+
+        self.last_close = close
+
+        return self.average.update(true_range)
+
+    def update_batch(self, ohlcv, values: dict) -> np.ndarray:
+        high = np.asarray(ohlcv["high"], dtype=np.float64)
+        low = np.asarray(ohlcv["low"], dtype=np.float64)
+        close = np.asarray(ohlcv["close"], dtype=np.float64)
+
+        if not len(close):
+            return np.empty(0, dtype=np.float64)
+
+        last_close = np.nan if self.last_close is None else self.last_close
+        previous = np.concatenate(([last_close], close[:-1]))
+        self.last_close = float(close[-1])
+
+        # fmax ignores the missing previous close of the very first candle
+        true_range = np.fmax(
+            high - low, np.fmax(np.abs(high - previous), np.abs(low - previous))
+        )
+
+        return self.average.update_batch(true_range)
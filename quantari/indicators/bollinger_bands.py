@@ -0,0 +1,48 @@
+import numpy as np
+
+from .indicator import Indicator
+from .rolling_window import RollingVariance, trailing_windows
+
+
+class BollingerBands(Indicator):
+    def __init__(self, period: int = 20, deviations: float = 2, name: str = None):
+        self.period = period
+        self.deviations = deviations
+        self.window = RollingVariance(period)
+        self.name = name if name else f"BB_{period}_{deviations:g}"
+
+    def key(self) -> tuple:
+        return ("BB", self.period, self.deviations)
+
+    def calculate(self, message: dict) -> list[float]:
+        close = message.get("close")
+
+        if close is None:
+            return None
+
+        self.window.update(close)
+
+        if not self.window.is_full():
+            return None
+
+        middle = self.window.mean
+        width = self.deviations * self.window.std()
+
+        return [middle + width, middle, middle - width]
+
+    def calculate_batch(self, closes: np.ndarray) -> np.ndarray:
+        # Returns one [upper, middle, lower] row per close
+        previous = self.window.buffer.to_numpy()
+        windows, first = trailing_windows(previous, closes, self.period)
+
+        middle = windows.mean(axis=1)
+        width = self.deviations * windows.std(axis=1)
+
+        result = np.full((len(closes), 3), np.nan)
+        result[first:] = np.column_stack((middle + width, middle, middle - width))
+
+        self.window.reset()
+        for close in np.concatenate((previous, closes))[-self.period :]:
+            self.window.update(float(close))
+
+        return result
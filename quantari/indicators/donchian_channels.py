@@ -0,0 +1,57 @@
+import numpy as np
+
+from .indicator import Indicator
+from .rolling_window import RollingMax, RollingMin, trailing_windows
+
+
+class DonchianChannels(Indicator):
+    def __init__(self, period: int = 20, name: str = None):
+        self.period = period
+        self.highs = RollingMax(period)
+        self.lows = RollingMin(period)
+        self.name = name if name else f"DC_{self.period}"
+
+    def key(self) -> tuple:
+        return ("DC", self.period)
+
+    def calculate(self, message: dict) -> list[float]:
+        high = message.get("high")
+        low = message.get("low")
+
+        if high is None or low is None:
+            return None
+
+        upper = self.highs.update(high)
+        lower = self.lows.update(low)
+
+        if not self.highs.is_full():
+            return None
+
+        return [upper, (upper + lower) / 2, lower]
+
+    def update_batch(self, ohlcv, values: dict) -> np.ndarray:
+        # Returns one [upper, middle, lower] row per candle
+        highs = np.asarray(ohlcv["high"], dtype=np.float64)
+        lows = np.asarray(ohlcv["low"], dtype=np.float64)
+
+        previous_highs = self.highs.buffer.to_numpy()
+        previous_lows = self.lows.buffer.to_numpy()
+        high_windows, first = trailing_windows(previous_highs, highs, self.period)
+        low_windows, _ = trailing_windows(previous_lows, lows, self.period)
+
+        upper = high_windows.max(axis=1)
+        lower = low_windows.min(axis=1)
+
+        result = np.full((len(highs), 3), np.nan)
+        result[first:] = np.column_stack((upper, (upper + lower) / 2, lower))
+
+        self.highs.reset()
+        self.lows.reset()
+        for high, low in zip(
+            np.concatenate((previous_highs, highs))[-self.period :],
+            np.concatenate((previous_lows, lows))[-self.period :],
+        ):
+            self.highs.update(float(high))
+            self.lows.update(float(low))
+
+        return result
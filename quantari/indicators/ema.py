@@ -1,13 +1,64 @@
-# TODO: Similar to SMA we should keep the window internally in memory and pop older values
-class EMA:
-    def __init__(self, period: int = 50, name: str = None):
+import numpy as np
+
+from .indicator import Indicator
+
+EMA_BLOCK_SIZE = 256
+
+
+def exponential_smoothing(
+    values: np.ndarray, alpha: float, initial: float = 0.0
+) -> np.ndarray:
+    # Vectorized form of `last = value * alpha + last * (1 - alpha)`. Values are
+    # split in blocks, each block is solved with a matrix product and only the
+    # carry between blocks is propagated sequentially.
+    values = np.asarray(values, dtype=np.float64)
+    count = len(values)
+    decay = 1 - alpha
+
+    if count == 0:
+        return np.empty(0, dtype=np.float64)
+
+    if decay == 0:
+        return values * alpha
+
+    block = min(EMA_BLOCK_SIZE, count)
+    blocks_count = -(-count // block)
+
+    padded = np.zeros(blocks_count * block, dtype=np.float64)
+    padded[:count] = values
+    blocks = padded.reshape(blocks_count, block)
+
+    steps = np.arange(block)
+    lags = steps[:, None] - steps[None, :]
+    weights = np.where(lags >= 0, decay ** np.maximum(lags, 0), 0.0) * alpha
+
+    local = blocks @ weights.T
+    carry_decay = decay ** (steps + 1)
+    block_decay = decay**block
+
+    carries = np.empty(blocks_count, dtype=np.float64)
+    last = initial
+    for index in range(blocks_count):
+        carries[index] = last
+        last = local[index, -1] + block_decay * last
+
+    result = local + carries[:, None] * carry_decay[None, :]
+    return result.ravel()[:count]
+
+
+class EMA(Indicator):
+    def __init__(self, period: int = 50, name: str = None, source: str = "close"):
         self.period = period
+        self.source = source
         self.alpha = 2 / (self.period + 1)
         self.last_ema = 0
         self.name = name if name else f"EMA_{self.period}"
 
+    def key(self) -> tuple:
+        return ("EMA", self.source, self.period)
+
     def calculate(self, message: dict) -> float:
-        close = message.get("close")
+        close = message.get(self.source)
 
         if close is None:
             return None
@@ -16,5 +67,52 @@ class EMA:
 
         return self.last_ema
 
-    def __str__(self):
-        return self.name
+    def calculate_batch(self, closes: np.ndarray) -> np.ndarray:
+        result = exponential_smoothing(closes, self.alpha, self.last_ema)
+
+        if len(result):
+            self.last_ema = float(result[-1])
+
+        return result
+
+
+class WilderAverage:
+    __slots__ = ("period", "alpha", "count", "total", "value")
+
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 1 / period
+        self.count = 0
+        self.total = 0.0
+        self.value = None
+
+    def update(self, value: float) -> float | None:
+        # Seeded with the simple average of the first values of the period
+        if self.count < self.period:
+            self.count += 1
+            self.total += value
+
+            if self.count == self.period:
+                self.value = self.total / self.period
+
+            return self.value
+
+        self.value = (value * self.alpha) + (self.value * (1 - self.alpha))
+
+        return self.value
+
+    def update_batch(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        result = np.full(len(values), np.nan)
+
+        seed = min(len(values), self.period - self.count)
+        for index in range(seed):
+            value = self.update(float(values[index]))
+            if value is not None:
+                result[index] = value
+
+        if seed < len(values):
+            result[seed:] = exponential_smoothing(values[seed:], self.alpha, self.value)
+            self.value = float(result[-1])
+
+        return result
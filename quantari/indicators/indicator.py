@@ -0,0 +1,50 @@
+import numpy as np
+
+
+class Indicator:
+    name: str = None
+    source: str = "close"
+
+    # Attributes holding the indicators this one is computed from
+    INPUTS: tuple[str, ...] = ()
+
+    def key(self) -> tuple:
+        # Indicators with the same key compute the same values
+        raise NotImplementedError
+
+    def calculate(self, message: dict):
+        # Subclasses override calculate(), update() or both, each default
+        # calls the other
+        if type(self).update is Indicator.update:
+            raise NotImplementedError(
+                f"{type(self).__name__} must implement calculate() or update()"
+            )
+
+        values = {}
+        for attribute in self.INPUTS:
+            dependency = getattr(self, attribute)
+            values[dependency.key()] = dependency.calculate(message)
+
+        return self.update(message, values)
+
+    def update(self, message: dict, values: dict):
+        # Same as calculate() but with the inputs already computed in `values`
+        return self.calculate(message)
+
+    def calculate_batch(self, closes: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def calculate_ohlcv_batch(self, ohlcv) -> np.ndarray:
+        # OHLCV can be a dict of column arrays or a NumPy structured array
+        values = {}
+        for attribute in self.INPUTS:
+            dependency = getattr(self, attribute)
+            values[dependency.key()] = dependency.calculate_ohlcv_batch(ohlcv)
+
+        return self.update_batch(ohlcv, values)
+
+    def update_batch(self, ohlcv, values: dict) -> np.ndarray:
+        return self.calculate_batch(ohlcv[self.source])
+
+    def __str__(self):
+        return self.name
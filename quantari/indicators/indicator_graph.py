@@ -0,0 +1,60 @@
+import numpy as np
+
+from .indicator import Indicator
+
+
+def format_key(key: tuple) -> str:
+    return f"{key[0]}({', '.join(str(parameter) for parameter in key[1:])})"
+
+
+class IndicatorGraph:
+    def __init__(self, indicators: list[Indicator]):
+        # Nodes are kept in topological order, inputs always before their consumers
+        self.nodes: dict[tuple, Indicator] = {}
+        self.outputs: dict[str, tuple] = {}
+
+        for indicator in indicators:
+            self.outputs[str(indicator)] = self.add(indicator).key()
+
+    def add(self, indicator: Indicator) -> Indicator:
+        # Returns the node computing the indicator, sharing an existing one if any
+        key = indicator.key()
+
+        if key in self.nodes:
+            return self.nodes[key]
+
+        for attribute in indicator.INPUTS:
+            setattr(indicator, attribute, self.add(getattr(indicator, attribute)))
+
+        self.nodes[key] = indicator
+
+        return indicator
+
+    def dependencies(self, key: tuple) -> list[tuple]:
+        node = self.nodes[key]
+        return [getattr(node, attribute).key() for attribute in node.INPUTS]
+
+    def calculate(self, message: dict) -> dict:
+        values = {}
+        for key, node in self.nodes.items():
+            values[key] = node.update(message, values)
+
+        return {name: values[key] for name, key in self.outputs.items()}
+
+    def calculate_ohlcv_batch(self, ohlcv) -> dict[str, np.ndarray]:
+        values = {}
+        for key, node in self.nodes.items():
+            values[key] = node.update_batch(ohlcv, values)
+
+        return {name: values[key] for name, key in self.outputs.items()}
+
+    def describe(self) -> list[str]:
+        lines = []
+        for key in self.nodes:
+            dependencies = ", ".join(format_key(d) for d in self.dependencies(key))
+            lines.append(f"{format_key(key)} <- [{dependencies}]")
+
+        return lines
+
+    def __str__(self):
+        return "\n".join(self.describe())
@@ -1,7 +1,12 @@
+import numpy as np
+
 from .ema import EMA
+from .indicator import Indicator
+
 
+class MACD(Indicator):
+    INPUTS = ("fast_ema", "slow_ema")
 
-class MACD:
     def __init__(
         self, fast: int = 12, slow: int = 26, signal: int = 9, name: str = None
     ):
@@ -15,14 +20,18 @@ class MACD:
 
         self.name = name if name else f"MACD_{fast}_{slow}_{signal}"
 
-    def calculate(self, message: dict) -> list[float]:
-        close = message.get("close")
+    def key(self) -> tuple:
+        return ("MACD", self.fast, self.slow, self.signal)
 
-        if close is None:
+    def calculate(self, message: dict) -> list[float]:
+        if message.get("close") is None:
             return None
 
-        fast_ema_value = self.fast_ema.calculate(message)
-        slow_ema_value = self.slow_ema.calculate(message)
+        return super().calculate(message)
+
+    def update(self, message: dict, values: dict) -> list[float]:
+        fast_ema_value = values.get(self.fast_ema.key())
+        slow_ema_value = values.get(self.slow_ema.key())
 
         if fast_ema_value is None or slow_ema_value is None:
             return None
@@ -32,5 +41,12 @@ class MACD:
 
         return [macd, signal]
 
-    def __str__(self):
-        return self.name
+    def calculate_batch(self, closes: np.ndarray) -> np.ndarray:
+        return self.calculate_ohlcv_batch({"close": closes})
+
+    def update_batch(self, ohlcv, values: dict) -> np.ndarray:
+        # Returns one [macd, signal] row per close, same as calculate()
+        macd = values[self.fast_ema.key()] - values[self.slow_ema.key()]
+        signal = self.signal_ema.calculate_batch(macd)
+
+        return np.column_stack((macd, signal))
@@ -0,0 +1,211 @@
+import numpy as np
+
+from .ema import EMA
+from .indicator import Indicator
+from .indicator_graph import IndicatorGraph
+from .macd import MACD
+from .sma import SMA
+
+
+class VectorEMA:
+    def __init__(self, indicator: EMA):
+        self.source = indicator.source
+        self.alpha = indicator.alpha
+        self.last = np.zeros(0)
+
+    def resize(self, size: int) -> None:
+        self.last = np.concatenate((self.last, np.zeros(size - len(self.last))))
+
+    def reset(self, row: int) -> None:
+        self.last[row] = 0
+
+    def load(self, row: int, indicator: EMA) -> None:
+        self.last[row] = indicator.last_ema
+
+    def update(self, columns: dict, mask: np.ndarray, values: dict) -> np.ndarray:
+        return self.smooth(columns[self.source], mask)
+
+    def smooth(self, value: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        self.last[mask] = (value[mask] * self.alpha) + (
+            self.last[mask] * (1 - self.alpha)
+        )
+
+        result = np.full(len(self.last), np.nan)
+        result[mask] = self.last[mask]
+        return result
+
+
+class VectorSMA:
+    def __init__(self, indicator: SMA):
+        self.source = indicator.source
+        self.period = indicator.period
+        self.windows = np.zeros((0, self.period))
+        self.sums = np.zeros(0)
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def resize(self, size: int) -> None:
+        missing = size - len(self.sums)
+        self.windows = np.concatenate((self.windows, np.zeros((missing, self.period))))
+        self.sums = np.concatenate((self.sums, np.zeros(missing)))
+        self.counts = np.concatenate((self.counts, np.zeros(missing, dtype=np.int64)))
+
+    def reset(self, row: int) -> None:
+        self.windows[row] = 0
+        self.sums[row] = 0
+        self.counts[row] = 0
+
+    def load(self, row: int, indicator: SMA) -> None:
+        self.reset(row)
+
+        values = indicator.window.buffer.to_numpy()
+        self.windows[row, np.arange(len(values)) % self.period] = values
+        self.sums[row] = values.sum()
+        self.counts[row] = len(values)
+
+    def update(self, columns: dict, mask: np.ndarray, values: dict) -> np.ndarray:
+        rows = np.flatnonzero(mask)
+        value = columns[self.source][rows]
+        slots = self.counts[rows] % self.period
+
+        # Slots still empty hold zeros, so the evicted value can always be subtracted
+        self.sums[rows] += value - self.windows[rows, slots]
+        self.windows[rows, slots] = value
+        self.counts[rows] += 1
+
+        # Recompute once per full window to drop floating point drift
+        resync = rows[self.counts[rows] % self.period == 0]
+        self.sums[resync] = self.windows[resync].sum(axis=1)
+
+        result = np.full(len(self.sums), np.nan)
+        full = rows[self.counts[rows] >= self.period]
+        result[full] = self.sums[full] / self.period
+        return result
+
+
+class VectorMACD:
+    def __init__(self, indicator: MACD):
+        self.fast_key = indicator.fast_ema.key()
+        self.slow_key = indicator.slow_ema.key()
+        self.signal_ema = VectorEMA(indicator.signal_ema)
+
+    def resize(self, size: int) -> None:
+        self.signal_ema.resize(size)
+
+    def reset(self, row: int) -> None:
+        self.signal_ema.reset(row)
+
+    def load(self, row: int, indicator: MACD) -> None:
+        self.signal_ema.load(row, indicator.signal_ema)
+
+    def update(self, columns: dict, mask: np.ndarray, values: dict) -> np.ndarray:
+        # Returns one [macd, signal] row per symbol, same as MACD.calculate()
+        macd = values[self.fast_key] - values[self.slow_key]
+        signal = self.signal_ema.smooth(macd, mask)
+
+        return np.column_stack((macd, signal))
+
+
+VECTOR_STATES = {EMA: VectorEMA, SMA: VectorSMA, MACD: VectorMACD}
+
+
+class MultiSymbolEngine:
+    # Indicator state of all the symbols is kept in arrays indexed by symbol, so a
+    # batch of candles updates each indicator with a single vectorized step
+    def __init__(self, indicators: list[Indicator], symbols: list[str] = ()):
+        self.graph = IndicatorGraph(indicators)
+        self.symbols: dict[str, int] = {}
+        self.states = {}
+
+        for key, node in self.graph.nodes.items():
+            if type(node) not in VECTOR_STATES:
+                raise ValueError(f"{node} is not supported by the multi symbol engine")
+            self.states[key] = VECTOR_STATES[type(node)](node)
+
+        self.columns = {node.source for node in self.graph.nodes.values()}
+        self.add_symbols(symbols)
+
+    def add_symbols(self, symbols: list[str]) -> None:
+        size = len(self.symbols)
+
+        for symbol in symbols:
+            if symbol not in self.symbols:
+                self.symbols[symbol] = len(self.symbols)
+
+        if len(self.symbols) > size:
+            for state in self.states.values():
+                state.resize(len(self.symbols))
+
+    def reset_symbol(self, symbol: str) -> None:
+        if symbol in self.symbols:
+            for state in self.states.values():
+                state.reset(self.symbols[symbol])
+
+    def load_symbol(self, symbol: str, graph: IndicatorGraph) -> None:
+        # Copies the state of a per symbol graph with the same indicators
+        self.add_symbols([symbol])
+
+        for key, state in self.states.items():
+            state.load(self.symbols[symbol], graph.nodes[key])
+
+    def update_arrays(self, columns: dict, mask: np.ndarray) -> dict[str, np.ndarray]:
+        # Columns hold one value per symbol, only the rows in `mask` are updated
+        values = {}
+        for key, state in self.states.items():
+            values[key] = state.update(columns, mask, values)
+
+        return {name: values[key] for name, key in self.graph.outputs.items()}
+
+    def update(self, candles: list[dict]) -> list[dict]:
+        # Returns the indicator values of each candle, in the same order
+        self.add_symbols([candle["symbol"] for candle in candles])
+
+        results = [None] * len(candles)
+        pending = list(enumerate(candles))
+
+        # A symbol with several candles in the batch is updated in consecutive steps
+        while pending:
+            step, seen, pending_next = [], set(), []
+            for index, candle in pending:
+                if candle["symbol"] in seen:
+                    pending_next.append((index, candle))
+                else:
+                    seen.add(candle["symbol"])
+                    step.append((index, candle))
+
+            self.update_step(step, results)
+            pending = pending_next
+
+        return results
+
+    def update_step(self, step: list[tuple[int, dict]], results: list) -> None:
+        # Candles missing a column do not update any indicator, like calculate()
+        for index, candle in step:
+            if any(candle.get(column) is None for column in self.columns):
+                results[index] = {}
+
+        step = [(index, candle) for index, candle in step if results[index] is None]
+        if not step:
+            return
+
+        rows = np.array([self.symbols[candle["symbol"]] for _, candle in step])
+        mask = np.zeros(len(self.symbols), dtype=bool)
+        mask[rows] = True
+
+        columns = {}
+        for column in self.columns:
+            columns[column] = np.full(len(self.symbols), np.nan)
+            columns[column][rows] = [candle[column] for _, candle in step]
+
+        values = self.update_arrays(columns, mask)
+
+        indexes = [index for index, _ in step]
+        for index in indexes:
+            results[index] = {}
+
+        # Values still warming up are NaN and left out, like a None from calculate()
+        for name, value in values.items():
+            selected = value[rows]
+            valid = ~np.isnan(selected.reshape(len(rows), -1)).any(axis=1)
+            for index, is_valid, result in zip(indexes, valid, selected.tolist()):
+                if is_valid:
+                    results[index][name] = result
@@ -0,0 +1,200 @@
+import math
+from array import array
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class RingBuffer:
+    __slots__ = ("capacity", "values", "head", "size")
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError(f"Invalid capacity: {capacity}")
+
+        self.capacity = capacity
+        self.values = array("d", bytes(8 * capacity))
+        self.head = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def is_full(self) -> bool:
+        return self.size == self.capacity
+
+    def append(self, value: float) -> float | None:
+        # Returns the value that was evicted to make room, if any
+        evicted = self.values[self.head] if self.size == self.capacity else None
+
+        self.values[self.head] = value
+        self.head += 1
+        if self.head == self.capacity:
+            self.head = 0
+
+        if evicted is None:
+            self.size += 1
+
+        return evicted
+
+    def clear(self) -> None:
+        self.head = 0
+        self.size = 0
+
+    def to_numpy(self) -> np.ndarray:
+        # Copy of the values from the oldest to the newest
+        values = np.frombuffer(self.values, dtype=np.float64)
+
+        if not self.is_full():
+            return values[: self.size].copy()
+
+        return np.concatenate((values[self.head :], values[: self.head]))
+
+
+class RollingSum:
+    __slots__ = ("buffer", "total", "evictions")
+
+    def __init__(self, period: int):
+        self.buffer = RingBuffer(period)
+        self.total = 0.0
+        self.evictions = 0
+
+    def update(self, value: float) -> float:
+        evicted = self.buffer.append(value)
+        self.total += value
+
+        if evicted is not None:
+            self.total -= evicted
+            self.evictions += 1
+
+            # Recompute once per full window to drop floating point drift,
+            # which keeps the amortized cost constant
+            if self.evictions == self.buffer.capacity:
+                self.total = math.fsum(self.buffer.values)
+                self.evictions = 0
+
+        return self.total
+
+    def is_full(self) -> bool:
+        return self.buffer.is_full()
+
+    def reset(self) -> None:
+        self.buffer.clear()
+        self.total = 0.0
+        self.evictions = 0
+
+
+class RollingVariance:
+    __slots__ = ("buffer", "mean", "m2")
+
+    def __init__(self, period: int):
+        self.buffer = RingBuffer(period)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, value: float) -> float:
+        # Welford's algorithm, replacing the evicted value once the window is full
+        evicted = self.buffer.append(value)
+
+        if evicted is None:
+            delta = value - self.mean
+            self.mean += delta / self.buffer.size
+            self.m2 += delta * (value - self.mean)
+        else:
+            delta = value - evicted
+            last_mean = self.mean
+            self.mean += delta / self.buffer.size
+            self.m2 += delta * (value - self.mean + evicted - last_mean)
+
+        return self.variance()
+
+    def variance(self) -> float:
+        if not self.buffer.size:
+            return 0.0
+
+        return max(self.m2, 0.0) / self.buffer.size
+
+    def std(self) -> float:
+        return math.sqrt(self.variance())
+
+    def is_full(self) -> bool:
+        return self.buffer.is_full()
+
+    def reset(self) -> None:
+        self.buffer.clear()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+
+class RollingMax:
+    __slots__ = ("buffer", "indexes", "count")
+
+    def __init__(self, period: int):
+        self.buffer = RingBuffer(period)
+        self.indexes = deque()
+        self.count = 0
+
+    def update(self, value: float) -> float:
+        # Monotonic deque of value indexes, the front always holds the maximum
+        values = self.buffer.values
+        period = self.buffer.capacity
+        indexes = self.indexes
+
+        if indexes and indexes[0] <= self.count - period:
+            indexes.popleft()
+
+        while indexes and values[indexes[-1] % period] <= value:
+            indexes.pop()
+
+        self.buffer.append(value)
+        indexes.append(self.count)
+        self.count += 1
+
+        return values[indexes[0] % period]
+
+    def is_full(self) -> bool:
+        return self.buffer.is_full()
+
+    def reset(self) -> None:
+        self.buffer.clear()
+        self.indexes.clear()
+        self.count = 0
+
+
+class RollingMin(RollingMax):
+    __slots__ = ()
+
+    def update(self, value: float) -> float:
+        # Monotonic deque of value indexes, the front always holds the minimum
+        values = self.buffer.values
+        period = self.buffer.capacity
+        indexes = self.indexes
+
+        if indexes and indexes[0] <= self.count - period:
+            indexes.popleft()
+
+        while indexes and values[indexes[-1] % period] >= value:
+            indexes.pop()
+
+        self.buffer.append(value)
+        indexes.append(self.count)
+        self.count += 1
+
+        return values[indexes[0] % period]
+
+
+def trailing_windows(
+    previous: np.ndarray, values: np.ndarray, period: int
+) -> tuple[np.ndarray, int]:
+    # Full windows ending on each of `values`, given the `previous` values already
+    # in the window. Also returns the index of the first value with a full window.
+    history = np.concatenate((previous, np.asarray(values, dtype=np.float64)))
+
+    if len(history) < period:
+        return np.empty((0, period)), len(values)
+
+    first = max(period - 1, len(previous))
+    windows = sliding_window_view(history, period)[first - period + 1 :]
+
+    return windows, first - len(previous)
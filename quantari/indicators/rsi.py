@@ -0,0 +1,63 @@
+import numpy as np
+
+from .ema import WilderAverage
+from .indicator import Indicator
+
+
+class RSI(Indicator):
+    def __init__(self, period: int = 14, name: str = None):
+        self.period = period
+        self.gains = WilderAverage(period)
+        self.losses = WilderAverage(period)
+        self.last_close = None
+        self.name = name if name else f"RSI_{self.period}"
+
+    def key(self) -> tuple:
+        return ("RSI", self.period)
+
+    def calculate(self, message: dict) -> float:
+        close = message.get("close")
+
+        if close is None:
+            return None
+
+        if self.last_close is None:
+            self.last_close = close
+            return None
+
+        change = close - self.last_close
+        self.last_close = close
+
+        gain = self.gains.update(max(change, 0.0))
+        loss = self.losses.update(max(-change, 0.0))
+
+        if gain is None:
+            return None
+
+        if loss == 0:
+            return 100.0
+
+        return 100 - 100 / (1 + gain / loss)
+
+    def calculate_batch(self, closes: np.ndarray) -> np.ndarray:
+        closes = np.asarray(closes, dtype=np.float64)
+        result = np.full(len(closes), np.nan)
+
+        if not len(closes):
+            return result
+
+        # The very first close has no previous one to compare with
+        start = 1 if self.last_close is None else 0
+        previous = closes[0] if self.last_close is None else self.last_close
+        changes = np.diff(closes, prepend=previous)[start:]
+        self.last_close = float(closes[-1])
+
+        gains = self.gains.update_batch(np.maximum(changes, 0.0))
+        losses = self.losses.update_batch(np.maximum(-changes, 0.0))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100 - 100 / (1 + gains / losses)
+
+        result[start:] = np.where(losses == 0, 100.0, rsi)
+
+        return result
@@ -1,26 +1,42 @@
-class SMA:
-    def __init__(self, period: int = 50, name: str = None):
+import numpy as np
+
+from .indicator import Indicator
+from .rolling_window import RollingSum, trailing_windows
+
+
+class SMA(Indicator):
+    def __init__(self, period: int = 50, name: str = None, source: str = "close"):
         self.period = period
-        self.data = []
+        self.source = source
+        self.window = RollingSum(period)
         self.name = name if name else f"SMA_{self.period}"
-        self.sum = 0
+
+    def key(self) -> tuple:
+        return ("SMA", self.source, self.period)
 
     def calculate(self, message: dict) -> float:
-        close = message.get("close")
+        close = message.get(self.source)
 
         if close is None:
             return None
 
-        self.data.append(close)
-        self.sum += close
+        total = self.window.update(close)
 
-        if len(self.data) > self.period:
-            self.sum -= self.data.pop(0)
-
-        if len(self.data) < self.period:
+        if not self.window.is_full():
             return None
 
-        return self.sum / self.period
+        return total / self.period
+
+    def calculate_batch(self, closes: np.ndarray) -> np.ndarray:
+        # Windows that are not full yet are NaN, where calculate() returns None
+        previous = self.window.buffer.to_numpy()
+        windows, first = trailing_windows(previous, closes, self.period)
+
+        result = np.full(len(closes), np.nan)
+        result[first:] = windows.sum(axis=1) / self.period
+
+        self.window.reset()
+        for close in np.concatenate((previous, closes))[-self.period :]:
+            self.window.update(float(close))
 
-    def __str__(self):
-        return self.name
+        return result
@@ -1,14 +1,99 @@
-import json
+import asyncio
 import logging
 import os
+from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
 
-from kafka import KafkaConsumer, KafkaProducer
+from kafka import ConsumerRebalanceListener, KafkaConsumer, KafkaProducer
+from kafka.partitioner import murmur2
+
+from quantari.serialization import CODECS, decode
+
+DEFAULT_ID = "quantari-dpu-1"
+
+
+def market_data_value(market_data: dict) -> dict:
+    # Messages use timestamp instead of interval_begin
+    return {
+        "symbol": market_data["symbol"],
+        "timestamp": market_data["interval_begin"],
+        "interval": market_data["interval"],
+        "open": market_data["open"],
+        "high": market_data["high"],
+        "low": market_data["low"],
+        "close": market_data["close"],
+        "volume": market_data["volume"],
+    }
+
+
+def market_indicators_value(market_indicators: dict) -> dict:
+    return {
+        "symbol": market_indicators["symbol"],
+        "timestamp": market_indicators["timestamp"],
+        "interval": market_indicators["interval"],
+        "open": market_indicators["open"],
+        "high": market_indicators["high"],
+        "low": market_indicators["low"],
+        "close": market_indicators["close"],
+        "volume": market_indicators["volume"],
+        "indicators": market_indicators["indicators"],
+    }
+
+
+class RebalanceListener(ConsumerRebalanceListener):
+    def __init__(
+        self, consumer: KafkaConsumer, offsets: dict[tuple[str, int], int] | None = None
+    ):
+        self.consumer = consumer
+        self.offsets = dict(offsets or {})
+        self.revoked = set()
+
+    def on_partitions_revoked(self, revoked) -> None:
+        # Units drop the state built from these partitions
+        for topic_partition in revoked:
+            key = (topic_partition.topic, topic_partition.partition)
+            logging.info(f"Partition {key} revoked")
+            self.revoked.add(key)
+
+    def on_partitions_assigned(self, assigned) -> None:
+        for topic_partition in assigned:
+            key = (topic_partition.topic, topic_partition.partition)
+            logging.info(f"Partition {key} assigned")
+
+            # Partitions revoked and assigned back in the same rebalance were not
+            # consumed by anybody else, their state is still valid
+            self.revoked.discard(key)
+
+            # Offsets are only applied the first time a partition is assigned
+            if key in self.offsets:
+                offset = self.offsets.pop(key)
+                logging.info(f"Seeking {key} to offset {offset}")
+                self.consumer.seek(topic_partition, offset)
+
+
+def unit_name(client_id: str) -> str:
+    # quantari-tau and quantari-dpu-1 belong to the TAU and DPU units
+    parts = client_id.split("-")
+    return (parts[1] if len(parts) > 1 else parts[0]).upper()
 
 
 class KafkaClient:
-    def __init__(self) -> None:
+    def __init__(self, client_id: str = DEFAULT_ID, group_id: str = DEFAULT_ID) -> None:
         self.producer = None
         self.consumer = None
+        # Instances of the same unit share the group to split the partitions,
+        # each unit has its own overrides, e.g. KAFKA_GROUP_ID_TAU
+        unit = unit_name(client_id)
+        self.client_id = os.getenv(f"KAFKA_CLIENT_ID_{unit}", client_id)
+        self.group_id = os.getenv(f"KAFKA_GROUP_ID_{unit}", group_id)
+        self.listener = None
+        # Sync mode waits for the broker on every message, batched mode
+        # only on flush
+        self.sync = os.getenv("KAFKA_PRODUCER_MODE", "batched") == "sync"
+        self.delivered = 0
+        self.failed = 0
+        # Consumers decode every codec, the producer one only changes the wire
+        self.codec = CODECS[os.getenv("KAFKA_CODEC", "binary")]()
 
     def __del__(self) -> None:
         self.close()
@@ -20,8 +105,11 @@ class KafkaClient:
             ],
             api_version=(0, 11),
             allow_auto_create_topics=True,
-            client_id="quantari-dpu-1",
-            value_serializer=lambda v: json.dumps(v).encode("utf-8"),
+            client_id=self.client_id,
+            key_serializer=lambda k: k.encode("utf-8"),
+            linger_ms=int(os.getenv("KAFKA_LINGER_MS", "5")),
+            batch_size=int(os.getenv("KAFKA_BATCH_SIZE", "65536")),
+            compression_type=os.getenv("KAFKA_COMPRESSION") or None,
         )
 
     def close(self) -> None:
@@ -30,7 +118,33 @@ class KafkaClient:
 
     def close_producer(self) -> None:
         if self.producer:
+            # Closing flushes the pending batches
             self.producer.close(timeout=10)
+            logging.info(
+                f"Kafka producer closed, {self.delivered} delivered "
+                f"and {self.failed} failed messages"
+            )
+
+    def flush(self) -> None:
+        # Barrier, returns once every sent message is acknowledged or failed
+        if self.producer:
+            self.producer.flush()
+
+    def on_send_success(self, metadata) -> None:
+        self.delivered += 1
+
+    def on_send_error(self, exception) -> None:
+        self.failed += 1
+        logging.error(f"Failed to send data to Kafka: {exception}")
+
+    def send(self, topic: str, value: dict, key: str | None = None) -> None:
+        # Messages of the same key always land on the same partition, in order
+        future = self.producer.send(topic, self.codec.encode(topic, value), key=key)
+        future.add_callback(self.on_send_success)
+        future.add_errback(self.on_send_error)
+
+        if self.sync:
+            self.producer.flush()
 
     def create_consumer(self) -> None:
         self.consumer = KafkaConsumer(
@@ -38,18 +152,54 @@ class KafkaClient:
                 f"{os.getenv('KAFKA_SERVER')}:{os.getenv('KAFKA_PORT', 9092)}"
             ],
             api_version=(0, 11),
-            group_id="quantari-dpu-1",
-            value_deserializer=lambda m: json.loads(m.decode("utf-8")),
+            client_id=self.client_id,
+            group_id=self.group_id,
+            value_deserializer=decode,
+            max_poll_records=int(os.getenv("KAFKA_MAX_POLL_RECORDS", "500")),
+            # Offsets are committed once a batch is processed
+            enable_auto_commit=False,
         )
 
-    def subscribe_market_data(self) -> None:
-        self.consumer.subscribe(["market_data"])
+    def subscribe(self, topic_name: str, offsets: dict | None = None) -> None:
+        self.listener = RebalanceListener(self.consumer, offsets)
+        self.consumer.subscribe([topic_name], listener=self.listener)
+
+    def subscribe_market_data(self, offsets: dict | None = None) -> None:
+        self.subscribe("market_data", offsets)
 
     def subscribe_market_indicators(self) -> None:
-        self.consumer.subscribe(["market_indicators"])
+        self.subscribe("market_indicators")
 
     def subscribe_signals(self) -> None:
-        self.consumer.subscribe(["signals"])
+        self.subscribe("signals")
+
+    def pop_revoked(self) -> set[tuple[str, int]]:
+        # Partitions lost since the last call
+        if not self.listener:
+            return set()
+
+        revoked, self.listener.revoked = self.listener.revoked, set()
+        return revoked
+
+    def partition_for(self, topic_name: str, key: str) -> int:
+        # Same partition as the default partitioner of the producer
+        partitions = sorted(self.consumer.partitions_for_topic(topic_name))
+        index = (murmur2(key.encode("utf-8")) & 0x7FFFFFFF) % len(partitions)
+        return partitions[index]
+
+    def positions(self) -> dict[tuple[str, int], int]:
+        # Next offset to be consumed on each of the assigned partitions
+        return {
+            (topic_partition.topic, topic_partition.partition): self.consumer.position(
+                topic_partition
+            )
+            for topic_partition in self.consumer.assignment()
+        }
+
+    def commit(self) -> None:
+        # Messages produced from the batch are delivered before committing it
+        self.flush()
+        self.consumer.commit()
 
     def close_consumer(self) -> None:
         if self.consumer:
@@ -58,60 +208,103 @@ class KafkaClient:
     def publish_market_data(self, market_data: dict) -> None:
         logging.debug(f"Sending data to Kafka: {market_data}")
 
-        value = {
-            "symbol": market_data["symbol"],
-            "timestamp": market_data["interval_begin"],
-            "open": market_data["open"],
-            "high": market_data["high"],
-            "low": market_data["low"],
-            "close": market_data["close"],
-            "volume": market_data["volume"],
-        }
-
-        self.producer.send("market_data", value)
-        self.producer.flush()
+        value = market_data_value(market_data)
+        self.send("market_data", value, key=value["symbol"])
 
     def publish_market_indicators(self, market_indicators: dict) -> None:
         logging.debug(f"Sending data to Kafka: {market_indicators}")
 
-        value = {
-            "symbol": market_indicators["symbol"],
-            "timestamp": market_indicators["timestamp"],
-            "open": market_indicators["open"],
-            "high": market_indicators["high"],
-            "low": market_indicators["low"],
-            "close": market_indicators["close"],
-            "volume": market_indicators["volume"],
-            "indicators": market_indicators["indicators"],
-        }
-
-        self.producer.send("market_indicators", value)
-        self.producer.flush()
+        value = market_indicators_value(market_indicators)
+        self.send("market_indicators", value, key=value["symbol"])
 
-    def publish_signals(self, signals: dict) -> None:
+    def publish_signals(self, signals: dict, symbol: str | None = None) -> None:
         logging.debug(f"Sending data to Kafka: {signals}")
-        self.producer.send("signals", signals)
-        self.producer.flush()
+        self.send("signals", signals, key=symbol)
 
-    def pull_data(self, topic_name) -> dict | None:
-        package = self.consumer.poll(timeout_ms=1000)
+    def pull_data(self, topic_name) -> list[dict]:
+        # Every record of the poll, in order within each partition
+        package = self.consumer.poll(
+            timeout_ms=int(os.getenv("KAFKA_POLL_TIMEOUT_MS", "1000"))
+        )
         if len(package) == 0:
-            return None
+            return []
 
         logging.debug(f"Received data from Kafka: {package}")
 
-        for topic, records in package.items():
-            for message in records:
-                if message.topic == topic_name:
-                    return message.value
-
-        return None
+        return [
+            message.value
+            for records in package.values()
+            for message in records
+            if message.topic == topic_name
+        ]
 
-    def pull_market_data(self):
+    def pull_market_data(self) -> list[dict]:
         return self.pull_data("market_data")
 
-    def pull_market_indicators(self):
+    def pull_market_indicators(self) -> list[dict]:
         return self.pull_data("market_indicators")
 
-    def pull_signals(self):
+    def pull_signals(self) -> list[dict]:
         return self.pull_data("signals")
+
+
+class AsyncKafkaClient:
+    def __init__(self, client_id: str = DEFAULT_ID, group_id: str = DEFAULT_ID) -> None:
+        self.client = KafkaClient(client_id, group_id)
+        # kafka-python clients are not thread safe, every call runs on the same
+        # I/O thread so the event loop never blocks on the broker
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kafka")
+
+    async def run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, function, *args
+        )
+
+    def close(self) -> None:
+        self.executor.submit(self.client.close).result()
+        self.executor.shutdown()
+
+    async def create_producer(self) -> None:
+        await self.run(self.client.create_producer)
+
+    async def create_consumer(self) -> None:
+        await self.run(self.client.create_consumer)
+
+    async def subscribe_market_data(self, offsets: dict | None = None) -> None:
+        await self.run(self.client.subscribe_market_data, offsets)
+
+    async def subscribe_market_indicators(self) -> None:
+        await self.run(self.client.subscribe_market_indicators)
+
+    async def subscribe_signals(self) -> None:
+        await self.run(self.client.subscribe_signals)
+
+    async def pop_revoked(self) -> set[tuple[str, int]]:
+        return await self.run(self.client.pop_revoked)
+
+    async def partition_for(self, topic_name: str, key: str) -> int:
+        return await self.run(self.client.partition_for, topic_name, key)
+
+    async def positions(self) -> dict[tuple[str, int], int]:
+        return await self.run(self.client.positions)
+
+    async def flush(self) -> None:
+        await self.run(self.client.flush)
+
+    async def commit(self) -> None:
+        await self.run(self.client.commit)
+
+    async def publish_market_data(self, market_data: dict) -> None:
+        await self.run(self.client.publish_market_data, market_data)
+
+    async def publish_market_indicators(self, market_indicators: dict) -> None:
+        await self.run(self.client.publish_market_indicators, market_indicators)
+
+    async def publish_signals(self, signals: dict, symbol: str | None = None) -> None:
+        await self.run(self.client.publish_signals, signals, symbol)
+
+    async def consume(self, topic_name: str) -> AsyncIterator[list[dict]]:
+        # Yields every polled batch, empty when the poll timed out so callers
+        # can check their stop conditions
+        while True:
+            yield await self.run(self.client.pull_data, topic_name)
@@ -0,0 +1,248 @@
+import bisect
+import itertools
+import logging
+import math
+import os
+import random
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from quantari.backtest import Backtest
+from quantari.strategies import SimpleMACD
+from quantari.timescale_client import OHLCV
+
+COLUMNS = ["timestamp", *OHLCV]
+
+# Metrics ranked from the lowest value, the others from the highest
+MINIMIZED_METRICS = {"max_drawdown"}
+
+# Candles of the worker processes, attached once to the shared memory block
+worker_candles: dict[str, np.ndarray] = {}
+
+
+def simple_macd(**params) -> tuple:
+    # Builds the strategy and its indicators, must be importable by the workers
+    strategy = SimpleMACD(**params)
+    return strategy, strategy.indicators()
+
+
+def grid(space: dict[str, list]) -> list[dict]:
+    # Every combination of the parameter values
+    return [dict(zip(space, values)) for values in itertools.product(*space.values())]
+
+
+def random_search(space: dict[str, list], count: int, seed: int | None = None) -> list:
+    # Distinct combinations drawn at random, at most all of them
+    combinations = grid(space)
+    return random.Random(seed).sample(combinations, min(count, len(combinations)))
+
+
+def walk_forward_splits(
+    count: int, train: int, test: int, step: int | None = None
+) -> list[tuple[int, int, int]]:
+    # (start, split, end) rows of each window, trained on start:split and
+    # tested on split:end, windows move forward by `step` (the test size)
+    step = step or test
+    return [
+        (start, start + train, start + train + test)
+        for start in range(0, count - train - test + 1, step)
+    ]
+
+
+class SharedCandles:
+    def __init__(self, candles: dict[str, np.ndarray]):
+        # All the columns in a single block, 8 bytes per value, copied once and
+        # mapped by every worker instead of being pickled with each task
+        self.count = len(candles["timestamp"])
+        self.memory = shared_memory.SharedMemory(
+            create=True, size=max(len(COLUMNS) * self.count * 8, 1)
+        )
+
+        for name, column in attach(self.memory, self.count).items():
+            column[:] = candles[name]
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def close(self) -> None:
+        self.memory.close()
+        self.memory.unlink()
+
+
+def attach(memory: shared_memory.SharedMemory, count: int) -> dict[str, np.ndarray]:
+    columns = {}
+    for index, name in enumerate(COLUMNS):
+        dtype = np.int64 if name == "timestamp" else np.float64
+        columns[name] = np.ndarray(
+            (count,), dtype=dtype, buffer=memory.buf, offset=index * count * 8
+        )
+    return columns
+
+
+def init_worker(name: str, count: int) -> None:
+    # The block stays referenced for as long as the worker lives
+    memory = shared_memory.SharedMemory(name=name)
+    worker_candles["memory"] = memory
+    worker_candles.update(attach(memory, count))
+
+
+def backtest_many(
+    build: Callable, parameters: list[dict], window: tuple[int, int, int], options
+) -> list[tuple[dict, dict]]:
+    # Runs in a worker, the candles from `start` to `end` warm up the indicators
+    # and only the rows from `split` are traded
+    start, split, end = window
+    candles = {name: worker_candles[name][start:end] for name in COLUMNS}
+
+    results = []
+    for params in parameters:
+        strategy, indicators = build(**params)
+        result = Backtest(strategy, indicators, **options).run(candles, split - start)
+        results.append((params, result.stats))
+
+    return results
+
+
+class Optimizer:
+    def __init__(
+        self,
+        build: Callable = simple_macd,
+        metric: str = "sharpe",
+        workers: int | None = None,
+        chunk_size: int | None = None,
+        **options,
+    ):
+        # `build(**params)` returns the strategy and indicators of a combination,
+        # `options` are passed to Backtest
+        self.build = build
+        self.metric = metric
+        self.workers = workers or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.options = options
+        self.table = []
+
+    def chunks(self, parameters: list[dict]) -> Iterator[list[dict]]:
+        # A few tasks per worker, so the pool stays busy until the end
+        size = self.chunk_size or max(1, len(parameters) // (self.workers * 4))
+        for index in range(0, len(parameters), size):
+            yield parameters[index : index + size]
+
+    def score(self, row: dict) -> float:
+        # Rows without the metric (no candles to trade) or with NaN rank last
+        value = row.get(self.metric)
+        if value is None or math.isnan(value):
+            return math.inf
+        return value if self.metric in MINIMIZED_METRICS else -value
+
+    def rank(self, table: list[dict], params: dict, stats: dict) -> dict:
+        # Ranked table kept sorted as the results come in, best first
+        row = {**params, **stats}
+        bisect.insort(table, row, key=self.score)
+        return row
+
+    @contextmanager
+    def pool(self, candles: dict[str, np.ndarray]):
+        shared = SharedCandles(candles)
+        try:
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=init_worker,
+                initargs=(shared.name, shared.count),
+            ) as executor:
+                yield executor
+        finally:
+            shared.close()
+
+    def submit(
+        self, executor, parameters: list[dict], window: tuple[int, int, int]
+    ) -> list:
+        return [
+            executor.submit(backtest_many, self.build, chunk, window, self.options)
+            for chunk in self.chunks(parameters)
+        ]
+
+    def search(
+        self,
+        candles: dict[str, np.ndarray],
+        parameters: list[dict],
+        window: tuple[int, int, int] | None = None,
+    ) -> Iterator[dict]:
+        # Yields the row of each combination as soon as it is backtested, the
+        # ranked rows are in `table`
+        window = window or (0, 0, len(candles["timestamp"]))
+        started = time.monotonic()
+        self.table = []
+
+        with self.pool(candles) as executor:
+            for future in as_completed(self.submit(executor, parameters, window)):
+                for params, stats in future.result():
+                    yield self.rank(self.table, params, stats)
+
+        logging.info(
+            f"Backtested {len(self.table)} combinations "
+            f"in {time.monotonic() - started:.1f}s"
+        )
+
+    def optimize(
+        self, candles: dict[str, np.ndarray], parameters: list[dict]
+    ) -> list[dict]:
+        for _ in self.search(candles, parameters):
+            pass
+
+        return self.table
+
+    def walk_forward(
+        self,
+        candles: dict[str, np.ndarray],
+        parameters: list[dict],
+        splits: list[tuple[int, int, int]],
+    ) -> list[dict]:
+        # Best combination of each training window with its stats on the
+        # following test window, warmed up on the training candles. The
+        # training windows are all searched on the same pool.
+        tables = {window: [] for window in splits}
+
+        with self.pool(candles) as executor:
+            futures = {}
+            for start, split, end in splits:
+                for future in self.submit(executor, parameters, (start, start, split)):
+                    futures[future] = (start, split, end)
+
+            for future in as_completed(futures):
+                for params, stats in future.result():
+                    self.rank(tables[futures[future]], params, stats)
+
+            # Each test window only backtests the best combination
+            tests = {
+                window: executor.submit(
+                    backtest_many,
+                    self.build,
+                    [{name: tables[window][0][name] for name in parameters[0]}],
+                    window,
+                    self.options,
+                )
+                for window in splits
+            }
+
+            results = []
+            for (start, split, end), future in tests.items():
+                [(params, stats)] = future.result()
+                best = tables[(start, split, end)][0]
+
+                logging.info(f"Walk forward {start}:{split}:{end} => {params}")
+                results.append(
+                    {
+                        "start": int(candles["timestamp"][split]),
+                        "params": params,
+                        "train": {key: best[key] for key in stats},
+                        "test": stats,
+                    }
+                )
+
+        return results
@@ -6,13 +6,15 @@ import signal
 from kraken.spot import SpotClient
 
 from quantari.decorators import catch_and_set_exception
-from quantari.kafka_client import KafkaClient
+from quantari.kafka_client import AsyncKafkaClient
 from quantari.timescale_client import TimescaleClient
 
 
 class OrderManagementSystem:
-    def __init__(self):
-        self.kafka_client = KafkaClient()
+    def __init__(self, kafka_client: AsyncKafkaClient | None = None):
+        self.kafka_client = kafka_client or AsyncKafkaClient(
+            "quantari-oms", "quantari-oms"
+        )
         self.db_client = TimescaleClient()
         self.kraken_client = SpotClient(
             key=os.getenv("KRAKEN_SPOT_API_KEY"),
@@ -29,29 +31,40 @@ class OrderManagementSystem:
     async def run(self, shutdown_event) -> None:
         logging.info("Setup DB Client")
         self.db_client.connect()
-        self.db_client.create_orders_table()
+        self.db_client.migrate()
 
         logging.info("Setup Kafka Consumer")
-        self.kafka_client.create_consumer()
-        self.kafka_client.subscribe_signals()
+        await self.kafka_client.create_consumer()
+        await self.kafka_client.subscribe_signals()
 
-        while not self.exception and not shutdown_event.is_set():
-            message = self.kafka_client.pull_signals()
-            if message:
+        # The poll timeout is the only wait when there are no messages
+        async for messages in self.kafka_client.consume("signals"):
+            for message in messages:
                 logging.info(f"Signals => {message}")
-                orders = self.process_signals(message)
-                self.process_orders(orders)
+                # Database and Kraken requests block, they run on a thread
+                orders = await asyncio.to_thread(self.process_signals, message)
+                await asyncio.to_thread(self.process_orders, orders)
+
+            if messages:
+                await self.kafka_client.commit()
             else:
                 logging.info("Waiting for messages...")
 
-            await asyncio.sleep(1)
+            if self.exception or shutdown_event.is_set():
+                break
 
-    def process_signals(self, signals: dict) -> list[dict]:
+    def process_signals(self, message: dict) -> list[dict]:
         orders = []
 
-        for signal_name, action in signals.items():
-            logging.info(f"Processing Signal: {signal_name}:{action}")
-            order = self.db_client.fetch_order_by_signal(signal_name)
+        # Signals published before they carried their symbol can't be placed
+        symbol = message.get("symbol")
+        if symbol is None:
+            logging.warning(f"Skipping signals without a symbol: {message}")
+            return orders
+
+        for signal_name, action in message["signals"].items():
+            logging.info(f"Processing Signal: {symbol}:{signal_name}:{action}")
+            order = self.db_client.fetch_order_by_signal(signal_name, symbol)
 
             logging.info(f"Order result: {order}")
 
@@ -63,6 +76,7 @@ class OrderManagementSystem:
                 {
                     "id": order_id,
                     "signal_name": signal_name,
+                    "symbol": symbol,
                     "action": action,
                 }
             )
@@ -79,7 +93,7 @@ class OrderManagementSystem:
                 params={
                     "ordertype": "market",
                     "type": order["action"],
-                    "pair": os.getenv("SYMBOL"),
+                    "pair": order["symbol"],
                     "volume": 1,
                 },
                 auth=True,
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import os
+import signal
+
+from quantari.data_processor_unit import DataProcessorUnit
+from quantari.order_management_system import OrderManagementSystem
+from quantari.queue_client import QueueBroker, QueueClient
+from quantari.strategy_management_system import StrategyManagementSystem
+from quantari.technical_analysis_unit import TechnicalAnalysisUnit
+
+UNITS = {
+    "dpu": DataProcessorUnit,
+    "tau": TechnicalAnalysisUnit,
+    "sms": StrategyManagementSystem,
+    "oms": OrderManagementSystem,
+}
+
+# The OMS places live orders, it only runs when listed in PIPELINE_UNITS
+DEFAULT_UNITS = "dpu,tau,sms"
+
+
+class Pipeline:
+    def __init__(self, units: list[str] | None = None):
+        # Units exchange messages through in-process queues instead of Kafka
+        self.broker = QueueBroker()
+        units = units or os.getenv("PIPELINE_UNITS", DEFAULT_UNITS).split(",")
+        self.units = [UNITS[unit](QueueClient(self.broker)) for unit in units]
+
+    async def run(self, shutdown_event) -> None:
+        async def run_unit(unit) -> None:
+            await unit.run(shutdown_event)
+
+            # The pipeline is incomplete once any unit stops
+            logging.info(f"{type(unit).__name__} stopped")
+            shutdown_event.set()
+
+        await asyncio.gather(*(run_unit(unit) for unit in self.units))
+
+    async def close(self) -> None:
+        for unit in self.units:
+            if asyncio.iscoroutinefunction(unit.close):
+                await unit.close()
+            else:
+                unit.close()
+
+
+async def main():
+    shutdown_event = asyncio.Event()
+
+    for sig in [signal.SIGINT, signal.SIGTERM, signal.SIGQUIT, signal.SIGHUP]:
+        signal.signal(sig, lambda s, f: shutdown_event.set())
+
+    logging.info("Starting process...")
+    pipeline = Pipeline()
+
+    await pipeline.run(shutdown_event)
+
+    logging.info("Closing process...")
+    await pipeline.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
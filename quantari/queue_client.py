@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import os
+from collections.abc import AsyncIterator
+
+from quantari.kafka_client import market_data_value, market_indicators_value
+
+
+class QueueBroker:
+    def __init__(self, maxsize: int | None = None) -> None:
+        # Bounded so a slow unit applies back pressure to the previous ones
+        self.maxsize = maxsize or int(os.getenv("PIPELINE_QUEUE_SIZE", "10000"))
+        self.queues: dict[str, asyncio.Queue] = {}
+
+    def queue(self, topic_name: str) -> asyncio.Queue:
+        if topic_name not in self.queues:
+            self.queues[topic_name] = asyncio.Queue(maxsize=self.maxsize)
+        return self.queues[topic_name]
+
+
+class QueueClient:
+    # Same interface as AsyncKafkaClient, each topic has a single consumer
+    def __init__(self, broker: QueueBroker) -> None:
+        self.broker = broker
+        self.poll_timeout = int(os.getenv("KAFKA_POLL_TIMEOUT_MS", "1000")) / 1000
+        self.max_poll_records = int(os.getenv("KAFKA_MAX_POLL_RECORDS", "500"))
+
+    def close(self) -> None:
+        pass
+
+    async def create_producer(self) -> None:
+        pass
+
+    async def create_consumer(self) -> None:
+        pass
+
+    async def subscribe_market_data(self, offsets: dict | None = None) -> None:
+        pass
+
+    async def subscribe_market_indicators(self) -> None:
+        pass
+
+    async def subscribe_signals(self) -> None:
+        pass
+
+    async def pop_revoked(self) -> set[tuple[str, int]]:
+        return set()
+
+    async def partition_for(self, topic_name: str, key: str) -> int:
+        return 0
+
+    async def positions(self) -> dict[tuple[str, int], int]:
+        # Messages are not kept, there is nothing to resume from
+        return {}
+
+    async def flush(self) -> None:
+        pass
+
+    async def commit(self) -> None:
+        pass
+
+    async def publish(self, topic_name: str, value: dict) -> None:
+        logging.debug(f"Sending data to {topic_name}: {value}")
+        await self.broker.queue(topic_name).put(value)
+
+    async def publish_market_data(self, market_data: dict) -> None:
+        await self.publish("market_data", market_data_value(market_data))
+
+    async def publish_market_indicators(self, market_indicators: dict) -> None:
+        await self.publish(
+            "market_indicators", market_indicators_value(market_indicators)
+        )
+
+    async def publish_signals(self, signals: dict, symbol: str | None = None) -> None:
+        await self.publish("signals", signals)
+
+    async def consume(self, topic_name: str) -> AsyncIterator[list[dict]]:
+        # Yields the queued messages in batches, empty when nothing arrived
+        # within the poll timeout so callers can check their stop conditions
+        queue = self.broker.queue(topic_name)
+        while True:
+            try:
+                batch = [await asyncio.wait_for(queue.get(), self.poll_timeout)]
+            except asyncio.TimeoutError:
+                yield []
+                continue
+
+            while len(batch) < self.max_poll_records and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            yield batch
@@ -0,0 +1,225 @@
+import logging
+import os
+import time
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+from kafka import KafkaConsumer, TopicPartition
+
+from quantari.backfill import read_candles
+from quantari.kafka_client import KafkaClient, unit_name
+from quantari.timescale_client import OHLCV, TimescaleClient
+from quantari.timestamps import from_epoch_us
+
+# Topic consumed by each stage of the pipeline and the group of its consumers
+STAGES = {
+    "technical_analysis_unit": (
+        "market_data",
+        f"quantari-tau-{os.getenv('INTERVAL_MINS', '1')}",
+    ),
+    "strategy_management_system": ("market_indicators", "quantari-sms"),
+    "order_management_system": ("signals", "quantari-oms"),
+}
+
+
+def candle_message(timestamp: int, symbol: str, interval: int, values) -> dict:
+    # Same fields as the Kraken candles the Data Processor Unit publishes
+    return {
+        "symbol": symbol,
+        "interval_begin": from_epoch_us(timestamp).isoformat(),
+        "interval": interval,
+        **dict(zip(OHLCV, values)),
+    }
+
+
+def column_messages(
+    chunks: Iterable[dict[str, np.ndarray]], interval: int
+) -> Iterator[tuple[int, dict]]:
+    for chunk in chunks:
+        values = np.column_stack([chunk[name] for name in OHLCV]).tolist()
+        rows = zip(chunk["timestamp"].tolist(), chunk["symbol"].tolist(), values)
+        for timestamp, symbol, row in rows:
+            yield timestamp, candle_message(timestamp, symbol, interval, row)
+
+
+def database_messages(
+    db_client: TimescaleClient, symbols: list[str], start, end, interval: int
+) -> Iterator[tuple[int, dict]]:
+    # Candles of all the symbols streamed in time order by a single COPY
+    return column_messages(
+        db_client.iter_symbols_candles(symbols, start, end, interval), interval
+    )
+
+
+def file_messages(
+    paths: list[str], interval: int, symbol: str | None = None
+) -> list[tuple[int, dict]]:
+    # Backfill files are sorted by symbol, candles are loaded and sorted by time
+    messages = [
+        (candle[0], candle_message(candle[0], candle[6], interval, candle[1:6]))
+        for path in paths
+        for candle in read_candles(path, interval, symbol)
+    ]
+    messages.sort(key=lambda item: item[0])
+    return messages
+
+
+class ConsumerLag:
+    def __init__(self, stages: dict[str, tuple[str, str]] = STAGES):
+        # One consumer per group only reads its committed offsets, it never
+        # joins the group so the units are not rebalanced. Groups overridden
+        # for a replay (KAFKA_GROUP_ID_<UNIT>) are measured instead.
+        self.stages = {
+            stage: (
+                topic_name,
+                os.getenv(f"KAFKA_GROUP_ID_{unit_name(group_id)}", group_id),
+            )
+            for stage, (topic_name, group_id) in stages.items()
+        }
+        self.consumers = {}
+
+    def consumer(self, group_id: str) -> KafkaConsumer:
+        if group_id not in self.consumers:
+            self.consumers[group_id] = KafkaConsumer(
+                bootstrap_servers=[
+                    f"{os.getenv('KAFKA_SERVER')}:{os.getenv('KAFKA_PORT', 9092)}"
+                ],
+                api_version=(0, 11),
+                group_id=group_id,
+                enable_auto_commit=False,
+            )
+        return self.consumers[group_id]
+
+    def measure(self) -> dict[str, tuple[int, int]]:
+        # Messages not committed yet and last offset of each stage, summed
+        # over the partitions of its topic
+        measures = {}
+        for stage, (topic_name, group_id) in self.stages.items():
+            consumer = self.consumer(group_id)
+            partitions = [
+                TopicPartition(topic_name, partition)
+                for partition in consumer.partitions_for_topic(topic_name) or ()
+            ]
+            end_offsets = consumer.end_offsets(partitions) if partitions else {}
+
+            end = sum(end_offsets.values())
+            committed = sum(consumer.committed(p) or 0 for p in partitions)
+            measures[stage] = (end - committed, end)
+
+        return measures
+
+    def close(self) -> None:
+        for consumer in self.consumers.values():
+            consumer.close()
+
+
+class Replay:
+    def __init__(
+        self,
+        speed: float = 0,
+        kafka_client: KafkaClient | None = None,
+        lag: ConsumerLag | None = None,
+    ):
+        # Speed 1 replays the candles in real time, N is N times faster and 0
+        # as fast as possible
+        self.speed = speed
+        self.kafka_client = kafka_client or KafkaClient("quantari-replay")
+        self.lag = lag or ConsumerLag()
+        self.published = 0
+        self.started = None
+        self.finished = None
+        self.offsets = {}
+        self.lags = {}
+        self.drained = {}
+
+    def connect(self) -> None:
+        self.kafka_client.create_producer()
+
+    def close(self) -> None:
+        self.kafka_client.close()
+        self.lag.close()
+
+    def run(self, messages: Iterable[tuple[int, dict]]) -> None:
+        # Offsets before the replay, to count the messages each stage processed
+        self.offsets = {stage: end for stage, (_, end) in self.lag.measure().items()}
+        self.started = time.monotonic()
+        first = None
+        last_report = self.started
+
+        for timestamp, message in messages:
+            if self.speed:
+                first = timestamp if first is None else first
+                delay = (
+                    self.started
+                    + (timestamp - first) / 1_000_000 / self.speed
+                    - time.monotonic()
+                )
+                if delay > 0:
+                    time.sleep(delay)
+
+            self.kafka_client.publish_market_data(message)
+            self.published += 1
+
+            if time.monotonic() - last_report >= 10:
+                last_report = time.monotonic()
+                logging.info(
+                    f"Published {self.published} candles "
+                    f"at {self.published / (last_report - self.started):.0f}/s"
+                )
+
+        self.kafka_client.flush()
+        self.finished = time.monotonic()
+        self.lags = {stage: lag for stage, (lag, _) in self.lag.measure().items()}
+
+    def drain(self, timeout: float = 60, interval: float = 1) -> None:
+        # Waits for every stage to consume the replayed messages, a stage is
+        # drained once it and all the stages before it have no lag
+        deadline = time.monotonic() + timeout
+        self.drained = {}
+
+        while len(self.drained) < len(self.lag.stages):
+            upstream = True
+            for stage, (lag, end) in self.lag.measure().items():
+                upstream = upstream and lag == 0
+                if upstream and stage not in self.drained:
+                    self.drained[stage] = (time.monotonic(), end - self.offsets[stage])
+
+            if time.monotonic() >= deadline:
+                break
+            if len(self.drained) < len(self.lag.stages):
+                time.sleep(interval)
+
+    def report(self) -> dict:
+        published_time = max(self.finished - self.started, 1e-9)
+        report = {
+            "published": self.published,
+            "publish_rate": self.published / published_time,
+            "stages": {},
+        }
+
+        for stage in self.lag.stages:
+            stats = {"lag_when_published": self.lags.get(stage)}
+            if stage in self.drained:
+                drained_at, messages = self.drained[stage]
+                elapsed = max(drained_at - self.started, 1e-9)
+                stats.update(messages=messages, throughput=messages / elapsed)
+            report["stages"][stage] = stats
+
+        logging.info(
+            f"Replayed {self.published} candles in {published_time:.1f}s "
+            f"({report['publish_rate']:.0f}/s)"
+        )
+        for stage, stats in report["stages"].items():
+            if "throughput" in stats:
+                logging.info(
+                    f"{stage}: lag {stats['lag_when_published']} when published, "
+                    f"{stats['messages']} messages at {stats['throughput']:.0f}/s "
+                    "end to end"
+                )
+            else:
+                logging.info(
+                    f"{stage}: lag {stats['lag_when_published']} when published, "
+                    "not drained"
+                )
+
+        return report
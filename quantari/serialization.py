@@ -0,0 +1,230 @@
+import json
+import struct
+from functools import lru_cache
+
+from quantari.timestamps import from_epoch_us, to_epoch_us
+
+# First byte of every binary message, JSON messages never start with it
+MAGIC = 0xA7
+
+MARKET_DATA_SCHEMA = 1
+MARKET_INDICATORS_SCHEMA = 2
+# Signals without their symbol and timestamp, still decoded
+UNKEYED_SIGNALS_SCHEMA = 3
+SIGNALS_SCHEMA = 4
+
+HEADER = struct.Struct("<BB")
+# timestamp (epoch us), interval, open, high, low, close, volume
+CANDLE = struct.Struct("<qH5d")
+LENGTH = struct.Struct("<B")
+LAYOUT_LENGTH = struct.Struct("<H")
+SIGNAL = struct.Struct("<b")
+TIMESTAMP = struct.Struct("<q")
+
+# Shape of an indicator value in the layout, vectors use their length
+NONE = "-"
+SCALAR = "s"
+NAN = float("nan")
+
+
+class JsonCodec:
+    def encode(self, topic: str, value: dict) -> bytes:
+        return json.dumps(value).encode("utf-8")
+
+    def decode(self, data: bytes) -> dict:
+        return json.loads(data.decode("utf-8"))
+
+
+class BinaryCodec:
+    SCHEMAS = {
+        "market_data": MARKET_DATA_SCHEMA,
+        "market_indicators": MARKET_INDICATORS_SCHEMA,
+        "signals": SIGNALS_SCHEMA,
+    }
+
+    def encode(self, topic: str, value: dict) -> bytes:
+        schema = self.SCHEMAS.get(topic)
+        if schema is None:
+            return JSON.encode(topic, value)
+
+        buffer = bytearray(HEADER.pack(MAGIC, schema))
+
+        if schema == SIGNALS_SCHEMA:
+            buffer += TIMESTAMP.pack(parse_timestamp(value["timestamp"]))
+            pack_string(buffer, value["symbol"])
+            buffer += LENGTH.pack(len(value["signals"]))
+            for name, signal in value["signals"].items():
+                pack_string(buffer, name)
+                buffer += SIGNAL.pack(signal)
+            return bytes(buffer)
+
+        buffer += CANDLE.pack(
+            parse_timestamp(value["timestamp"]),
+            value["interval"],
+            value["open"],
+            value["high"],
+            value["low"],
+            value["close"],
+            value["volume"],
+        )
+        pack_string(buffer, value["symbol"])
+
+        if schema == MARKET_INDICATORS_SCHEMA:
+            pack_indicators(buffer, value["indicators"])
+
+        return bytes(buffer)
+
+    def decode(self, data: bytes) -> dict:
+        magic, schema = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a binary encoded message")
+
+        offset = HEADER.size
+
+        if schema == UNKEYED_SIGNALS_SCHEMA:
+            return {"signals": unpack_signals(data, offset)}
+
+        if schema == SIGNALS_SCHEMA:
+            (timestamp,) = TIMESTAMP.unpack_from(data, offset)
+            symbol, offset = unpack_string(data, offset + TIMESTAMP.size)
+            return {
+                "symbol": symbol,
+                "timestamp": format_timestamp(timestamp),
+                "signals": unpack_signals(data, offset),
+            }
+
+        if schema not in (MARKET_DATA_SCHEMA, MARKET_INDICATORS_SCHEMA):
+            raise ValueError(f"Unknown schema {schema}")
+
+        timestamp, interval, open, high, low, close, volume = CANDLE.unpack_from(
+            data, offset
+        )
+        offset += CANDLE.size
+        symbol, offset = unpack_string(data, offset)
+
+        value = {
+            "symbol": symbol,
+            "timestamp": format_timestamp(timestamp),
+            "interval": interval,
+            "open": open,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": volume,
+        }
+
+        if schema == MARKET_INDICATORS_SCHEMA:
+            value["indicators"] = unpack_indicators(data, offset)
+
+        return value
+
+
+CODECS = {"json": JsonCodec, "binary": BinaryCodec}
+
+JSON = JsonCodec()
+BINARY = BinaryCodec()
+
+
+def decode(data: bytes) -> dict:
+    # The header tells which codec produced the message
+    if data[0] == MAGIC:
+        return BINARY.decode(data)
+    return JSON.decode(data)
+
+
+# Candles of all the symbols closing together share the same timestamp
+@lru_cache(maxsize=1024)
+def parse_timestamp(value: str) -> int:
+    return to_epoch_us(value)
+
+
+@lru_cache(maxsize=1024)
+def format_timestamp(value: int) -> str:
+    return from_epoch_us(value).isoformat()
+
+
+def pack_string(buffer: bytearray, value: str) -> None:
+    encoded = value.encode("utf-8")
+    buffer += LENGTH.pack(len(encoded))
+    buffer += encoded
+
+
+def unpack_string(data: bytes, offset: int) -> tuple[str, int]:
+    (length,) = LENGTH.unpack_from(data, offset)
+    offset += LENGTH.size
+    return data[offset : offset + length].decode("utf-8"), offset + length
+
+
+def unpack_signals(data: bytes, offset: int) -> dict:
+    (count,) = LENGTH.unpack_from(data, offset)
+    offset += LENGTH.size
+
+    signals = {}
+    for _ in range(count):
+        name, offset = unpack_string(data, offset)
+        (signals[name],) = SIGNAL.unpack_from(data, offset)
+        offset += SIGNAL.size
+    return signals
+
+
+def pack_indicators(buffer: bytearray, indicators: dict) -> None:
+    # Names and shapes go in a layout string followed by all the values, so
+    # the decoder parses each layout only once
+    shapes = []
+    values = []
+    for name, value in indicators.items():
+        if value is None:
+            shapes.append(f"{name}={NONE}")
+        elif isinstance(value, (list, tuple)):
+            # Missing values of a vector are sent as NaN
+            shapes.append(f"{name}={len(value)}")
+            values.extend(NAN if item is None else item for item in value)
+        else:
+            shapes.append(f"{name}={SCALAR}")
+            values.append(value)
+
+    layout = ";".join(shapes).encode("utf-8")
+    buffer += LAYOUT_LENGTH.pack(len(layout))
+    buffer += layout
+    buffer += struct.pack(f"<{len(values)}d", *values)
+
+
+def unpack_indicators(data: bytes, offset: int) -> dict:
+    (length,) = LAYOUT_LENGTH.unpack_from(data, offset)
+    offset += LAYOUT_LENGTH.size
+
+    fields, values_struct = parse_layout(data[offset : offset + length])
+    values = values_struct.unpack_from(data, offset + length)
+
+    indicators = {}
+    for name, start, end in fields:
+        if start is None:
+            indicators[name] = None
+        elif end is None:
+            indicators[name] = values[start]
+        else:
+            indicators[name] = [
+                None if item != item else item for item in values[start:end]
+            ]
+
+    return indicators
+
+
+@lru_cache(maxsize=256)
+def parse_layout(layout: bytes) -> tuple[list[tuple], struct.Struct]:
+    # Each field is (name, start, end) in the values, start is None for
+    # missing values and end for scalars
+    fields = []
+    position = 0
+    for shape in layout.decode("utf-8").split(";") if layout else []:
+        name, shape = shape.rsplit("=", 1)
+        if shape == NONE:
+            fields.append((name, None, None))
+        elif shape == SCALAR:
+            fields.append((name, position, None))
+            position += 1
+        else:
+            fields.append((name, position, position + int(shape)))
+            position += int(shape)
+
+    return fields, struct.Struct(f"<{position}d")
@@ -1,4 +1,12 @@
+from .registry import STRATEGIES, create_strategies, register, required_indicators
 from .signals import Signals
 from .simple_macd import SimpleMACD
 
-__all__ = ["Signals", "SimpleMACD"]
+__all__ = [
+    "STRATEGIES",
+    "Signals",
+    "SimpleMACD",
+    "create_strategies",
+    "register",
+    "required_indicators",
+]
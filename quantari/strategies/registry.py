@@ -0,0 +1,55 @@
+import os
+
+from quantari.indicators import Indicator
+
+# Strategies that can be enabled with the STRATEGIES setting, by class name
+STRATEGIES: dict[str, type] = {}
+
+
+def register(strategy: type) -> type:
+    STRATEGIES[strategy.__name__] = strategy
+    return strategy
+
+
+def parse_value(value: str) -> int | float | str:
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def create_strategies(spec: str | None = None) -> list:
+    # Strategies separated by ";", each with optional parameters, for example
+    # "SimpleMACD;SimpleMACD(fast=8,slow=21,signal=5)"
+    if spec is None:
+        spec = os.getenv("STRATEGIES", "SimpleMACD")
+
+    strategies = []
+    for item in filter(None, (item.strip() for item in spec.split(";"))):
+        name, _, arguments = item.partition("(")
+        if name not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {name}")
+
+        params = {}
+        for argument in filter(None, arguments.rstrip(")").split(",")):
+            key, value = argument.split("=", 1)
+            params[key.strip()] = parse_value(value.strip())
+
+        strategies.append(STRATEGIES[name](**params))
+
+    return strategies
+
+
+def required_indicators(strategies: list) -> list[Indicator]:
+    # Indicators read by the strategies, by name, each computed only once
+    indicators = {}
+    for strategy in strategies:
+        for indicator in strategy.indicators():
+            name = str(indicator)
+            if name in indicators and indicators[name].key() != indicator.key():
+                raise ValueError(f"Strategies need different indicators named {name}")
+            indicators.setdefault(name, indicator)
+
+    return list(indicators.values())
@@ -1,16 +1,35 @@
+import numpy as np
+
+from quantari.indicators import MACD, Indicator
+
+from .registry import register
 from .signals import Signals
 
 
 # TODO: We sould keep the current state so instead of reporting the same signal BUY/SELL multiple times,
 # we just signal once and then using HOLD until a change is required
+@register
 class SimpleMACD:
-    def __init__(self, name=None):
-        self.name = name if name else "Simple_MACD"
+    def __init__(self, name=None, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+        # Name of the MACD indicator the signals are computed from
+        self.indicator = f"MACD_{fast}_{slow}_{signal}"
+
+        default_name = "Simple_MACD"
+        if (fast, slow, signal) != (12, 26, 9):
+            default_name = f"Simple_MACD_{fast}_{slow}_{signal}"
+        self.name = name if name else default_name
         self.last_signal = Signals.HOLD
 
+    def indicators(self) -> list[Indicator]:
+        # Indicators the Technical Analysis Unit computes for this strategy
+        return [MACD(self.fast, self.slow, self.signal)]
+
     def evaluate(self, message: dict) -> list[float]:
         indicators = message["indicators"]
-        macd, signal = indicators.get("MACD_12_26_9", [None, None])
+        macd, signal = indicators.get(self.indicator, [None, None])
 
         if not macd or not signal or macd == signal:
             return Signals.HOLD
@@ -23,5 +42,32 @@ class SimpleMACD:
 
         return Signals.HOLD
 
+    def evaluate_batch(self, indicators: dict[str, np.ndarray]) -> np.ndarray:
+        # Same signals as evaluate() on each row, missing values are NaN
+        values = indicators[self.indicator]
+        macd, signal = values[:, 0], values[:, 1]
+
+        valid = (macd != 0) & (signal != 0) & ~np.isnan(macd) & ~np.isnan(signal)
+        directions = np.where(
+            valid, np.sign(np.nan_to_num(macd - signal)), Signals.HOLD
+        ).astype(np.int8)
+
+        # Direction of the last crossover before each row, starting from the
+        # signal of a previous evaluation
+        rows = np.flatnonzero(directions)
+        previous = np.full(len(directions), self.last_signal, dtype=np.int8)
+        if len(rows):
+            last = np.maximum.accumulate(
+                np.where(directions != Signals.HOLD, np.arange(len(directions)), -1)
+            )
+            previous[1:] = np.where(
+                last[:-1] >= 0, directions[last[:-1]], self.last_signal
+            )
+            self.last_signal = int(directions[rows[-1]])
+
+        return np.where(directions != previous, directions, Signals.HOLD).astype(
+            np.int8
+        )
+
     def __str__(self):
         return self.name
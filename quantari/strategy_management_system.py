@@ -1,17 +1,22 @@
 import asyncio
+import copy
 import logging
 import signal
 
 from quantari.decorators import catch_and_set_exception
-from quantari.kafka_client import KafkaClient
-from quantari.strategies import SimpleMACD
+from quantari.kafka_client import AsyncKafkaClient
+from quantari.strategies import create_strategies
 
 
 class StrategyManagementSystem:
-    def __init__(self):
-        self.kafka_client = KafkaClient()
+    def __init__(self, kafka_client: AsyncKafkaClient | None = None):
+        self.kafka_client = kafka_client or AsyncKafkaClient(
+            "quantari-sms", "quantari-sms"
+        )
         self.exception = False
-        self.strategies = [SimpleMACD()]
+        # Templates of the strategies, each symbol evaluates its own copies
+        self.strategies = create_strategies()
+        self.symbol_strategies = {}
 
     def close(self) -> None:
         self.kafka_client.close()
@@ -19,31 +24,63 @@ class StrategyManagementSystem:
     @catch_and_set_exception
     async def run(self, shutdown_event) -> None:
         logging.info("Setup Kafka Producer")
-        self.kafka_client.create_producer()
-        self.kafka_client.create_consumer()
-        self.kafka_client.subscribe_market_indicators()
+        await self.kafka_client.create_producer()
+        await self.kafka_client.create_consumer()
+        await self.kafka_client.subscribe_market_indicators()
 
-        while not self.exception and not shutdown_event.is_set():
-            message = self.kafka_client.pull_market_indicators()
-            if message:
+        # The poll timeout is the only wait when there are no messages
+        async for messages in self.kafka_client.consume("market_indicators"):
+            await self.drop_revoked_symbols()
+
+            for message in messages:
                 logging.info(f"Market Indicators => {message}")
                 signals = self.evaluate_strategies(message)
 
                 logging.info(f"Signals => {signals}")
-                self.kafka_client.publish_signals(signals)
+                await self.kafka_client.publish_signals(
+                    {
+                        "symbol": message["symbol"],
+                        "timestamp": message["timestamp"],
+                        "signals": signals,
+                    },
+                    message["symbol"],
+                )
+
+            if messages:
+                await self.kafka_client.commit()
             else:
                 logging.info("Waiting for messages...")
 
-            await asyncio.sleep(1)
+            if self.exception or shutdown_event.is_set():
+                break
 
     def evaluate_strategies(self, message: dict) -> dict:
         signals = {}
 
-        for strategy in self.strategies:
+        # Strategies of a symbol are built on its first message
+        symbol = message["symbol"]
+        if symbol not in self.symbol_strategies:
+            self.symbol_strategies[symbol] = copy.deepcopy(self.strategies)
+
+        for strategy in self.symbol_strategies[symbol]:
             signals[str(strategy)] = strategy.evaluate(message)
 
         return signals
 
+    async def drop_revoked_symbols(self) -> None:
+        # Another instance owns these symbols now
+        revoked = await self.kafka_client.pop_revoked()
+        if not revoked:
+            return
+
+        for symbol in list(self.symbol_strategies):
+            partition = await self.kafka_client.partition_for(
+                "market_indicators", symbol
+            )
+            if ("market_indicators", partition) in revoked:
+                logging.info(f"Dropping strategies of {symbol}")
+                del self.symbol_strategies[symbol]
+
 
 async def main():
     shutdown_event = asyncio.Event()
@@ -1,68 +1,256 @@
 import asyncio
+import copy
 import logging
+import os
 import signal
+import time
 
+from quantari.checkpoint import Checkpoint
 from quantari.decorators import catch_and_set_exception
-from quantari.indicators import EMA, MACD, SMA
-from quantari.kafka_client import KafkaClient
-from quantari.timescale_client import TimescaleClient
+from quantari.indicators import IndicatorGraph
+from quantari.indicators.multi_symbol_engine import MultiSymbolEngine
+from quantari.kafka_client import AsyncKafkaClient
+from quantari.strategies import create_strategies, required_indicators
+from quantari.timescale_client import AsyncTimescaleClient
+from quantari.timestamps import from_epoch_us, to_epoch_us
+from quantari.write_buffer import WriteBuffer
 
 
 class TechnicalAnalysisUnit:
-    def __init__(self):
-        self.kafka_client = KafkaClient()
-        self.db_client = TimescaleClient()
-        self.indicators = [SMA(), EMA(), MACD()]
+    def __init__(self, kafka_client: AsyncKafkaClient | None = None):
+        self.interval = int(os.getenv("INTERVAL_MINS", "1"))
+        # Units of each interval consume the whole topic in their own group
+        self.kafka_client = kafka_client or AsyncKafkaClient(
+            f"quantari-tau-{self.interval}", f"quantari-tau-{self.interval}"
+        )
+        self.db_client = AsyncTimescaleClient()
+        self.indicator_buffer = WriteBuffer(
+            self.db_client.save_indicators_many, "indicators"
+        )
+        # Only the indicators read by the active strategies are computed, stored
+        # and published
+        self.indicators = required_indicators(create_strategies())
+        # Template of the per symbol graphs, never updated itself
+        self.graph = IndicatorGraph(self.indicators)
+        self.graphs = {}
+        self.engine = None
+        if os.getenv("TAU_MODE") == "multi_symbol":
+            # Indicators of all the symbols are updated together as arrays
+            self.engine = MultiSymbolEngine(copy.deepcopy(self.indicators))
+        # Symbols with indicators state, only the ones of the assigned partitions
+        self.active_symbols = set()
+        self.warmup_candles = int(os.getenv("WARMUP_CANDLES", "500"))
+        self.last_timestamps = {}
+        self.checkpoint = Checkpoint(
+            os.getenv("CHECKPOINT_PATH", "tmp/technical_analysis_unit.ckpt")
+        )
+        self.checkpoint_interval = float(os.getenv("CHECKPOINT_INTERVAL_SECS", "60"))
+        self.last_checkpoint = time.monotonic()
         self.exception = False
 
-    def close(self) -> None:
+    async def close(self) -> None:
+        await self.indicator_buffer.close()
         self.kafka_client.close()
-        self.db_client.close_connection()
+        await self.db_client.close_connection()
 
     @catch_and_set_exception
     async def run(self, shutdown_event) -> None:
         logging.info("Setup DB Client")
-        self.db_client.connect()
-        self.db_client.create_market_table()
+        await self.db_client.connect()
+        await self.db_client.migrate()
+        self.indicator_buffer.start()
+
+        # Indicators of each symbol are warmed up on its first message
+        logging.info("Restoring checkpoint")
+        offsets = self.restore_checkpoint()
 
         logging.info("Setup Kafka Consumer")
-        self.kafka_client.create_consumer()
-        self.kafka_client.create_producer()
-        self.kafka_client.subscribe_market_data()
-
-        while not self.exception and not shutdown_event.is_set():
-            message = self.kafka_client.pull_market_data()
-            if message:
-                logging.info(f"Market Data => {message}")
-                indicators_values = self.calculate_indicators(message)
-
-                logging.info(f"Update Database: {indicators_values}")
-                self.db_client.update_indicators(
-                    message["timestamp"], indicators_values
-                )
+        await self.kafka_client.create_consumer()
+        await self.kafka_client.create_producer()
+        await self.kafka_client.subscribe_market_data(offsets)
+
+        # The poll timeout is the only wait when there are no messages
+        async for messages in self.kafka_client.consume("market_data"):
+            await self.drop_revoked_symbols()
 
-                message["indicators"] = indicators_values
-                logging.info(f"Market Indicators => {message}")
-                self.kafka_client.publish_market_indicators(message)
+            if messages:
+                await self.process_market_data(messages)
+                self.indicator_buffer.check()
+                await self.kafka_client.commit()
             else:
                 logging.info("Waiting for messages...")
 
-            await asyncio.sleep(1)
+            if time.monotonic() - self.last_checkpoint >= self.checkpoint_interval:
+                await self.save_checkpoint()
+
+            # Polled messages are processed before stopping, so the checkpoint
+            # offsets never skip them
+            if self.exception or shutdown_event.is_set():
+                break
+
+        await self.save_checkpoint()
+
+    async def process_market_data(self, messages: list[dict]) -> None:
+        # Other intervals published by the DPU are handled by the units of
+        # those intervals, each one in its own group
+        messages = [
+            message
+            for message in messages
+            if message.get("interval", self.interval) == self.interval
+        ]
+
+        # New symbols are warmed up together on the candles stored before the
+        # first one consumed, the consumed ones are all processed
+        bounds = {}
+        for message in messages:
+            if message["symbol"] not in self.active_symbols:
+                timestamp = to_epoch_us(message["timestamp"])
+                bounds[message["symbol"]] = min(
+                    bounds.get(message["symbol"], timestamp), timestamp
+                )
+
+        if bounds:
+            await self.warm_up(bounds)
+
+        for message in messages:
+            if self.is_processed(message):
+                logging.info(f"Skipping processed candle => {message}")
+
+        messages = [message for message in messages if not self.is_processed(message)]
+        logging.info(f"Market Data => {messages}")
+
+        # Kafka never waits on the database, rows are written behind in batches
+        rows = []
+        publishes = []
+        for message, indicators_values in zip(
+            messages, self.calculate_indicators_batch(messages)
+        ):
+            logging.info(f"Update Database: {indicators_values}")
+            rows.append(
+                (
+                    message["timestamp"],
+                    message["symbol"],
+                    self.interval,
+                    indicators_values,
+                )
+            )
+
+            message["indicators"] = indicators_values
+            logging.info(f"Market Indicators => {message}")
+            publishes.append(self.kafka_client.publish_market_indicators(message))
+
+            self.last_timestamps[message["symbol"]] = to_epoch_us(message["timestamp"])
+
+        await asyncio.gather(*publishes)
+        await self.indicator_buffer.put(rows)
+
+    async def warm_up(self, bounds: dict[str, int]) -> None:
+        # Seeds the indicators of each symbol with the latest candles stored
+        # before its bound (epoch us), all the symbols read in one query
+        graphs = {symbol: copy.deepcopy(self.graph) for symbol in bounds}
+        history = await self.db_client.fetch_latest_candles(
+            {symbol: from_epoch_us(bound) for symbol, bound in bounds.items()},
+            self.interval,
+            self.warmup_candles,
+        )
+
+        for symbol, candles in history.items():
+            if len(candles["close"]):
+                graphs[symbol].calculate_ohlcv_batch(candles)
+                logging.info(f"Warmed up {symbol} with {len(candles['close'])} candles")
+            else:
+                logging.info(f"No history to warm up {symbol}")
+
+        for symbol, graph in graphs.items():
+            if self.engine:
+                self.engine.load_symbol(symbol, graph)
+            else:
+                self.graphs[symbol] = graph
+
+            self.active_symbols.add(symbol)
+
+    def drop_symbol(self, symbol: str) -> None:
+        logging.info(f"Dropping indicators of {symbol}")
+        self.active_symbols.discard(symbol)
+        self.graphs.pop(symbol, None)
+        self.last_timestamps.pop(symbol, None)
+        if self.engine:
+            self.engine.reset_symbol(symbol)
+
+    async def drop_revoked_symbols(self) -> None:
+        # Another instance owns these symbols now and will warm them up again
+        revoked = await self.kafka_client.pop_revoked()
+        if not revoked:
+            return
+
+        for symbol in list(self.active_symbols):
+            partition = await self.kafka_client.partition_for("market_data", symbol)
+            if ("market_data", partition) in revoked:
+                self.drop_symbol(symbol)
+
+    async def save_checkpoint(self) -> None:
+        state = {
+            "outputs": self.graph.outputs,
+            "graphs": self.graphs,
+            "engine": self.engine,
+            "active_symbols": self.active_symbols,
+            "last_timestamps": self.last_timestamps,
+        }
+        # Indicators of the consumed candles must be delivered and stored before
+        # their offsets are
+        await self.kafka_client.flush()
+        await self.indicator_buffer.flush()
+        self.checkpoint.save(state, await self.kafka_client.positions())
+        self.last_checkpoint = time.monotonic()
+
+    def restore_checkpoint(self) -> dict[tuple[str, int], int] | None:
+        # Returns the offsets to resume from, or None if there is nothing to restore
+        snapshot = self.checkpoint.load()
+
+        if snapshot is None:
+            return None
+
+        state, offsets = snapshot
+
+        engine = state["engine"]
+        if state["outputs"] != self.graph.outputs or (engine is None) != (
+            self.engine is None
+        ):
+            logging.warning("Checkpoint indicators do not match, ignoring it")
+            return None
+
+        self.graphs = state["graphs"]
+        self.engine = engine
+        self.active_symbols = state["active_symbols"]
+        self.last_timestamps = state["last_timestamps"]
+        logging.info(f"Restored checkpoint at offsets {offsets}")
+
+        return offsets
+
+    def is_processed(self, message: dict) -> bool:
+        # Candles processed by this unit can be consumed again, e.g. when their
+        # offsets were not committed before a restart
+        last_timestamp = self.last_timestamps.get(message.get("symbol"))
+        return last_timestamp is not None and (
+            to_epoch_us(message["timestamp"]) <= last_timestamp
+        )
+
+    def calculate_indicators_batch(self, messages: list[dict]) -> list[dict]:
+        if self.engine:
+            return self.engine.update(messages)
+
+        return [self.calculate_indicators(message) for message in messages]
 
     def calculate_indicators(self, message: dict) -> dict:
         indicators_values = {}
 
-        for indicator in self.indicators:
-            logging.info(f"Processing: {indicator}")
-            indicator_result = indicator.calculate(message)
+        # Each node of the graph is computed once, even if shared by many indicators
+        graph = self.graphs[message["symbol"]]
+        for indicator, indicator_result in graph.calculate(message).items():
             logging.info(f"Results: {indicator_result}")
             if indicator_result is not None:
                 logging.info(f"{indicator} => {indicator_result}")
-                if hasattr(indicator_result, "__iter"):
-                    for value in indicator_result:
-                        indicators_values[str(indicator)] = value
-                else:
-                    indicators_values[str(indicator)] = indicator_result
+                indicators_values[indicator] = indicator_result
 
         return indicators_values
 
@@ -79,7 +267,7 @@ async def main():
     await tau.run(shutdown_event)
 
     logging.info("Closing process...")
-    tau.close()
+    await tau.close()
 
 
 if __name__ == "__main__":
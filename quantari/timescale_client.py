@@ -1,9 +1,273 @@
-import json
 import logging
 import os
+from collections.abc import Iterator
+from contextlib import contextmanager
 from datetime import datetime
 
+import numpy as np
 import psycopg
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
+
+from quantari.timestamps import EPOCH, MICROSECOND, to_epoch_us
+
+
+def connection_kwargs() -> dict:
+    kwargs = {"autocommit": True}
+
+    # Queries stuck on a lock or a dead server are cancelled instead of
+    # blocking the unit
+    timeout = int(os.getenv("TIMESCALEDB_STATEMENT_TIMEOUT_MS", "30000"))
+    if timeout:
+        kwargs["options"] = f"-c statement_timeout={timeout}"
+
+    return kwargs
+
+
+def pool_kwargs() -> dict:
+    return {
+        "min_size": int(os.getenv("TIMESCALEDB_POOL_MIN_SIZE", "1")),
+        "max_size": int(os.getenv("TIMESCALEDB_POOL_MAX_SIZE", "4")),
+        "kwargs": connection_kwargs(),
+        "open": False,
+    }
+
+
+OHLCV = ["open", "high", "low", "close", "volume"]
+
+
+def candles_to_columns(rows: list[tuple]) -> dict[str, np.ndarray]:
+    columns = {
+        "timestamp": np.array([to_epoch_us(row[0]) for row in rows], dtype=np.int64)
+    }
+    for index, name in enumerate(OHLCV, 1):
+        columns[name] = np.array([row[index] for row in rows], dtype=np.float64)
+
+    return columns
+
+
+def latest_candles_params(
+    bounds: dict[str, str | datetime], interval: int, limit: int
+) -> tuple:
+    symbols = list(bounds)
+    return symbols, [bounds[symbol] for symbol in symbols], interval, limit
+
+
+def symbol_candles_to_columns(
+    rows: list[tuple], symbols: list[str]
+) -> dict[str, dict[str, np.ndarray]]:
+    # Rows start with the symbol, symbols without candles get empty columns
+    grouped = {symbol: [] for symbol in symbols}
+    for row in rows:
+        grouped[row[0]].append(row[1:])
+
+    return {symbol: candles_to_columns(grouped[symbol]) for symbol in symbols}
+
+
+# Binary COPY starts with a signature, flags and header extension length
+COPY_HEADER_SIZE = 19
+# Every candle of a binary COPY has the same layout, a field count and each
+# field prefixed by its length
+CANDLE_RECORD = np.dtype(
+    [("count", ">i2"), ("timestamp_size", ">i4"), ("timestamp", ">i8")]
+    + [field for name in OHLCV for field in [(f"{name}_size", ">i4"), (name, ">f8")]]
+)
+# Candles of several symbols also hold the position of their symbol, from 1
+SYMBOL_CANDLE_RECORD = np.dtype(
+    [
+        ("count", ">i2"),
+        ("timestamp_size", ">i4"),
+        ("timestamp", ">i8"),
+        ("symbol_size", ">i4"),
+        ("symbol", ">i4"),
+    ]
+    + [field for name in OHLCV for field in [(f"{name}_size", ">i4"), (name, ">f8")]]
+)
+# Binary timestamps count microseconds from 2000-01-01
+POSTGRES_EPOCH_US = (datetime(2000, 1, 1, tzinfo=EPOCH.tzinfo) - EPOCH) // MICROSECOND
+
+
+def records_to_columns(data: bytes, record: np.dtype = CANDLE_RECORD) -> dict:
+    records = np.frombuffer(data, dtype=record)
+
+    columns = {"timestamp": records["timestamp"].astype(np.int64) + POSTGRES_EPOCH_US}
+    for name in OHLCV:
+        columns[name] = records[name].astype(np.float64)
+
+    if "symbol" in record.names:
+        columns["symbol"] = records["symbol"].astype(np.int64)
+
+    return columns
+
+
+# Each migration brings the schema from the previous version, statements are
+# idempotent so tables created before the versioning are upgraded in place
+MIGRATIONS = [
+    [
+        "CREATE TABLE IF NOT EXISTS market_ochl ("
+        "timestamp TIMESTAMPTZ, "
+        "open FLOAT, "
+        "high FLOAT, "
+        "low FLOAT, "
+        "close FLOAT, "
+        "volume FLOAT, "
+        "symbol TEXT, "
+        "interval INTEGER, "
+        "indicators JSONB);",
+        "SELECT create_hypertable('market_ochl', 'timestamp', "
+        "chunk_time_interval => INTERVAL '1 day', if_not_exists => TRUE);",
+        "CREATE TABLE IF NOT EXISTS orders ("
+        "timestamp TIMESTAMPTZ, "
+        "id FLOAT UNIQUE, "
+        "signal_name TEXT UNIQUE, "
+        "action INT, "
+        "open_price FLOAT, "
+        "state INT, "
+        "pnl FLOAT, "
+        "close_price FLOAT"
+        ");",
+    ],
+    [
+        # Candles stored before the interval column are of the configured one,
+        # the key is enforced again once they are set and deduplicated
+        "ALTER TABLE market_ochl ADD COLUMN IF NOT EXISTS interval INTEGER;",
+        "DROP INDEX IF EXISTS market_ochl_symbol_interval_timestamp_idx;",
+        "UPDATE market_ochl SET interval = "
+        f"{int(os.getenv('INTERVAL_MINS', '1'))} WHERE interval IS NULL;",
+        "ALTER TABLE market_ochl ALTER COLUMN interval SET NOT NULL;",
+        # Only the last stored copy of a candle is kept
+        "DELETE FROM market_ochl AS duplicate USING market_ochl AS kept "
+        "WHERE duplicate.symbol = kept.symbol "
+        "AND duplicate.interval = kept.interval "
+        "AND duplicate.timestamp = kept.timestamp "
+        "AND duplicate.ctid < kept.ctid;",
+        # Key of the upserts, also serves the latest candles of a symbol
+        "CREATE UNIQUE INDEX market_ochl_symbol_interval_timestamp_idx "
+        "ON market_ochl (symbol, interval, timestamp DESC);",
+    ],
+    [
+        # Compressed chunks keep the candles of each symbol together
+        "ALTER TABLE market_ochl SET ("
+        "timescaledb.compress, "
+        "timescaledb.compress_segmentby = 'symbol, interval', "
+        "timescaledb.compress_orderby = 'timestamp DESC');",
+    ],
+    [
+        # Kraken transaction ids are strings
+        "ALTER TABLE orders ALTER COLUMN id TYPE TEXT USING id::TEXT;",
+    ],
+    [
+        # One row per indicator value, component 0 is a scalar and vectors are
+        # stored from 1, so indicator writes only append rows
+        "CREATE TABLE IF NOT EXISTS market_indicators ("
+        "timestamp TIMESTAMPTZ NOT NULL, "
+        "symbol TEXT NOT NULL, "
+        "interval INTEGER NOT NULL, "
+        "indicator TEXT NOT NULL, "
+        "component SMALLINT NOT NULL, "
+        "value DOUBLE PRECISION);",
+        "SELECT create_hypertable('market_indicators', 'timestamp', "
+        "chunk_time_interval => INTERVAL '1 day', if_not_exists => TRUE);",
+        "CREATE UNIQUE INDEX IF NOT EXISTS market_indicators_key_idx "
+        "ON market_indicators (symbol, interval, indicator, component, "
+        "timestamp DESC);",
+        "ALTER TABLE market_indicators SET ("
+        "timescaledb.compress, "
+        "timescaledb.compress_segmentby = 'symbol, interval, indicator', "
+        "timescaledb.compress_orderby = 'component, timestamp DESC');",
+        # Indicators stored in the candles JSONB are moved to the new table
+        "INSERT INTO market_indicators "
+        "SELECT candle.timestamp, candle.symbol, candle.interval, item.key, 0, "
+        "item.value::TEXT::DOUBLE PRECISION "
+        "FROM market_ochl AS candle, jsonb_each(candle.indicators) AS item "
+        "WHERE jsonb_typeof(item.value) = 'number' "
+        "UNION ALL "
+        "SELECT candle.timestamp, candle.symbol, candle.interval, item.key, "
+        "element.component, element.value::TEXT::DOUBLE PRECISION "
+        "FROM market_ochl AS candle, jsonb_each(candle.indicators) AS item, "
+        "jsonb_array_elements(item.value) WITH ORDINALITY "
+        "AS element (value, component) "
+        "WHERE jsonb_typeof(item.value) = 'array' "
+        "AND jsonb_typeof(element.value) = 'number' "
+        "ON CONFLICT DO NOTHING;",
+        "ALTER TABLE market_ochl DROP COLUMN IF EXISTS indicators;",
+        # Candles with their indicators in the JSON shape of the messages
+        "CREATE OR REPLACE VIEW market_ochl_indicators AS "
+        "SELECT candle.*, indicators.indicators FROM market_ochl AS candle "
+        "LEFT JOIN LATERAL ("
+        "SELECT jsonb_object_agg(item.indicator, item.value) AS indicators FROM ("
+        "SELECT indicator, CASE WHEN MAX(component) = 0 THEN to_jsonb(MAX(value)) "
+        "ELSE jsonb_agg(value ORDER BY component) END AS value "
+        "FROM market_indicators "
+        "WHERE market_indicators.symbol = candle.symbol "
+        "AND market_indicators.interval = candle.interval "
+        "AND market_indicators.timestamp = candle.timestamp "
+        "GROUP BY indicator"
+        ") AS item"
+        ") AS indicators ON TRUE;",
+    ],
+    [
+        # A strategy places orders on each symbol it evaluates
+        "ALTER TABLE orders ADD COLUMN IF NOT EXISTS symbol TEXT;",
+        "ALTER TABLE orders DROP CONSTRAINT IF EXISTS orders_signal_name_key;",
+        "CREATE UNIQUE INDEX IF NOT EXISTS orders_signal_name_symbol_idx "
+        "ON orders (signal_name, symbol);",
+    ],
+]
+
+HYPERTABLES = ["market_ochl", "market_indicators"]
+
+# Units starting together wait for the first one to migrate the schema
+LOCK_SCHEMA = "SELECT pg_advisory_xact_lock(hashtext('quantari_schema'));"
+CREATE_SCHEMA_VERSION = (
+    "CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL);"
+)
+SELECT_SCHEMA_VERSION = "SELECT COALESCE(MAX(version), 0) FROM schema_version;"
+INSERT_SCHEMA_VERSION = "INSERT INTO schema_version (version) VALUES (%s);"
+
+
+def migration_statements(version: int) -> list[tuple[str, tuple | None]]:
+    # Pending migrations of a schema at version, followed by the policies
+    statements = []
+    for number, migration in enumerate(MIGRATIONS[version:], version + 1):
+        logging.info(f"Migrating database schema to version {number}")
+        statements += [(statement, None) for statement in migration]
+        statements.append((INSERT_SCHEMA_VERSION, (number,)))
+
+    return statements + policy_statements()
+
+
+def policy_statements() -> list[tuple[str, tuple | None]]:
+    # Applied on every start, so they follow the configuration
+    chunk_interval = os.getenv("TIMESCALEDB_CHUNK_INTERVAL", "1 day")
+    compress_after = os.getenv("TIMESCALEDB_COMPRESS_AFTER", "7 days")
+    retention = os.getenv("TIMESCALEDB_RETENTION", "")
+
+    statements = []
+    for table in HYPERTABLES:
+        statements += [
+            (
+                f"SELECT set_chunk_time_interval('{table}', %s::INTERVAL);",
+                (chunk_interval,),
+            ),
+            (f"SELECT remove_compression_policy('{table}', if_exists => TRUE);", None),
+            (f"SELECT remove_retention_policy('{table}', if_exists => TRUE);", None),
+        ]
+        if compress_after:
+            statements.append(
+                (
+                    f"SELECT add_compression_policy('{table}', %s::INTERVAL);",
+                    (compress_after,),
+                )
+            )
+        if retention:
+            statements.append(
+                (
+                    f"SELECT add_retention_policy('{table}', %s::INTERVAL);",
+                    (retention,),
+                )
+            )
+
+    return statements
 
 
 class TimescaleClient:
@@ -15,161 +279,406 @@ class TimescaleClient:
         f"dbname={os.getenv('TIMESCALEDB_DB')}",
     ]
 
-    def __init__(self):
+    UPSERT_MARKET_DATA = (
+        "INSERT INTO market_ochl "
+        "(timestamp, open, high, low, close, volume, symbol, interval) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
+        "ON CONFLICT (symbol, interval, timestamp) DO UPDATE SET "
+        "open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low, "
+        "close = EXCLUDED.close, volume = EXCLUDED.volume;"
+    )
+
+    # Indicators of a candle processed again replace the stored ones
+    UPSERT_INDICATORS = (
+        "INSERT INTO market_indicators "
+        "(timestamp, symbol, interval, indicator, component, value) "
+        "VALUES (%s, %s, %s, %s, %s, %s) "
+        "ON CONFLICT (symbol, interval, indicator, component, timestamp) "
+        "DO UPDATE SET value = EXCLUDED.value;"
+    )
+
+    # Last candles of each symbol before its bound, from the oldest to the
+    # newest. A single statement for all the symbols, each one read backwards
+    # on the symbol index.
+    FETCH_LATEST_CANDLES = (
+        "SELECT bound.symbol, latest.timestamp, latest.open, latest.high, "
+        "latest.low, latest.close, latest.volume "
+        "FROM unnest(%s::TEXT[], %s::TIMESTAMPTZ[]) AS bound (symbol, timestamp) "
+        "CROSS JOIN LATERAL ("
+        "SELECT timestamp, open, high, low, close, volume FROM market_ochl "
+        "WHERE market_ochl.symbol = bound.symbol AND interval = %s "
+        "AND market_ochl.timestamp < bound.timestamp "
+        "ORDER BY market_ochl.timestamp DESC LIMIT %s"
+        ") AS latest ORDER BY bound.symbol, latest.timestamp;"
+    )
+
+    # Missing values are NaN so every record has the same size
+    COPY_CANDLES = (
+        "COPY (SELECT timestamp, "
+        + ", ".join(f"COALESCE({name}, 'NaN')" for name in OHLCV)
+        + " FROM market_ochl WHERE symbol = %s AND interval = %s "
+        "AND timestamp >= %s AND timestamp < %s ORDER BY timestamp) "
+        "TO STDOUT (FORMAT BINARY)"
+    )
+    COPY_SYMBOLS_CANDLES = (
+        "COPY (SELECT timestamp, array_position(%s::TEXT[], symbol), "
+        + ", ".join(f"COALESCE({name}, 'NaN')" for name in OHLCV)
+        + " FROM market_ochl WHERE symbol = ANY(%s) AND interval = %s "
+        "AND timestamp >= %s AND timestamp < %s ORDER BY 1, 2) "
+        "TO STDOUT (FORMAT BINARY)"
+    )
+
+    def __init__(self, pooled: bool | None = None):
         self.client = None
         self.cursor = None
+        self.pool = None
+        if pooled is None:
+            pooled = os.getenv("TIMESCALEDB_POOL", "false") == "true"
+        self.pooled = pooled
 
     def __del__(self) -> None:
         self.close_connection()
 
     def connect(self) -> None:
-        self.client = psycopg.connect(" ".join(self.DB_SETTINGS), autocommit=True)
+        if self.pooled:
+            # Connections are checked before use and replaced when broken
+            self.pool = ConnectionPool(
+                " ".join(self.DB_SETTINGS),
+                check=ConnectionPool.check_connection,
+                **pool_kwargs(),
+            )
+            self.pool.open(wait=True)
+            return
+
+        self.client = psycopg.connect(" ".join(self.DB_SETTINGS), **connection_kwargs())
         self.cursor = self.client.cursor()
 
     def close_connection(self) -> None:
+        if self.pool and not self.pool.closed:
+            self.pool.close()
+
         if self.client and not self.client.closed:
             self.cursor.close()
             self.client.close()
 
-    def create_market_table(self) -> None:
-        self.cursor.execute(
-            "SELECT EXISTS ("
-            "SELECT 1 FROM information_schema.tables "
-            "WHERE table_name = 'market_ochl'"
-            ");"
-        )
+    @contextmanager
+    def get_cursor(self):
+        # Pooled clients take a connection of the pool for each call
+        if self.pool is None:
+            yield self.cursor
+            return
 
-        if not self.cursor.fetchone()[0]:
-            logging.debug("Creating market_ochl table")
-            self.cursor.execute(
-                "CREATE TABLE market_ochl ("
-                "timestamp TIMESTAMPTZ, "
-                "open FLOAT, "
-                "high FLOAT, "
-                "low FLOAT, "
-                "close FLOAT, "
-                "volume FLOAT, "
-                "symbol TEXT, "
-                "indicators JSONB);"
-            )
-            self.cursor.execute("SELECT create_hypertable('market_ochl', 'timestamp');")
+        with self.pool.connection() as connection, connection.cursor() as cursor:
+            yield cursor
+
+    def migrate(self) -> None:
+        # The whole upgrade is applied or rolled back at once
+        with self.get_cursor() as cursor, cursor.connection.transaction():
+            cursor.execute(LOCK_SCHEMA)
+            cursor.execute(CREATE_SCHEMA_VERSION)
+            cursor.execute(SELECT_SCHEMA_VERSION)
+
+            for statement, params in migration_statements(cursor.fetchone()[0]):
+                cursor.execute(statement, params)
 
     def save_market_data(self, data: dict) -> None:
-        if not self.fetch_market_data(data["interval_begin"]):
-            logging.debug(f"Inserting new data into database: {data}")
-            self.insert_market_data(data)
-        else:
-            logging.debug(f"Updating existing data in database {data}")
-            self.update_market_data(data)
-
-    def insert_market_data(self, data: dict) -> None:
-        self.cursor.execute(
-            "INSERT INTO market_ochl "
-            "(timestamp, open, high, low, close, volume, symbol, indicators) "
-            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s);",
-            (
-                data["interval_begin"],
-                data["open"],
-                data["high"],
-                data["low"],
-                data["close"],
-                data["volume"],
-                data["symbol"],
-                "{}",
-            ),
-        )
+        logging.debug(f"Saving data into database: {data}")
+        with self.get_cursor() as cursor:
+            cursor.execute(self.UPSERT_MARKET_DATA, self.market_data_params(data))
 
-    def update_market_data(self, data: dict) -> None:
-        self.cursor.execute(
-            "UPDATE market_ochl "
-            "SET open = %s, high = %s, low = %s, close = %s, volume = %s "
-            "WHERE timestamp = %s AND symbol = %s;",
-            (
-                data["open"],
-                data["high"],
-                data["low"],
-                data["close"],
-                data["volume"],
-                data["interval_begin"],
-                data["symbol"],
-            ),
-        )
+    def save_market_data_many(self, rows: list[dict]) -> None:
+        # A single round trip for all the candles closed together
+        if not rows:
+            return
 
-    def fetch_market_data(self, timestamp: str) -> None:
-        self.cursor.execute(
-            "SELECT * FROM market_ochl WHERE timestamp = %s;", (timestamp,)
-        )
-        return self.cursor.fetchone()
+        logging.debug(f"Saving {len(rows)} candles into database")
+        with self.get_cursor() as cursor:
+            cursor.executemany(
+                self.UPSERT_MARKET_DATA,
+                [self.market_data_params(data) for data in rows],
+            )
 
-    def update_indicators(self, timestamp: str, indicators: dict) -> None:
-        self.cursor.execute(
-            "UPDATE market_ochl SET indicators = %s WHERE timestamp = %s;",
-            (json.dumps(indicators), timestamp),
+    @staticmethod
+    def market_data_params(data: dict) -> tuple:
+        return (
+            data["interval_begin"],
+            data["open"],
+            data["high"],
+            data["low"],
+            data["close"],
+            data["volume"],
+            data["symbol"],
+            data["interval"],
         )
 
-    def drop_table(self) -> None:
-        self.cursor.execute("DROP TABLE IF EXISTS market_ochl;")
-
-    def create_orders_table(self) -> None:
-        self.cursor.execute(
-            "SELECT EXISTS ("
-            "SELECT 1 FROM information_schema.tables "
-            "WHERE table_name = 'orders'"
-            ");"
-        )
+    @staticmethod
+    def indicators_params(rows: list[tuple[str, str, int, dict]]) -> list[tuple]:
+        # One row per value, missing values are not stored
+        params = []
+        for timestamp, symbol, interval, indicators in rows:
+            for name, value in indicators.items():
+                if isinstance(value, (list, tuple)):
+                    components = enumerate(value, 1)
+                else:
+                    components = [(0, value)]
+
+                params += [
+                    (timestamp, symbol, interval, name, component, component_value)
+                    for component, component_value in components
+                    if component_value is not None
+                ]
 
-        if not self.cursor.fetchone()[0]:
-            logging.debug("Creating orders table")
-            self.cursor.execute(
-                "CREATE TABLE orders ("
-                "timestamp TIMESTAMPTZ, "
-                "id FLOAT UNIQUE, "
-                "signal_name TEXT UNIQUE, "
-                "action INT, "
-                "open_price FLOAT, "
-                "state INT, "
-                "pnl FLOAT, "
-                "close_price FLOAT"
-                ");"
+        return params
+
+    def fetch_market_data(self, timestamp: str, symbol: str, interval: int) -> None:
+        with self.get_cursor() as cursor:
+            cursor.execute(
+                "SELECT * FROM market_ochl "
+                "WHERE timestamp = %s AND symbol = %s AND interval = %s;",
+                (timestamp, symbol, interval),
             )
+            return cursor.fetchone()
 
-    def fetch_order_by_signal(self, signal_name: str) -> dict:
-        self.cursor.execute(
-            "SELECT * FROM orders WHERE signal_name = %s", (signal_name,)
-        )
-        return self.cursor.fetchone()
+    def fetch_latest_candles(
+        self, bounds: dict[str, str | datetime], interval: int, limit: int
+    ) -> dict[str, dict[str, np.ndarray]]:
+        # Up to `limit` candles of each symbol before its bound (excluded)
+        with self.get_cursor() as cursor:
+            cursor.execute(
+                self.FETCH_LATEST_CANDLES,
+                latest_candles_params(bounds, interval, limit),
+            )
+            return symbol_candles_to_columns(cursor.fetchall(), list(bounds))
+
+    def fetch_candles(
+        self,
+        symbol: str,
+        start: str | datetime,
+        end: str | datetime,
+        interval: int,
+    ) -> dict[str, np.ndarray]:
+        # Candles from start (included) to end (excluded) as column arrays
+        chunks = list(self.iter_candles(symbol, start, end, interval))
+        if not chunks:
+            return candles_to_columns([])
+
+        return {
+            name: np.concatenate([chunk[name] for chunk in chunks])
+            for name in chunks[0]
+        }
+
+    def iter_candles(
+        self,
+        symbol: str,
+        start: str | datetime,
+        end: str | datetime,
+        interval: int,
+        chunk_size: int = 100_000,
+    ) -> Iterator[dict[str, np.ndarray]]:
+        # Streams the candles as column arrays of chunk_size rows, parsed from
+        # the binary COPY without building a tuple per row
+        params = (symbol, interval, start, end)
+        for data in self.copy_records(
+            self.COPY_CANDLES, params, CANDLE_RECORD, chunk_size
+        ):
+            yield records_to_columns(data)
+
+    def iter_symbols_candles(
+        self,
+        symbols: list[str],
+        start: str | datetime,
+        end: str | datetime,
+        interval: int,
+        chunk_size: int = 100_000,
+    ) -> Iterator[dict[str, np.ndarray]]:
+        # Candles of all the symbols in time order from a single COPY, the
+        # connection of a client only runs one COPY at a time
+        names = np.array(symbols, dtype=object)
+        params = (symbols, symbols, interval, start, end)
+        for data in self.copy_records(
+            self.COPY_SYMBOLS_CANDLES, params, SYMBOL_CANDLE_RECORD, chunk_size
+        ):
+            columns = records_to_columns(data, SYMBOL_CANDLE_RECORD)
+            columns["symbol"] = names[columns["symbol"] - 1]
+            yield columns
+
+    def copy_records(
+        self, query: str, params: tuple, record: np.dtype, chunk_size: int
+    ) -> Iterator[bytes]:
+        # Records of a binary COPY in blocks of chunk_size
+        chunk_bytes = chunk_size * record.itemsize
+        buffer = bytearray()
+        header = True
+
+        with self.get_cursor() as cursor, cursor.copy(query, params) as copy:
+            for data in copy:
+                buffer += data
+
+                if header:
+                    if len(buffer) < COPY_HEADER_SIZE:
+                        continue
+                    del buffer[:COPY_HEADER_SIZE]
+                    header = False
+
+                while len(buffer) >= chunk_bytes:
+                    yield bytes(buffer[:chunk_bytes])
+                    del buffer[:chunk_bytes]
+
+        # Only the end of data marker is left after the last candle
+        rows = len(buffer) // record.itemsize
+        if rows:
+            yield bytes(buffer[: rows * record.itemsize])
+
+    def save_indicators(
+        self, timestamp: str, symbol: str, interval: int, indicators: dict
+    ) -> None:
+        self.save_indicators_many([(timestamp, symbol, interval, indicators)])
+
+    def save_indicators_many(self, rows: list[tuple[str, str, int, dict]]) -> None:
+        # Rows are (timestamp, symbol, interval, indicators), one round trip
+        params = self.indicators_params(rows)
+        if not params:
+            return
+
+        with self.get_cursor() as cursor:
+            cursor.executemany(self.UPSERT_INDICATORS, params)
+
+    def drop_table(self) -> None:
+        # The schema is created again by the next migration
+        with self.get_cursor() as cursor:
+            cursor.execute(
+                "DROP TABLE IF EXISTS market_ochl, market_indicators, schema_version "
+                "CASCADE;"
+            )
+
+    def fetch_order_by_signal(self, signal_name: str, symbol: str) -> dict:
+        with self.get_cursor() as cursor:
+            cursor.execute(
+                "SELECT * FROM orders WHERE signal_name = %s AND symbol = %s",
+                (signal_name, symbol),
+            )
+            return cursor.fetchone()
 
     def insert_order(self, order: dict) -> None:
         timestamp = datetime.isoformat(datetime.now())
 
-        self.cursor.execute(
-            "INSERT INTO orders "
-            "(timestamp, id, signal_name, action, open_price, state, pnl, close_price)"
-            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s);",
-            (
-                timestamp,
-                order.id,
-                order.signal_name,
-                order.action,
-                order.open_price,
-                order.state,
-                order.pnl,
-                order.close_price,
-            ),
-        )
+        with self.get_cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO orders "
+                "(timestamp, id, signal_name, symbol, action, open_price, state, pnl, "
+                "close_price) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s);",
+                (
+                    timestamp,
+                    order.id,
+                    order.signal_name,
+                    order.symbol,
+                    order.action,
+                    order.open_price,
+                    order.state,
+                    order.pnl,
+                    order.close_price,
+                ),
+            )
 
     def update_order(self, order: dict) -> None:
-        self.cursor.execute(
-            "UPDATE orders "
-            "SET action = %s open_price = %s state = %s pnl = %s close_price = %s "
-            "WHERE id = %s AND signal_name = %s;",
-            (
-                order.action,
-                order.open_price,
-                order.state,
-                order.pnl,
-                order.close_price,
-                order.id,
-                order.signal_name,
-            ),
+        with self.get_cursor() as cursor:
+            cursor.execute(
+                "UPDATE orders "
+                "SET action = %s open_price = %s state = %s pnl = %s close_price = %s "
+                "WHERE id = %s AND signal_name = %s AND symbol = %s;",
+                (
+                    order.action,
+                    order.open_price,
+                    order.state,
+                    order.pnl,
+                    order.close_price,
+                    order.id,
+                    order.signal_name,
+                    order.symbol,
+                ),
+            )
+
+
+class AsyncTimescaleClient:
+    # Market data queries of TimescaleClient on psycopg.AsyncConnection from a
+    # pool, statements of a unit run concurrently and never block its event loop
+
+    def __init__(self):
+        self.pool = None
+
+    async def connect(self) -> None:
+        # Connections are checked before use and replaced when broken
+        self.pool = AsyncConnectionPool(
+            " ".join(TimescaleClient.DB_SETTINGS),
+            check=AsyncConnectionPool.check_connection,
+            **pool_kwargs(),
+        )
+        await self.pool.open(wait=True)
+
+    async def close_connection(self) -> None:
+        if self.pool and not self.pool.closed:
+            await self.pool.close()
+
+    async def run(self, function):
+        # Statements are idempotent, one dropped by a lost connection is retried
+        # once on another connection of the pool
+        for attempt in range(2):
+            try:
+                async with self.pool.connection() as connection:
+                    async with connection.cursor() as cursor:
+                        return await function(cursor)
+            except psycopg.OperationalError as error:
+                if attempt:
+                    raise
+                logging.warning(f"Retrying database statement: {error}")
+
+    async def migrate(self) -> None:
+        async def migrate(cursor):
+            async with cursor.connection.transaction():
+                await cursor.execute(LOCK_SCHEMA)
+                await cursor.execute(CREATE_SCHEMA_VERSION)
+                await cursor.execute(SELECT_SCHEMA_VERSION)
+
+                version = (await cursor.fetchone())[0]
+                for statement, params in migration_statements(version):
+                    await cursor.execute(statement, params)
+
+        await self.run(migrate)
+
+    async def save_market_data(self, data: dict) -> None:
+        await self.save_market_data_many([data])
+
+    async def save_market_data_many(self, rows: list[dict]) -> None:
+        if not rows:
+            return
+
+        logging.debug(f"Saving {len(rows)} candles into database")
+        params = [TimescaleClient.market_data_params(data) for data in rows]
+        await self.run(
+            lambda cursor: cursor.executemany(
+                TimescaleClient.UPSERT_MARKET_DATA, params
+            )
+        )
+
+    async def fetch_latest_candles(
+        self, bounds: dict[str, str | datetime], interval: int, limit: int
+    ) -> dict[str, dict[str, np.ndarray]]:
+        async def fetch(cursor):
+            await cursor.execute(
+                TimescaleClient.FETCH_LATEST_CANDLES,
+                latest_candles_params(bounds, interval, limit),
+            )
+            return await cursor.fetchall()
+
+        return symbol_candles_to_columns(await self.run(fetch), list(bounds))
+
+    async def save_indicators_many(
+        self, rows: list[tuple[str, str, int, dict]]
+    ) -> None:
+        params = TimescaleClient.indicators_params(rows)
+        if not params:
+            return
+
+        await self.run(
+            lambda cursor: cursor.executemany(TimescaleClient.UPSERT_INDICATORS, params)
         )
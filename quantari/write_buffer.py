@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from collections.abc import Awaitable, Callable
+
+BLOCK = "block"
+DROP = "drop"
+
+
+class WriteBuffer:
+    def __init__(self, write_many: Callable[[list], Awaitable], name: str):
+        # Rows are written in batches on a background task, so the callers
+        # never wait on the database unless the buffer is full
+        self.write_many = write_many
+        self.name = name
+        self.max_size = int(os.getenv("TIMESCALEDB_BUFFER_SIZE", "100000"))
+        self.batch_size = int(os.getenv("TIMESCALEDB_BATCH_SIZE", "500"))
+        self.flush_interval = int(os.getenv("TIMESCALEDB_FLUSH_INTERVAL_MS", "1000"))
+        self.retries = int(os.getenv("TIMESCALEDB_WRITE_RETRIES", "3"))
+        # Full buffer either blocks the callers or drops the oldest rows
+        self.policy = os.getenv("TIMESCALEDB_BUFFER_POLICY", BLOCK)
+        if self.policy not in (BLOCK, DROP):
+            raise ValueError(f"Unknown buffer policy {self.policy}")
+
+        self.rows = deque()
+        self.ready = asyncio.Event()
+        self.space = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.task = None
+        self.closing = False
+        self.dropped = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self.run())
+
+    async def put(self, rows: list) -> None:
+        for row in rows:
+            while len(self.rows) >= self.max_size:
+                if self.policy == DROP:
+                    self.rows.popleft()
+                    self.dropped += 1
+                    logging.warning(f"{self.name} buffer full, dropped oldest row")
+                else:
+                    self.space.clear()
+                    await self.space.wait()
+
+            self.rows.append(row)
+
+        if len(self.rows) >= self.batch_size:
+            self.ready.set()
+
+    async def run(self) -> None:
+        while not self.closing:
+            try:
+                await asyncio.wait_for(self.ready.wait(), self.flush_interval / 1000)
+            except TimeoutError:
+                pass
+
+            self.ready.clear()
+            await self.drain()
+
+    def check(self) -> None:
+        # Rows dropped or discarded are lost, the callers must not commit the
+        # offsets or checkpoint of the messages they came from
+        if self.dropped or self.failed:
+            raise RuntimeError(
+                f"{self.dropped + self.failed} {self.name} rows were not written"
+            )
+
+    async def flush(self) -> None:
+        await self.drain()
+        self.check()
+
+    async def drain(self) -> None:
+        # Writes every buffered row, including a batch already being written
+        async with self.lock:
+            while self.rows:
+                batch = [
+                    self.rows.popleft()
+                    for _ in range(min(self.batch_size, len(self.rows)))
+                ]
+                self.space.set()
+                if await self.write(batch):
+                    continue
+
+                # Blocking keeps the batch and retries it, the callers are
+                # held back once the buffer fills up again
+                if self.policy == BLOCK and not self.closing:
+                    self.rows.extendleft(reversed(batch))
+                    continue
+
+                self.failed += len(batch)
+                logging.error(f"Discarded {len(batch)} {self.name} rows after retries")
+
+    async def write(self, batch: list) -> bool:
+        for attempt in range(self.retries + 1):
+            try:
+                await self.write_many(batch)
+                return True
+            except Exception as e:
+                logging.warning(f"Unable to write {self.name} (attempt {attempt}): {e}")
+                await asyncio.sleep(0.1 * 2**attempt)
+
+        return False
+
+    async def close(self) -> None:
+        # Final drain, nothing buffered is lost on a clean stop
+        self.closing = True
+        self.ready.set()
+        if self.task:
+            await self.task
+        await self.drain()
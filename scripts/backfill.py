@@ -0,0 +1,24 @@
+import argparse
+import os
+
+from quantari.backfill import Backfill
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Load historical candles from CSV or Parquet files into market_ochl"
+    )
+    parser.add_argument("paths", nargs="+", help="files sorted by symbol and time")
+    parser.add_argument("--symbol", help="symbol of files without a symbol column")
+    parser.add_argument(
+        "--interval", type=int, default=int(os.getenv("INTERVAL_MINS", "1"))
+    )
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-days", type=int, default=30)
+    args = parser.parse_args()
+
+    backfill = Backfill(args.interval, args.workers, args.chunk_days)
+    backfill.connect()
+    try:
+        backfill.run(args.paths, args.symbol)
+    finally:
+        backfill.close()
@@ -0,0 +1,47 @@
+import argparse
+import os
+
+from quantari.backtest import Backtest, read_candle_file
+from quantari.candle_cache import CandleCache
+from quantari.strategies import SimpleMACD
+from quantari.timescale_client import TimescaleClient
+from quantari.timestamps import to_epoch_us
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest SimpleMACD on candles")
+    parser.add_argument("symbol")
+    parser.add_argument("start")
+    parser.add_argument("end")
+    parser.add_argument(
+        "--interval", type=int, default=int(os.getenv("INTERVAL_MINS", "1"))
+    )
+    parser.add_argument("--file", help="CSV or Parquet file instead of market_ochl")
+    parser.add_argument("--cache", action="store_true", help="read the candle cache")
+    parser.add_argument("--fee", type=float, default=0.0026)
+    parser.add_argument("--slippage", type=float, default=0.0005)
+    args = parser.parse_args()
+
+    start, end = to_epoch_us(args.start), to_epoch_us(args.end)
+
+    if args.file:
+        candles = read_candle_file(args.file, args.symbol)
+        selected = (candles["timestamp"] >= start) & (candles["timestamp"] < end)
+        candles = {name: column[selected] for name, column in candles.items()}
+    elif args.cache:
+        candles = CandleCache().read(args.symbol, args.interval, start, end)
+    else:
+        db_client = TimescaleClient()
+        db_client.connect()
+        candles = db_client.fetch_candles(
+            args.symbol, args.start, args.end, args.interval
+        )
+        db_client.close_connection()
+
+    strategy = SimpleMACD()
+    backtest = Backtest(
+        strategy, strategy.indicators(), fee=args.fee, slippage=args.slippage
+    )
+    result = backtest.run(candles)
+
+    for name, value in result.stats.items():
+        print(f"{name}: {value}")
@@ -0,0 +1,50 @@
+import timeit
+
+from quantari.serialization import CODECS, decode
+
+MARKET_DATA = {
+    "symbol": "BTC/USD",
+    "timestamp": "2023-01-01T00:01:00.000000Z",
+    "interval": 1,
+    "open": 16500.1,
+    "high": 16510.4,
+    "low": 16490.2,
+    "close": 16505.3,
+    "volume": 12.34567,
+}
+
+MARKET_INDICATORS = dict(
+    MARKET_DATA,
+    indicators={
+        "SMA_50": 16480.123456,
+        "EMA_12": 16502.654321,
+        "MACD_12_26_9": [3.14159, 2.71828],
+        "BB_20_2": [16530.1, 16500.2, 16470.3],
+        "RSI_14": 55.5,
+    },
+)
+
+SIGNALS = {"SimpleMACD": 1}
+
+MESSAGES = {
+    "market_data": MARKET_DATA,
+    "market_indicators": MARKET_INDICATORS,
+    "signals": SIGNALS,
+}
+
+if __name__ == "__main__":
+    number = 100_000
+
+    for topic, value in MESSAGES.items():
+        for name, codec in CODECS.items():
+            codec = codec()
+            data = codec.encode(topic, value)
+
+            encode = timeit.timeit(lambda: codec.encode(topic, value), number=number)
+            decode_time = timeit.timeit(lambda: decode(data), number=number)
+
+            print(
+                f"{topic:<18} {name:<7} {len(data):>4} bytes "
+                f"encode {encode / number * 1e6:6.2f} us "
+                f"decode {decode_time / number * 1e6:6.2f} us"
+            )
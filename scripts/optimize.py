@@ -0,0 +1,75 @@
+import argparse
+import os
+
+from quantari.backtest import read_candle_file
+from quantari.candle_cache import CandleCache
+from quantari.optimizer import Optimizer, grid, random_search, walk_forward_splits
+from quantari.timescale_client import TimescaleClient
+from quantari.timestamps import to_epoch_us
+
+
+def values(text: str) -> list[int]:
+    # "start:stop:step" range or comma separated values
+    if ":" in text:
+        return list(range(*(int(value) for value in text.split(":"))))
+    return [int(value) for value in text.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search the SimpleMACD periods")
+    parser.add_argument("symbol")
+    parser.add_argument("start")
+    parser.add_argument("end")
+    parser.add_argument(
+        "--interval", type=int, default=int(os.getenv("INTERVAL_MINS", "1"))
+    )
+    parser.add_argument("--file", help="CSV or Parquet file instead of market_ochl")
+    parser.add_argument("--cache", action="store_true", help="read the candle cache")
+    parser.add_argument("--fast", type=values, default=values("4:20:2"))
+    parser.add_argument("--slow", type=values, default=values("20:60:5"))
+    parser.add_argument("--signal", type=values, default=values("5,7,9,11"))
+    parser.add_argument("--random", type=int, help="number of random combinations")
+    parser.add_argument("--metric", default="sharpe")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument(
+        "--walk-forward", nargs=2, type=int, metavar=("TRAIN", "TEST"), help="candles"
+    )
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    start, end = to_epoch_us(args.start), to_epoch_us(args.end)
+
+    if args.file:
+        candles = read_candle_file(args.file, args.symbol)
+        selected = (candles["timestamp"] >= start) & (candles["timestamp"] < end)
+        candles = {name: column[selected] for name, column in candles.items()}
+    elif args.cache:
+        candles = CandleCache().read(args.symbol, args.interval, start, end)
+    else:
+        db_client = TimescaleClient()
+        db_client.connect()
+        candles = db_client.fetch_candles(
+            args.symbol, args.start, args.end, args.interval
+        )
+        db_client.close_connection()
+
+    space = {"fast": args.fast, "slow": args.slow, "signal": args.signal}
+    parameters = random_search(space, args.random) if args.random else grid(space)
+    optimizer = Optimizer(metric=args.metric, workers=args.workers)
+
+    if args.walk_forward:
+        train, test = args.walk_forward
+        splits = walk_forward_splits(len(candles["timestamp"]), train, test)
+        for result in optimizer.walk_forward(candles, parameters, splits):
+            print(
+                f"{result['start']} {result['params']} "
+                f"train {args.metric}={result['train'][args.metric]:.3f} "
+                f"test {args.metric}={result['test'][args.metric]:.3f}"
+            )
+    else:
+        for row in optimizer.search(candles, parameters):
+            print(row)
+
+        print(f"Top {args.top} by {args.metric}:")
+        for row in optimizer.table[: args.top]:
+            print(row)
@@ -0,0 +1,46 @@
+import argparse
+import os
+
+from quantari.replay import Replay, database_messages, file_messages
+from quantari.timescale_client import TimescaleClient
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Replay historical candles to market_data and report the lag",
+        epilog="KAFKA_GROUP_ID_<UNIT> runs the units in groups apart from the live "
+        "ones.",
+    )
+    parser.add_argument("symbols", nargs="*", help="symbols read from market_ochl")
+    parser.add_argument("--start", default="1970-01-01T00:00:00+00:00")
+    parser.add_argument("--end", default="9999-12-31T00:00:00+00:00")
+    parser.add_argument(
+        "--interval", type=int, default=int(os.getenv("INTERVAL_MINS", "1"))
+    )
+    parser.add_argument("--file", nargs="+", help="CSV or Parquet files instead")
+    parser.add_argument("--symbol", help="symbol of files without a symbol column")
+    parser.add_argument(
+        "--speed", type=float, default=0, help="1 for real time, 0 as fast as possible"
+    )
+    parser.add_argument("--drain-timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    db_client = None
+    if args.file:
+        messages = file_messages(args.file, args.interval, args.symbol)
+    else:
+        db_client = TimescaleClient()
+        db_client.connect()
+        messages = database_messages(
+            db_client, args.symbols, args.start, args.end, args.interval
+        )
+
+    replay = Replay(args.speed)
+    replay.connect()
+    try:
+        replay.run(messages)
+        replay.drain(args.drain_timeout)
+        replay.report()
+    finally:
+        replay.close()
+        if db_client:
+            db_client.close_connection()
@@ -0,0 +1,27 @@
+import argparse
+import os
+from datetime import datetime, timezone
+
+from quantari.candle_cache import CandleCache
+from quantari.timescale_client import TimescaleClient
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Append the new candles of market_ochl to the local candle cache"
+    )
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument(
+        "--interval", type=int, default=int(os.getenv("INTERVAL_MINS", "1"))
+    )
+    parser.add_argument("--start", default="1970-01-01T00:00:00+00:00")
+    parser.add_argument("--end", default=datetime.now(timezone.utc).isoformat())
+    args = parser.parse_args()
+
+    db_client = TimescaleClient()
+    db_client.connect()
+
+    cache = CandleCache()
+    for symbol in args.symbols:
+        cache.update(db_client, symbol, args.interval, args.start, args.end)
+
+    db_client.close_connection()
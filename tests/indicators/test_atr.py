@@ -0,0 +1,51 @@
+import numpy as np
+from pytest import approx
+
+from quantari.indicators import ATR
+
+
+def candles(count):
+    rng = np.random.default_rng(7)
+    close = rng.uniform(90, 110, count)
+    return {
+        "high": close + rng.uniform(0, 5, count),
+        "low": close - rng.uniform(0, 5, count),
+        "close": close,
+    }
+
+
+def test_atr():
+    atr = ATR(period=2)
+
+    assert atr.calculate({"high": 12, "low": 8, "close": 10}) is None
+
+    # True range uses the previous close: max(3, |13 - 10|, |10 - 10|) = 3
+    assert atr.calculate({"high": 13, "low": 10, "close": 12}) == approx(3.5)
+
+    # Wilder smoothing: (3.5 + max(2, |20 - 12|, |18 - 12|)) / 2
+    assert atr.calculate({"high": 20, "low": 18, "close": 19}) == approx(5.75)
+
+    # None if any of high/low/close is missing
+    assert atr.calculate({"close": 10}) is None
+
+    # __str__
+    assert str(atr) == "ATR_2"
+
+
+def test_atr_batch_matches_streaming():
+    data = candles(500)
+    rows = [dict(zip(data, values)) for values in zip(*data.values())]
+
+    streaming = ATR()
+    expected = [streaming.calculate(row) for row in rows]
+
+    atr = ATR()
+    first = atr.calculate_ohlcv_batch({key: value[:7] for key, value in data.items()})
+    rest = atr.calculate_ohlcv_batch({key: value[7:] for key, value in data.items()})
+    result = np.concatenate((first, rest))
+
+    assert np.isnan(result[:13]).all()
+    assert result[13:] == approx(expected[13:], rel=1e-9)
+
+    candle = {"high": 105, "low": 95, "close": 100}
+    assert atr.calculate(candle) == approx(streaming.calculate(candle), rel=1e-9)
@@ -0,0 +1,39 @@
+import numpy as np
+from pytest import approx
+
+from quantari.indicators import BollingerBands
+
+
+def test_bollinger_bands():
+    bands = BollingerBands(period=3)
+
+    assert bands.calculate({"close": 10}) is None
+    assert bands.calculate({"close": 12}) is None
+
+    std = np.std([10, 12, 14])
+    assert bands.calculate({"close": 14}) == approx([12 + 2 * std, 12, 12 - 2 * std])
+
+    # None if no close
+    assert bands.calculate({}) is None
+
+    # __str__
+    assert str(bands) == "BB_3_2"
+
+
+def test_bollinger_bands_batch_matches_streaming():
+    closes = np.random.default_rng(7).uniform(90, 110, 500)
+
+    streaming = BollingerBands()
+    expected = [streaming.calculate({"close": close}) for close in closes]
+
+    bands = BollingerBands()
+    result = np.concatenate(
+        (bands.calculate_batch(closes[:10]), bands.calculate_batch(closes[10:]))
+    )
+
+    assert np.isnan(result[:19]).all()
+    assert result[19:] == approx(np.array(expected[19:]), rel=1e-9)
+
+    assert bands.calculate({"close": 100}) == approx(
+        streaming.calculate({"close": 100}), rel=1e-9
+    )
@@ -0,0 +1,43 @@
+import numpy as np
+from pytest import approx
+
+from quantari.indicators import DonchianChannels
+
+
+def test_donchian_channels():
+    channels = DonchianChannels(period=2)
+
+    assert channels.calculate({"high": 12, "low": 8}) is None
+    assert channels.calculate({"high": 11, "low": 9}) == approx([12, 10, 8])
+    assert channels.calculate({"high": 10, "low": 9.5}) == approx([11, 10, 9])
+
+    # None if high or low are missing
+    assert channels.calculate({"close": 10}) is None
+
+    # __str__
+    assert str(channels) == "DC_2"
+
+
+def test_donchian_channels_batch_matches_streaming():
+    rng = np.random.default_rng(7)
+    close = rng.uniform(90, 110, 500)
+    data = {"high": close + rng.uniform(0, 5, 500), "low": close - 5}
+    rows = [dict(zip(data, values)) for values in zip(*data.values())]
+
+    streaming = DonchianChannels()
+    expected = [streaming.calculate(row) for row in rows]
+
+    channels = DonchianChannels()
+    first = channels.calculate_ohlcv_batch(
+        {key: value[:9] for key, value in data.items()}
+    )
+    rest = channels.calculate_ohlcv_batch(
+        {key: value[9:] for key, value in data.items()}
+    )
+    result = np.concatenate((first, rest))
+
+    assert np.isnan(result[:19]).all()
+    assert result[19:] == approx(np.array(expected[19:]))
+
+    candle = {"high": 120, "low": 80}
+    assert channels.calculate(candle) == approx(streaming.calculate(candle))
@@ -1,3 +1,4 @@
+import numpy as np
 from pytest import approx
 
 from quantari.indicators import EMA
@@ -15,3 +16,38 @@ def test_ema_basic():
 
     # __str__
     assert str(ema) == "EMA_3"
+
+
+def test_ema_batch_matches_streaming():
+    closes = np.random.default_rng(7).uniform(90, 110, 1000)
+
+    streaming = EMA(period=20)
+    expected = [streaming.calculate({"close": close}) for close in closes]
+
+    ema = EMA(period=20)
+    assert ema.calculate_batch(closes) == approx(expected, rel=1e-12)
+
+    # Final state is handed over to the streaming path
+    assert ema.last_ema == approx(streaming.last_ema, rel=1e-12)
+    assert ema.calculate({"close": 100}) == approx(
+        streaming.calculate({"close": 100}), rel=1e-12
+    )
+
+
+def test_ema_batch_continues_from_state():
+    closes = np.random.default_rng(7).uniform(90, 110, 600)
+
+    streaming = EMA(period=5)
+    expected = [streaming.calculate({"close": close}) for close in closes]
+
+    ema = EMA(period=5)
+    ema.calculate_batch(closes[:300])
+    assert ema.calculate_ohlcv_batch({"close": closes[300:]}) == approx(
+        expected[300:], rel=1e-12
+    )
+
+
+def test_ema_batch_empty():
+    ema = EMA(period=3)
+    assert len(ema.calculate_batch(np.array([]))) == 0
+    assert ema.last_ema == 0
@@ -0,0 +1,35 @@
+import pytest
+
+from quantari.indicators import Indicator, IndicatorGraph
+
+
+class Incomplete(Indicator):
+    name = "Incomplete"
+
+    def key(self) -> tuple:
+        return ("Incomplete",)
+
+
+class UpdateOnly(Indicator):
+    name = "UpdateOnly"
+
+    def key(self) -> tuple:
+        return ("UpdateOnly",)
+
+    def update(self, message: dict, values: dict) -> float:
+        return message["close"] * 2
+
+
+def test_calculate_not_implemented():
+    with pytest.raises(NotImplementedError, match="Incomplete"):
+        Incomplete().calculate({"close": 1.0})
+
+    with pytest.raises(NotImplementedError, match="Incomplete"):
+        IndicatorGraph([Incomplete()]).calculate({"close": 1.0})
+
+
+def test_update_only():
+    assert UpdateOnly().calculate({"close": 2.0}) == 4.0
+    assert IndicatorGraph([UpdateOnly()]).calculate({"close": 2.0}) == {
+        "UpdateOnly": 4.0
+    }
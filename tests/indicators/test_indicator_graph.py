@@ -0,0 +1,76 @@
+import numpy as np
+from pytest import approx
+
+from quantari.indicators import EMA, MACD, SMA, IndicatorGraph
+
+
+def test_shared_nodes():
+    macd = MACD()
+    ema = EMA(26)
+    graph = IndicatorGraph([SMA(), macd, ema, EMA(12, name="EMA_fast")])
+
+    # EMA(close, 12) and EMA(close, 26) are shared with the MACD
+    assert list(graph.nodes) == [
+        ("SMA", "close", 50),
+        ("EMA", "close", 12),
+        ("EMA", "close", 26),
+        ("MACD", 12, 26, 9),
+    ]
+    assert graph.nodes[("EMA", "close", 26)] is macd.slow_ema
+    assert graph.dependencies(("MACD", 12, 26, 9)) == [
+        ("EMA", "close", 12),
+        ("EMA", "close", 26),
+    ]
+
+    assert graph.describe() == [
+        "SMA(close, 50) <- []",
+        "EMA(close, 12) <- []",
+        "EMA(close, 26) <- []",
+        "MACD(12, 26, 9) <- [EMA(close, 12), EMA(close, 26)]",
+    ]
+    assert str(graph) == "\n".join(graph.describe())
+
+
+def test_calculate_matches_standalone_indicators():
+    closes = np.random.default_rng(7).uniform(90, 110, 100)
+
+    standalone = [MACD(), EMA(26), EMA(12, name="EMA_fast")]
+    graph = IndicatorGraph([MACD(), EMA(26), EMA(12, name="EMA_fast")])
+
+    for close in closes:
+        values = graph.calculate({"close": close})
+
+        for indicator in standalone:
+            expected = indicator.calculate({"close": close})
+            assert values[str(indicator)] == approx(expected)
+
+
+def test_each_node_is_computed_once():
+    graph = IndicatorGraph([MACD(), EMA(12), EMA(26)])
+
+    values = graph.calculate({"close": 10})
+
+    # A shared EMA advanced twice per candle would not be the first EMA value
+    assert values["EMA_12"] == approx(10 * 2 / 13)
+    assert values["EMA_26"] == approx(10 * 2 / 27)
+
+
+def test_calculate_ohlcv_batch_matches_streaming():
+    closes = np.random.default_rng(7).uniform(90, 110, 300)
+
+    streaming = IndicatorGraph([MACD(), EMA(12), SMA(20)])
+    expected = [streaming.calculate({"close": close}) for close in closes]
+
+    graph = IndicatorGraph([MACD(), EMA(12), SMA(20)])
+    values = graph.calculate_ohlcv_batch({"close": closes})
+
+    assert values["EMA_12"] == approx([row["EMA_12"] for row in expected])
+    assert values["MACD_12_26_9"] == approx(
+        np.array([row["MACD_12_26_9"] for row in expected])
+    )
+    assert values["SMA_20"][19:] == approx([row["SMA_20"] for row in expected[19:]])
+
+    # State is shared with the streaming path afterwards
+    values = graph.calculate({"close": 100})
+    for name, expected in streaming.calculate({"close": 100}).items():
+        assert values[name] == approx(expected)
@@ -1,3 +1,4 @@
+import numpy as np
 from pytest import approx
 
 from quantari.indicators import MACD
@@ -18,3 +19,21 @@ def test_macd():
 
     # __str__
     assert str(macd) == "MACD_2_3_2"
+
+
+def test_macd_batch_matches_streaming():
+    closes = np.random.default_rng(7).uniform(90, 110, 1000)
+
+    streaming = MACD()
+    expected = [streaming.calculate({"close": close}) for close in closes]
+
+    macd = MACD()
+    result = macd.calculate_batch(closes)
+
+    assert result.shape == (1000, 2)
+    assert result[:, 0] == approx([row[0] for row in expected], rel=1e-9, abs=1e-9)
+    assert result[:, 1] == approx([row[1] for row in expected], rel=1e-9, abs=1e-9)
+
+    assert macd.calculate({"close": 100}) == approx(
+        streaming.calculate({"close": 100}), rel=1e-9, abs=1e-9
+    )
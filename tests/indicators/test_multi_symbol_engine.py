@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from pytest import approx
+
+from quantari.indicators import EMA, MACD, RSI, SMA, IndicatorGraph
+from quantari.indicators.multi_symbol_engine import MultiSymbolEngine
+
+SYMBOLS = ["BTC/USD", "ETH/USD", "SOL/USD"]
+
+
+def indicators():
+    return [SMA(5), EMA(12), MACD()]
+
+
+def test_matches_per_symbol_indicators():
+    rng = np.random.default_rng(7)
+    engine = MultiSymbolEngine(indicators(), SYMBOLS)
+    graphs = {symbol: IndicatorGraph(indicators()) for symbol in SYMBOLS}
+
+    for _ in range(50):
+        candles = [
+            {"symbol": symbol, "close": rng.uniform(90, 110)} for symbol in SYMBOLS
+        ]
+
+        for candle, values in zip(candles, engine.update(candles)):
+            expected = graphs[candle["symbol"]].calculate(candle)
+            expected = {k: v for k, v in expected.items() if v is not None}
+
+            assert set(values) == set(expected)
+            for name, value in expected.items():
+                assert values[name] == approx(value)
+
+
+def test_only_updates_symbols_in_batch():
+    engine = MultiSymbolEngine([EMA(2)], SYMBOLS)
+
+    engine.update([{"symbol": "ETH/USD", "close": 3.0}])
+
+    state = engine.states[("EMA", "close", 2)]
+    assert state.last.tolist() == approx([0, 2, 0])
+
+
+def test_same_symbol_twice_in_batch():
+    engine = MultiSymbolEngine([EMA(2)])
+
+    values = engine.update(
+        [
+            {"symbol": "BTC/USD", "close": 3.0},
+            {"symbol": "ETH/USD", "close": 6.0},
+            {"symbol": "BTC/USD", "close": 6.0},
+        ]
+    )
+
+    assert values == [
+        {"EMA_2": approx(2.0)},
+        {"EMA_2": approx(4.0)},
+        {"EMA_2": approx(4.0 + 2 / 3)},
+    ]
+
+    # Symbols are registered on the fly
+    assert engine.symbols == {"BTC/USD": 0, "ETH/USD": 1}
+
+
+def test_missing_close():
+    engine = MultiSymbolEngine([EMA(2)], SYMBOLS)
+
+    assert engine.update([{"symbol": "BTC/USD"}]) == [{}]
+    assert engine.states[("EMA", "close", 2)].last.tolist() == [0, 0, 0]
+
+
+def test_load_and_reset_symbol():
+    closes = np.random.default_rng(7).uniform(90, 110, 40)
+
+    graph = IndicatorGraph(indicators())
+    graph.calculate_ohlcv_batch({"close": closes[:30]})
+
+    engine = MultiSymbolEngine(indicators(), SYMBOLS)
+    engine.load_symbol("ETH/USD", graph)
+
+    for close in closes[30:]:
+        expected = graph.calculate({"close": close})
+        values = engine.update([{"symbol": "ETH/USD", "close": close}])[0]
+
+        for name, value in expected.items():
+            assert values[name] == approx(value)
+
+    engine.reset_symbol("ETH/USD")
+    assert engine.update([{"symbol": "ETH/USD", "close": 1.0}])[0] == {
+        "EMA_12": approx(2 / 13),
+        "MACD_12_26_9": approx([2 / 13 - 2 / 27, (2 / 13 - 2 / 27) * 0.2]),
+    }
+
+
+def test_unsupported_indicator():
+    with pytest.raises(ValueError):
+        MultiSymbolEngine([RSI()])
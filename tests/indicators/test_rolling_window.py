@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from pytest import approx
+
+from quantari.indicators import rolling_window
+
+VALUES = np.random.default_rng(7).uniform(-50, 50, 300)
+
+
+def test_ring_buffer():
+    buffer = rolling_window.RingBuffer(3)
+
+    assert buffer.append(1) is None
+    assert buffer.append(2) is None
+    assert not buffer.is_full()
+    assert buffer.to_numpy() == approx([1, 2])
+
+    assert buffer.append(3) is None
+    assert buffer.is_full()
+
+    # Oldest value gets evicted once full
+    assert buffer.append(4) == 1
+    assert len(buffer) == 3
+    assert buffer.to_numpy() == approx([2, 3, 4])
+
+    buffer.clear()
+    assert len(buffer) == 0
+
+
+def test_ring_buffer_invalid_capacity():
+    with pytest.raises(ValueError):
+        rolling_window.RingBuffer(0)
+
+
+def test_rolling_sum():
+    window = rolling_window.RollingSum(10)
+
+    for index, value in enumerate(VALUES):
+        expected = VALUES[max(0, index - 9) : index + 1].sum()
+        assert window.update(value) == approx(expected)
+
+    window.reset()
+    assert window.update(1) == 1
+
+
+def test_rolling_variance():
+    window = rolling_window.RollingVariance(10)
+
+    for index, value in enumerate(VALUES):
+        expected = VALUES[max(0, index - 9) : index + 1]
+        assert window.update(value) == approx(expected.var(), abs=1e-9)
+        assert window.mean == approx(expected.mean())
+
+
+def test_rolling_min_max():
+    highs = rolling_window.RollingMax(10)
+    lows = rolling_window.RollingMin(10)
+
+    for index, value in enumerate(VALUES):
+        expected = VALUES[max(0, index - 9) : index + 1]
+        assert highs.update(value) == expected.max()
+        assert lows.update(value) == expected.min()
+
+
+def test_trailing_windows():
+    windows, first = rolling_window.trailing_windows(
+        np.array([1.0]), np.array([2.0, 3, 4]), 3
+    )
+
+    assert first == 1
+    assert windows.tolist() == [[1, 2, 3], [2, 3, 4]]
+
+    # Not enough values for a single window
+    windows, first = rolling_window.trailing_windows(np.array([]), np.array([1.0]), 3)
+    assert first == 1
+    assert len(windows) == 0
@@ -0,0 +1,48 @@
+import numpy as np
+from pytest import approx
+
+from quantari.indicators import RSI
+
+
+def test_rsi():
+    rsi = RSI(period=2)
+
+    assert rsi.calculate({"close": 10}) is None
+    assert rsi.calculate({"close": 12}) is None
+
+    # Average gain is 1 and average loss 0.5 after two changes
+    assert rsi.calculate({"close": 11}) == approx(100 - 100 / 3)
+
+    # Only gains
+    rsi = RSI(period=2)
+    for close in [1, 2, 3]:
+        result = rsi.calculate({"close": close})
+    assert result == 100.0
+
+    # None if no close
+    assert rsi.calculate({}) is None
+
+    # __str__
+    assert str(rsi) == "RSI_2"
+
+
+def test_rsi_batch_matches_streaming():
+    closes = np.random.default_rng(7).uniform(90, 110, 500)
+
+    streaming = RSI()
+    expected = [streaming.calculate({"close": close}) for close in closes]
+
+    rsi = RSI()
+    result = np.concatenate(
+        (
+            rsi.calculate_batch(closes[:5]),
+            rsi.calculate_ohlcv_batch({"close": closes[5:]}),
+        )
+    )
+
+    assert np.isnan(result[:14]).all()
+    assert result[14:] == approx(expected[14:], rel=1e-9)
+
+    assert rsi.calculate({"close": 100}) == approx(
+        streaming.calculate({"close": 100}), rel=1e-9
+    )
@@ -1,3 +1,4 @@
+import numpy as np
 from pytest import approx
 
 from quantari.indicators import SMA
@@ -21,3 +22,24 @@ def test_sma_basic():
 
     # __str__
     assert str(sma) == "SMA_3"
+
+
+def test_sma_batch_matches_streaming():
+    closes = np.random.default_rng(7).uniform(90, 110, 500)
+
+    streaming = SMA(period=50)
+    expected = [streaming.calculate({"close": close}) for close in closes]
+
+    sma = SMA(period=50)
+    result = sma.calculate_batch(closes[:20])
+    assert np.isnan(result).all()
+
+    result = sma.calculate_ohlcv_batch({"close": closes[20:]})
+    assert np.isnan(result[:29]).all()
+    assert result[29:] == approx(expected[49:], rel=1e-12)
+
+    # Window is handed over to the streaming path
+    assert sma.window.buffer.to_numpy() == approx(streaming.window.buffer.to_numpy())
+    assert sma.calculate({"close": 100}) == approx(
+        streaming.calculate({"close": 100}), rel=1e-12
+    )
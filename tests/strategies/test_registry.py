@@ -0,0 +1,73 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from quantari.indicators import MACD, SMA
+from quantari.strategies import (
+    STRATEGIES,
+    SimpleMACD,
+    create_strategies,
+    register,
+    required_indicators,
+)
+
+
+def test_registered():
+    assert STRATEGIES["SimpleMACD"] is SimpleMACD
+
+
+@patch.dict(os.environ, {}, clear=True)
+def test_default_strategies():
+    [strategy] = create_strategies()
+
+    assert isinstance(strategy, SimpleMACD)
+    assert str(strategy) == "Simple_MACD"
+
+
+def test_strategies_with_parameters():
+    strategies = create_strategies(
+        "SimpleMACD; SimpleMACD(fast=8, slow=21, signal=5, name=Fast_MACD)"
+    )
+
+    assert [str(strategy) for strategy in strategies] == ["Simple_MACD", "Fast_MACD"]
+    assert (strategies[1].fast, strategies[1].slow, strategies[1].signal) == (8, 21, 5)
+
+
+@patch.dict(os.environ, {"STRATEGIES": ""})
+def test_no_strategies():
+    assert create_strategies() == []
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError, match="Unknown strategy"):
+        create_strategies("SimpleMACD;Missing")
+
+
+def test_required_indicators():
+    strategies = create_strategies(
+        "SimpleMACD;SimpleMACD(name=Other);SimpleMACD(fast=8)"
+    )
+
+    indicators = required_indicators(strategies)
+
+    # Indicators shared by several strategies are only computed once
+    assert [str(indicator) for indicator in indicators] == [
+        "MACD_12_26_9",
+        "MACD_8_26_9",
+    ]
+
+
+def test_required_indicators_conflict():
+    @register
+    class Conflicting:
+        def indicators(self):
+            return [SMA(20, name="MACD_12_26_9")]
+
+    try:
+        with pytest.raises(ValueError, match="MACD_12_26_9"):
+            required_indicators([SimpleMACD(), Conflicting()])
+    finally:
+        del STRATEGIES["Conflicting"]
+
+    assert [str(i) for i in required_indicators([SimpleMACD()])] == [str(MACD())]
@@ -1,3 +1,5 @@
+import numpy as np
+
 from quantari.strategies import Signals, SimpleMACD
 
 
@@ -39,3 +41,45 @@ def test_no_repeated_signal():
     simpleMACD = SimpleMACD()
     assert simpleMACD.evaluate(message) is Signals.SELL
     assert simpleMACD.evaluate(message) is Signals.HOLD
+
+
+def test_evaluate_batch():
+    values = [[None, None], [10, 4], [11, 4], [4, 10], [0, 1], [4, 10], [10, 4]]
+    batch = np.array(values, dtype=np.float64)
+
+    simpleMACD = SimpleMACD()
+    expected = [
+        simpleMACD.evaluate({"indicators": {"MACD_12_26_9": v}}) for v in values
+    ]
+
+    signals = SimpleMACD().evaluate_batch({"MACD_12_26_9": batch})
+
+    assert signals.tolist() == expected
+    assert expected == [0, 1, 0, -1, 0, 0, 1]
+
+
+def test_evaluate_batch_keeps_last_signal():
+    simpleMACD = SimpleMACD()
+    simpleMACD.evaluate_batch({"MACD_12_26_9": np.array([[10.0, 4.0]])})
+
+    assert simpleMACD.last_signal == Signals.BUY
+    assert simpleMACD.evaluate({"indicators": {"MACD_12_26_9": [10, 4]}}) == 0
+    assert simpleMACD.evaluate_batch({"MACD_12_26_9": np.array([[10.0, 4.0]])}) == [0]
+
+
+def test_parameters():
+    simpleMACD = SimpleMACD(fast=6, slow=13, signal=5)
+
+    assert str(simpleMACD) == "Simple_MACD_6_13_5"
+    [macd] = simpleMACD.indicators()
+    assert macd.key() == ("MACD", 6, 13, 5)
+
+    # Signals are computed from the MACD of its own periods
+    message = {"indicators": {"MACD_12_26_9": [4, 10], str(macd): [10, 4]}}
+    assert simpleMACD.evaluate(message) is Signals.BUY
+
+
+def test_indicators():
+    [macd] = SimpleMACD().indicators()
+
+    assert str(macd) == "MACD_12_26_9"
@@ -0,0 +1,130 @@
+from unittest.mock import MagicMock, call, patch
+
+import pytest
+
+from quantari.backfill import (
+    DAY_US,
+    TYPES,
+    Backfill,
+    chunk_candles,
+    parse_timestamp,
+    read_candles,
+)
+from quantari.timestamps import from_epoch_us
+
+CSV = """timestamp,open,high,low,close,volume
+1672531200,1,2,0.5,1.5,10
+1672531260,1.5,2.5,1,2,20
+1675209600,2,3,1.5,2.5,30
+"""
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "XBTUSD_1.csv"
+    path.write_text(CSV)
+    return str(path)
+
+
+def test_parse_timestamp():
+    assert parse_timestamp("1672531200") == 1_672_531_200_000_000
+    assert parse_timestamp("2023-01-01T00:00:00Z") == 1_672_531_200_000_000
+    assert parse_timestamp(from_epoch_us(1_000_000)) == 1_000_000
+
+
+def test_read_candles(csv_path):
+    candles = list(read_candles(csv_path, 1, "BTC/USD"))
+
+    assert candles[0] == (1_672_531_200_000_000, 1.0, 2.0, 0.5, 1.5, 10.0, "BTC/USD", 1)
+    assert len(candles) == 3
+
+
+def test_read_candles_without_symbol(csv_path):
+    with pytest.raises(ValueError):
+        next(read_candles(csv_path, 1))
+
+
+def test_chunk_candles(csv_path):
+    chunks = list(chunk_candles(read_candles(csv_path, 1, "BTC/USD"), 30 * DAY_US))
+
+    # The first two candles share a 30 days range, the last one starts another
+    assert [(symbol, len(rows)) for symbol, _, rows in chunks] == [
+        ("BTC/USD", 2),
+        ("BTC/USD", 1),
+    ]
+    assert all(start % (30 * DAY_US) == 0 for _, start, _ in chunks)
+
+    # A new symbol always starts a new chunk
+    candles = [(0, 1, 1, 1, 1, 1, "BTC/USD", 1), (1, 1, 1, 1, 1, 1, "ETH/USD", 1)]
+    assert [symbol for symbol, _, _ in chunk_candles(candles, DAY_US)] == [
+        "BTC/USD",
+        "ETH/USD",
+    ]
+
+
+def test_chunk_interleaved_symbols():
+    candles = [
+        (timestamp, 1, 1, 1, 1, 1, symbol, 1)
+        for timestamp in [0, 1, DAY_US, DAY_US + 1]
+        for symbol in ["BTC/USD", "ETH/USD"]
+    ]
+
+    # Each symbol and range is a single chunk
+    chunks = list(chunk_candles(candles, DAY_US))
+    assert [(symbol, start, len(rows)) for symbol, start, rows in chunks] == [
+        ("BTC/USD", 0, 2),
+        ("ETH/USD", 0, 2),
+        ("BTC/USD", DAY_US, 2),
+        ("ETH/USD", DAY_US, 2),
+    ]
+    assert all(row[6] == symbol for symbol, _, rows in chunks for row in rows)
+
+
+class TestBackfill:
+    @pytest.fixture
+    @patch("quantari.backfill.TimescaleClient")
+    def backfill(self, mock_timescale_client):
+        backfill = Backfill(1, workers=2, chunk_days=30)
+        backfill.pool = MagicMock()
+        return backfill
+
+    @pytest.fixture
+    def cursor(self, backfill):
+        connection = backfill.pool.connection.return_value.__enter__.return_value
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.rowcount = 1
+        return cursor
+
+    def test_copy_chunk(self, backfill, cursor):
+        rows = [(60_000_000, 1.0, 2.0, 0.5, 1.5, 10.0, "BTC/USD", 1)]
+
+        assert backfill.copy_chunk("XBTUSD_1.csv", "BTC/USD", 0, rows) == (1, 1)
+
+        copy = cursor.copy.return_value.__enter__.return_value
+        cursor.copy.assert_called_once_with(Backfill.COPY_STAGING)
+        copy.set_types.assert_called_once_with(TYPES)
+        copy.write_row.assert_called_once_with(
+            (from_epoch_us(60_000_000), 1.0, 2.0, 0.5, 1.5, 10.0, "BTC/USD", 1)
+        )
+
+        # Stored without duplicates and marked as completed
+        assert cursor.execute.call_args_list == [
+            call(Backfill.CREATE_STAGING_TABLE),
+            call(Backfill.INSERT_FROM_STAGING),
+            call(
+                Backfill.MARK_CHUNK,
+                ("XBTUSD_1.csv", "BTC/USD", 1, from_epoch_us(0), 1),
+            ),
+        ]
+
+    def test_run_skips_completed_chunks(self, backfill, cursor, csv_path):
+        first_chunk = 1_672_531_200_000_000 // (30 * DAY_US) * (30 * DAY_US)
+        backfill.completed = {("XBTUSD_1.csv", "BTC/USD", first_chunk)}
+
+        backfill.run([csv_path], "BTC/USD")
+
+        # Only the chunk not loaded by a previous run
+        copy = cursor.copy.return_value.__enter__.return_value
+        assert copy.write_row.call_count == 1
+        assert backfill.rows == 1
+        assert backfill.inserted == 1
@@ -0,0 +1,171 @@
+import numpy as np
+import pytest
+
+from quantari.backtest import Backtest, evaluate_rows, read_candle_file
+from quantari.indicators import MACD, SMA
+from quantari.strategies import Signals, SimpleMACD
+
+
+def candles(closes: list[float]) -> dict[str, np.ndarray]:
+    closes = np.asarray(closes, dtype=np.float64)
+    opens = np.concatenate((closes[:1], closes[:-1]))
+    return {
+        "timestamp": np.arange(len(closes), dtype=np.int64) * 60_000_000,
+        "open": opens,
+        "high": np.maximum(opens, closes),
+        "low": np.minimum(opens, closes),
+        "close": closes,
+        "volume": np.ones(len(closes)),
+    }
+
+
+def random_candles(count: int) -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(0)
+    return candles(100 * np.exp(np.cumsum(rng.normal(0, 0.002, count))))
+
+
+class ScriptedStrategy:
+    # Only implements evaluate(), returns the signal of each candle in turn
+    def __init__(self, signals: list[int]):
+        self.signals = iter(signals)
+
+    def evaluate(self, message: dict) -> int:
+        return next(self.signals)
+
+    def __str__(self):
+        return "Scripted"
+
+
+class RowMACD:
+    # SimpleMACD without evaluate_batch, evaluated one message at a time
+    def __init__(self):
+        self.strategy = SimpleMACD()
+
+    def evaluate(self, message: dict) -> int:
+        return self.strategy.evaluate(message)
+
+    def __str__(self):
+        return "RowMACD"
+
+
+def test_fills_at_next_open():
+    data = candles([100, 110, 121, 121, 110])
+    signals = [Signals.BUY, Signals.HOLD, Signals.SELL, Signals.HOLD, Signals.HOLD]
+
+    backtest = Backtest(ScriptedStrategy(signals), [], fee=0, slippage=0)
+    result = backtest.run(data)
+
+    assert result.positions.tolist() == [False, True, True, False, False]
+    # Bought at 100 (open of the second candle), sold at 121
+    assert result.trades["entry_price"].tolist() == [100]
+    assert result.trades["exit_price"].tolist() == [121]
+    assert result.trades["return"] == pytest.approx([0.21])
+    assert result.equity.tolist() == pytest.approx(
+        [10_000, 11_000, 12_100, 12_100, 12_100]
+    )
+    assert result.stats["total_return"] == pytest.approx(0.21)
+    assert result.stats["trades"] == 1
+    assert result.stats["win_rate"] == 1.0
+
+
+def test_fees_and_slippage():
+    data = candles([100, 100, 100, 100])
+    signals = [Signals.BUY, Signals.SELL, Signals.HOLD, Signals.HOLD]
+
+    backtest = Backtest(ScriptedStrategy(signals), [], fee=0.01, slippage=0.01)
+    result = backtest.run(data)
+
+    expected = 0.99 * 0.99 * 99 / 101
+    assert result.trades["return"] == pytest.approx([expected - 1])
+    assert result.equity[-1] == pytest.approx(10_000 * expected)
+    assert result.stats["max_drawdown"] == pytest.approx(1 - expected)
+
+
+def test_open_position_is_not_a_trade():
+    data = candles([100, 105, 110])
+    signals = [Signals.BUY, Signals.HOLD, Signals.HOLD]
+
+    result = Backtest(ScriptedStrategy(signals), [], fee=0, slippage=0).run(data)
+
+    assert result.stats["trades"] == 0
+    assert result.equity[-1] == pytest.approx(11_000)
+    assert result.stats["exposure"] == pytest.approx(2 / 3)
+
+
+def test_sell_without_position():
+    data = candles([100, 90, 80])
+    signals = [Signals.SELL, Signals.SELL, Signals.HOLD]
+
+    result = Backtest(ScriptedStrategy(signals), [], fee=0, slippage=0).run(data)
+
+    assert not result.positions.any()
+    assert result.equity.tolist() == [10_000] * 3
+
+
+def test_batch_matches_evaluate():
+    data = random_candles(2_000)
+
+    batch = Backtest(SimpleMACD(), [MACD()]).run(data)
+    rows = Backtest(RowMACD(), [MACD()]).run(data)
+
+    assert batch.stats["trades"] > 0
+    assert batch.signals.tolist() == rows.signals.tolist()
+    assert batch.equity == pytest.approx(rows.equity)
+
+
+def test_evaluate_rows_leaves_out_missing_indicators():
+    messages = []
+
+    class Recorder:
+        def evaluate(self, message: dict) -> int:
+            messages.append(message["indicators"])
+            return Signals.HOLD
+
+    indicators = {"SMA_2": np.array([np.nan, 1.5]), "MACD": np.ones((2, 2))}
+    evaluate_rows(Recorder(), candles([1.0, 2.0]), indicators)
+
+    assert messages == [
+        {"MACD": [1.0, 1.0]},
+        {"SMA_2": 1.5, "MACD": [1.0, 1.0]},
+    ]
+
+
+def test_run_does_not_change_strategy():
+    strategy = SimpleMACD()
+    indicators = [MACD(), SMA()]
+    backtest = Backtest(strategy, indicators)
+
+    first = backtest.run(random_candles(500))
+    second = backtest.run(random_candles(500))
+
+    assert strategy.last_signal == Signals.HOLD
+    assert indicators[0].fast_ema.last_ema == 0
+    assert first.equity.tolist() == second.equity.tolist()
+
+
+def test_read_candle_file(tmp_path):
+    path = tmp_path / "candles.csv"
+    path.write_text(
+        "timestamp,open,high,low,close,volume,symbol\n"
+        "120,2,2,2,2,1,BTC/USD\n"
+        "60,1,1,1,1,1,BTC/USD\n"
+        "60,5,5,5,5,1,ETH/USD\n"
+    )
+
+    columns = read_candle_file(str(path), "BTC/USD")
+
+    assert columns["timestamp"].tolist() == [60_000_000, 120_000_000]
+    assert columns["close"].tolist() == [1, 2]
+
+
+def test_warm_up_rows():
+    data = candles([100, 100, 110, 121, 121])
+    signals = [Signals.BUY, Signals.HOLD, Signals.BUY, Signals.SELL, Signals.HOLD]
+
+    backtest = Backtest(ScriptedStrategy(signals), [], fee=0, slippage=0)
+    result = backtest.run(data, start=1)
+
+    # Trading starts without position, signals of the warm up rows are ignored
+    assert result.timestamps.tolist() == data["timestamp"][1:].tolist()
+    assert result.positions.tolist() == [False, False, True, False]
+    assert result.stats["candles"] == 4
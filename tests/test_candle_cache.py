@@ -0,0 +1,82 @@
+import os
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from quantari.candle_cache import CandleCache
+from quantari.timestamps import from_epoch_us
+
+
+def candles(first: int, count: int) -> dict[str, np.ndarray]:
+    timestamps = np.arange(first, first + count, dtype=np.int64) * 60_000_000
+    columns = {"timestamp": timestamps}
+    for name in ["open", "high", "low", "close", "volume"]:
+        columns[name] = timestamps / 60_000_000
+    return columns
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CandleCache(str(tmp_path))
+
+
+def test_read_empty(cache):
+    columns = cache.read("BTC/USD", 1)
+
+    assert len(columns["timestamp"]) == 0
+    assert columns["timestamp"].dtype == np.int64
+
+
+def test_append_and_read(cache):
+    assert cache.append("BTC/USD", 1, candles(0, 5)) == 5
+
+    columns = cache.read("BTC/USD", 1)
+
+    # Views on the memory mapped files, not copies
+    assert isinstance(columns["close"].base, np.memmap)
+    assert columns["close"].dtype == np.float64
+    assert columns["timestamp"].tolist() == candles(0, 5)["timestamp"].tolist()
+
+    # Range from start (included) to end (excluded)
+    columns = cache.read("BTC/USD", 1, 60_000_000, 180_000_000)
+    assert columns["close"].tolist() == [1.0, 2.0]
+
+
+def test_append_only_new_candles(cache):
+    cache.append("BTC/USD", 1, candles(0, 5))
+
+    # Overlapping candles are already cached
+    assert cache.append("BTC/USD", 1, candles(3, 4)) == 2
+    assert cache.append("BTC/USD", 1, candles(0, 2)) == 0
+
+    columns = cache.read("BTC/USD", 1)
+    assert columns["close"].tolist() == [0, 1, 2, 3, 4, 5, 6]
+    assert cache.load_index("BTC/USD", 1)["end"] == 6 * 60_000_000
+
+
+def test_interrupted_append(cache):
+    cache.append("BTC/USD", 1, candles(0, 2))
+
+    # Rows written without updating the index are discarded by the next append
+    directory = cache.directory("BTC/USD", 1)
+    with open(os.path.join(directory, "close"), "ab") as file:
+        file.write(np.float64(99).tobytes())
+
+    cache.append("BTC/USD", 1, candles(2, 1))
+
+    assert cache.read("BTC/USD", 1)["close"].tolist() == [0, 1, 2]
+
+
+def test_update_from_database(cache):
+    cache.append("BTC/USD", 1, candles(0, 2))
+    db_client = MagicMock()
+    db_client.iter_candles.return_value = [candles(2, 2), candles(4, 1)]
+
+    assert cache.update(db_client, "BTC/USD", 1, "1970-01-01", "1970-01-02") == 3
+
+    # Only the candles after the cached ones are fetched
+    db_client.iter_candles.assert_called_once_with(
+        "BTC/USD", from_epoch_us(60_000_001), "1970-01-02", 1
+    )
+    assert len(cache.read("BTC/USD", 1)["close"]) == 5
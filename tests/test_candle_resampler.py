@@ -0,0 +1,78 @@
+import pytest
+
+from quantari.candle_resampler import CandleResampler
+
+
+def candle(minute, close, symbol="BTC/USD"):
+    return {
+        "symbol": symbol,
+        "interval_begin": f"2023-01-01T00:{minute:02d}:00Z",
+        "interval": 1,
+        "open": close - 1,
+        "high": close + 1,
+        "low": close - 2,
+        "close": close,
+        "volume": 1.0,
+    }
+
+
+def test_resample_into_higher_intervals():
+    resampler = CandleResampler(1, [5, 3])
+
+    closed = []
+    for minute in range(6):
+        closed += resampler.update(candle(minute, 10 + minute))
+
+    assert [c["interval"] for c in closed] == [3, 5, 3]
+    assert closed[0] == {
+        "symbol": "BTC/USD",
+        "interval_begin": "2023-01-01T00:00:00+00:00",
+        "interval": 3,
+        "open": 9,
+        "high": 13,
+        "low": 8,
+        "close": 12,
+        "volume": 3.0,
+    }
+    assert closed[1]["open"] == 9
+    assert closed[1]["close"] == 14
+    assert closed[1]["volume"] == 5.0
+    assert closed[2]["interval_begin"] == "2023-01-01T00:03:00+00:00"
+
+
+def test_resample_with_gap():
+    resampler = CandleResampler(1, [5])
+
+    assert resampler.update(candle(0, 10)) == []
+    assert resampler.update(candle(1, 11)) == []
+
+    # The incomplete candle is closed when the next interval starts
+    closed = resampler.update(candle(7, 12))
+    assert len(closed) == 1
+    assert closed[0]["close"] == 11
+    assert closed[0]["volume"] == 2.0
+
+
+def test_resample_per_symbol():
+    resampler = CandleResampler(1, [2])
+
+    resampler.update(candle(0, 10, "BTC/USD"))
+    resampler.update(candle(0, 20, "ETH/USD"))
+
+    closed = resampler.update(candle(1, 30, "ETH/USD"))
+    assert len(closed) == 1
+    assert closed[0]["symbol"] == "ETH/USD"
+    assert closed[0]["open"] == 19
+
+
+def test_ignore_late_candles():
+    resampler = CandleResampler(1, [2])
+
+    resampler.update(candle(2, 10))
+    assert resampler.update(candle(1, 11)) == []
+    assert resampler.update(candle(3, 12))[0]["close"] == 12
+
+
+def test_invalid_interval():
+    with pytest.raises(ValueError):
+        CandleResampler(5, [7])
@@ -0,0 +1,39 @@
+import os
+import pickle
+
+from quantari.checkpoint import Checkpoint
+from quantari.indicators import EMA
+
+
+def test_save_and_load(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "checkpoints" / "tau.ckpt"))
+
+    ema = EMA(period=3)
+    ema.calculate({"close": 10})
+
+    checkpoint.save({"indicators": {"EMA_3": ema}}, {("market_data", 0): 10})
+
+    # Temporary file is renamed once written
+    assert os.listdir(tmp_path / "checkpoints") == ["tau.ckpt"]
+
+    state, offsets = checkpoint.load()
+    assert offsets == {("market_data", 0): 10}
+    assert state["indicators"]["EMA_3"].last_ema == ema.last_ema
+
+
+def test_load_missing_checkpoint(tmp_path):
+    assert Checkpoint(str(tmp_path / "tau.ckpt")).load() is None
+
+
+def test_load_corrupted_checkpoint(tmp_path):
+    path = tmp_path / "tau.ckpt"
+    path.write_bytes(b"corrupted")
+
+    assert Checkpoint(str(path)).load() is None
+
+
+def test_load_other_version(tmp_path):
+    path = tmp_path / "tau.ckpt"
+    path.write_bytes(pickle.dumps({"version": 0, "state": {}, "offsets": {}}))
+
+    assert Checkpoint(str(path)).load() is None
@@ -1,22 +1,25 @@
 import asyncio
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, patch
 
 import pytest
 
+from quantari.candle_resampler import CandleResampler
 from quantari.data_processor_unit import DataProcessorUnit
+from quantari.kafka_client import AsyncKafkaClient
+from quantari.timescale_client import AsyncTimescaleClient
 
 
 class TestDataProcessorUnit:
     @pytest.fixture
-    @patch("quantari.data_processor_unit.KafkaClient")
-    @patch("quantari.data_processor_unit.TimescaleClient")
+    @patch("quantari.data_processor_unit.AsyncKafkaClient")
+    @patch("quantari.data_processor_unit.AsyncTimescaleClient")
     def data_processor_unit(
         self,
         mock_timescale_client,
         mock_kafka_client,
     ):
-        mock_timescale_client.return_value = MagicMock()
-        mock_kafka_client.return_value = MagicMock()
+        mock_timescale_client.return_value = AsyncMock(spec=AsyncTimescaleClient)
+        mock_kafka_client.return_value = AsyncMock(spec=AsyncKafkaClient)
 
         dpu = DataProcessorUnit()
         dpu.kraken_client = AsyncMock()
@@ -39,51 +42,117 @@ class TestDataProcessorUnit:
         await data_processor_unit.close()
 
         data_processor_unit.kraken_client.close.assert_awaited_once()
-        data_processor_unit.kafka_producer.close_producer.assert_called_once()
-        data_processor_unit.db_client.close_connection.assert_called_once()
+        data_processor_unit.kafka_producer.close.assert_called_once()
+        data_processor_unit.db_client.close_connection.assert_awaited_once()
 
-    def test_process_market_data_on_candle_closure(self, data_processor_unit):
-        data_processor_unit.last_candle_data = {"interval_begin": "2023-01-01T00:00:00"}
-        new_data = {"interval_begin": "2023-01-01T00:01:00"}
+    @pytest.mark.asyncio
+    async def test_process_market_data_on_candle_closure(self, data_processor_unit):
+        last_data = {"symbol": "BTC/USD", "interval_begin": "2023-01-01T00:00:00"}
+        data_processor_unit.last_candle_data = {"BTC/USD": last_data}
+        new_data = {"symbol": "BTC/USD", "interval_begin": "2023-01-01T00:01:00"}
+
+        await data_processor_unit.process_market_data(new_data)
 
-        data_processor_unit.process_market_data(new_data)
+        data_processor_unit.kafka_producer.publish_market_data.assert_called_once_with(
+            last_data
+        )
 
-        data_processor_unit.kafka_producer.publish_market_data.assert_called_once()
-        data_processor_unit.db_client.save_market_data.assert_called_once()
+        # Written behind, once the buffer is flushed
+        data_processor_unit.db_client.save_market_data_many.assert_not_called()
+        await data_processor_unit.candle_buffer.flush()
+        data_processor_unit.db_client.save_market_data_many.assert_called_once_with(
+            [last_data]
+        )
 
-        assert data_processor_unit.last_candle_data is new_data
+        assert data_processor_unit.last_candle_data["BTC/USD"] is new_data
+
+    @pytest.mark.asyncio
+    async def test_process_market_data_with_resampling(self, data_processor_unit):
+        data_processor_unit.resampler = CandleResampler(1, [2])
+        candles = [
+            {
+                "symbol": "BTC/USD",
+                "interval_begin": f"2023-01-01T00:0{minute}:00Z",
+                "interval": 1,
+                "open": 1.0,
+                "high": 2.0,
+                "low": 0.5,
+                "close": 1.5,
+                "volume": 1.0,
+            }
+            for minute in range(3)
+        ]
+
+        for candle in candles:
+            await data_processor_unit.process_market_data(candle)
+
+        # Two closed base candles and the 2 minutes candle built from them
+        published = (
+            data_processor_unit.kafka_producer.publish_market_data.call_args_list
+        )
+        assert [call.args[0]["interval"] for call in published] == [1, 1, 2]
+        assert published[2].args[0]["volume"] == 2.0
+        buffered = data_processor_unit.candle_buffer.rows
+        assert [candle["interval"] for candle in buffered] == [1, 1, 2]
 
-    def test_process_market_data_no_candle_closure(self, data_processor_unit):
+    @pytest.mark.asyncio
+    async def test_process_market_data_no_candle_closure(self, data_processor_unit):
         data_processor_unit.last_candle_data = {
-            "volume": "1",
-            "interval_begin": "2023-01-01T00:00:00",
+            "BTC/USD": {
+                "symbol": "BTC/USD",
+                "volume": "1",
+                "interval_begin": "2023-01-01T00:00:00",
+            }
         }
 
-        new_data = {"volume": "10", "interval_begin": "2023-01-01T00:00:00"}
+        new_data = {
+            "symbol": "BTC/USD",
+            "volume": "10",
+            "interval_begin": "2023-01-01T00:00:00",
+        }
 
-        data_processor_unit.process_market_data(new_data)
+        await data_processor_unit.process_market_data(new_data)
 
         data_processor_unit.kafka_producer.publish_market_data.assert_not_called()
-        data_processor_unit.db_client.save_market_data.assert_not_called()
+        data_processor_unit.db_client.save_market_data_many.assert_not_called()
+
+        assert data_processor_unit.last_candle_data["BTC/USD"] is new_data
+
+    @pytest.mark.asyncio
+    async def test_process_market_data_of_other_symbol(self, data_processor_unit):
+        data_processor_unit.last_candle_data = {
+            "BTC/USD": {"symbol": "BTC/USD", "interval_begin": "2023-01-01T00:00:00"}
+        }
+
+        # A newer candle of another symbol does not close the BTC/USD one
+        new_data = {"symbol": "ETH/USD", "interval_begin": "2023-01-01T00:01:00"}
+        await data_processor_unit.process_market_data(new_data)
 
-        assert data_processor_unit.last_candle_data is new_data
+        data_processor_unit.kafka_producer.publish_market_data.assert_not_called()
+        assert set(data_processor_unit.last_candle_data) == {"BTC/USD", "ETH/USD"}
 
     @pytest.mark.asyncio
     async def test_process_each_data_message(self, data_processor_unit):
+        data_processor_unit.last_candle_data = {
+            symbol: {"symbol": symbol, "interval_begin": "2023-01-01T00:00:00"}
+            for symbol in ("BTC/USD", "ETH/USD")
+        }
         mock_message = {
             "channel": "ohlc",
             "data": [
-                {"interval_begin": "2023-01-01T00:00:00"},
-                {"interval_begin": "2023-01-01T01:00:00"},
+                {"symbol": "BTC/USD", "interval_begin": "2023-01-01T00:01:00"},
+                {"symbol": "ETH/USD", "interval_begin": "2023-01-01T00:01:00"},
             ],
         }
 
-        process_market_data_mock = MagicMock()
-        data_processor_unit.process_market_data = process_market_data_mock
-
         await data_processor_unit.on_message(mock_message)
 
-        assert process_market_data_mock.call_count == 2
+        # The candles closed by the message are saved in a single write
+        await data_processor_unit.candle_buffer.flush()
+        data_processor_unit.db_client.save_market_data_many.assert_called_once()
+        (candles,) = data_processor_unit.db_client.save_market_data_many.call_args.args
+        assert [candle["symbol"] for candle in candles] == ["BTC/USD", "ETH/USD"]
+        assert data_processor_unit.kafka_producer.publish_market_data.call_count == 2
 
     @patch("quantari.data_processor_unit.SpotWSClient")
     @pytest.mark.asyncio
@@ -104,7 +173,7 @@ class TestDataProcessorUnit:
         await data_processor_unit.run(shutdown_event)
 
         # Setup Database Connection
-        data_processor_unit.db_client.create_market_table.assert_called_once()
+        data_processor_unit.db_client.migrate.assert_awaited_once()
 
         # Setup Kafka producer
         data_processor_unit.kafka_producer.create_producer.assert_called_once()
@@ -114,3 +183,22 @@ class TestDataProcessorUnit:
         mock_kraken_instance.subscribe.assert_awaited_once()
 
         assert mock_kraken_instance.exception_occur is True
+
+        # The write behind task stops with the unit
+        await data_processor_unit.close()
+        assert data_processor_unit.candle_buffer.task.done()
+
+    @patch("quantari.data_processor_unit.asyncio.sleep", new_callable=AsyncMock)
+    @patch("quantari.data_processor_unit.SpotWSClient")
+    @pytest.mark.asyncio
+    async def test_run_stops_on_lost_candles(
+        self, mock_spot_ws_client, mock_sleep, data_processor_unit, mock_kraken_instance
+    ):
+        mock_spot_ws_client.return_value = mock_kraken_instance
+        data_processor_unit.candle_buffer.failed = 1
+
+        await data_processor_unit.run(asyncio.Event())
+
+        assert data_processor_unit.exception is True
+        mock_sleep.assert_awaited_once()
+        await data_processor_unit.close()
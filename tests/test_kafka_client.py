@@ -1,10 +1,17 @@
 import os
+import threading
 from types import SimpleNamespace
 from unittest.mock import ANY, MagicMock, patch
 
 import pytest
 
-from quantari.kafka_client import KafkaClient
+from quantari.kafka_client import (
+    DEFAULT_ID,
+    AsyncKafkaClient,
+    KafkaClient,
+    RebalanceListener,
+)
+from quantari.serialization import BinaryCodec, JsonCodec, decode
 
 
 class TestKafkaClient:
@@ -16,6 +23,7 @@ class TestKafkaClient:
         "low": 3,
         "close": 4,
         "volume": 5,
+        "interval": 1,
     }
 
     KAFKA_ENVIRONMENT = {"KAFKA_SERVER": "localhost", "KAFKA_PORT": "9092"}
@@ -25,12 +33,29 @@ class TestKafkaClient:
         kc = KafkaClient()
         kc.producer = MagicMock()
         kc.consumer = MagicMock()
+        kc.codec = JsonCodec()
         return kc
 
     def test_init(self):
         kc = KafkaClient()
         assert kc.producer is None
         assert kc.consumer is None
+        assert isinstance(kc.codec, BinaryCodec)
+
+    @patch.dict(os.environ, {"KAFKA_GROUP_ID_TAU": "quantari-tau-2"}, clear=True)
+    def test_init_ids(self):
+        kc = KafkaClient("quantari-tau", "quantari-tau")
+
+        # Environment overrides the ids of the unit
+        assert kc.client_id == "quantari-tau"
+        assert kc.group_id == "quantari-tau-2"
+
+        # Other units keep their own group
+        kc = KafkaClient("quantari-sms", "quantari-sms")
+        assert kc.group_id == "quantari-sms"
+
+        kc = KafkaClient()
+        assert kc.group_id == DEFAULT_ID
 
     def test_delete(self, kafka_client):
         with patch.object(KafkaClient, "close_producer") as mock_close_producer:
@@ -48,15 +73,42 @@ class TestKafkaClient:
             mock_kafka_producer.assert_called_once_with(
                 bootstrap_servers=["localhost:9092"],
                 api_version=(0, 11),
-                value_serializer=ANY,
                 allow_auto_create_topics=True,
                 client_id="quantari-dpu-1",
+                key_serializer=ANY,
+                linger_ms=5,
+                batch_size=65536,
+                compression_type=None,
             )
 
     def test_close_producer(self, kafka_client):
         kafka_client.close_producer()
         kafka_client.producer.close.assert_called_once()
 
+    def test_flush(self, kafka_client):
+        kafka_client.flush()
+        kafka_client.producer.flush.assert_called_once()
+
+    def test_send_without_flush(self, kafka_client):
+        future = kafka_client.producer.send.return_value
+
+        kafka_client.send("market_data", {"close": 1})
+
+        kafka_client.producer.flush.assert_not_called()
+
+        # Delivery callbacks update the counters
+        future.add_callback.call_args.args[0](None)
+        future.add_errback.call_args.args[0](Exception("Broker not available"))
+        assert kafka_client.delivered == 1
+        assert kafka_client.failed == 1
+
+    def test_send_in_sync_mode(self, kafka_client):
+        kafka_client.sync = True
+
+        kafka_client.send("market_data", {"close": 1})
+
+        kafka_client.producer.flush.assert_called_once()
+
     def test_publish_market_data(self, kafka_client):
         kafka_client.publish_market_data(self.MOCK_CANDLE_DATA)
 
@@ -65,22 +117,83 @@ class TestKafkaClient:
         kafka_data.pop("interval_begin")
         kafka_data["timestamp"] = self.MOCK_CANDLE_DATA["interval_begin"]
 
-        kafka_client.producer.send.assert_called_once_with(
-            "market_data",
-            kafka_data,
-        )
+        kafka_client.producer.send.assert_called_once()
+        topic, value = kafka_client.producer.send.call_args.args
+        assert topic == "market_data"
+        assert decode(value) == kafka_data
+
+        # Candles of a symbol always go to the same partition
+        assert kafka_client.producer.send.call_args.kwargs == {"key": "BTCUSD"}
 
     def test_subscribe_to_market_data(self, kafka_client):
         kafka_client.subscribe_market_data()
-        kafka_client.consumer.subscribe.assert_called_once_with(["market_data"])
+        kafka_client.consumer.subscribe.assert_called_once_with(
+            ["market_data"], listener=kafka_client.listener
+        )
+
+    def test_subscribe_to_market_data_from_offsets(self, kafka_client):
+        kafka_client.subscribe_market_data({("market_data", 0): 10})
+
+        args, kwargs = kafka_client.consumer.subscribe.call_args
+        assert args == (["market_data"],)
+        assert isinstance(kwargs["listener"], RebalanceListener)
+        assert kwargs["listener"].offsets == {("market_data", 0): 10}
+
+    def test_seek_on_assign(self):
+        consumer = MagicMock()
+        listener = RebalanceListener(consumer, {("market_data", 0): 10})
+
+        partition = SimpleNamespace(topic="market_data", partition=0)
+        other_partition = SimpleNamespace(topic="market_data", partition=1)
+        listener.on_partitions_assigned([partition, other_partition])
+
+        consumer.seek.assert_called_once_with(partition, 10)
+
+        # Offsets are only applied once
+        listener.on_partitions_assigned([partition])
+        consumer.seek.assert_called_once()
+
+    def test_pop_revoked(self, kafka_client):
+        assert kafka_client.pop_revoked() == set()
+
+        kafka_client.subscribe_market_data()
+        partition = SimpleNamespace(topic="market_data", partition=0)
+        other_partition = SimpleNamespace(topic="market_data", partition=1)
+
+        # Partitions assigned back in the same rebalance are not revoked
+        kafka_client.listener.on_partitions_revoked([partition, other_partition])
+        kafka_client.listener.on_partitions_assigned([partition])
+
+        assert kafka_client.pop_revoked() == {("market_data", 1)}
+        assert kafka_client.pop_revoked() == set()
+
+    def test_partition_for(self, kafka_client):
+        # Same murmur2 hashing as the default partitioner of the producer
+        kafka_client.consumer.partitions_for_topic.return_value = {10, 11, 12}
+
+        assert kafka_client.partition_for("market_data", "BTC/USD") == 11
+        assert kafka_client.partition_for("market_data", "ETH/USD") == 12
+        assert kafka_client.partition_for("market_data", "SOL/USD") == 12
+
+    def test_positions(self, kafka_client):
+        partition = SimpleNamespace(topic="market_data", partition=0)
+        kafka_client.consumer.assignment.return_value = [partition]
+        kafka_client.consumer.position.return_value = 10
+
+        assert kafka_client.positions() == {("market_data", 0): 10}
+        kafka_client.consumer.position.assert_called_once_with(partition)
 
     def test_subscribe_to_market_indicators(self, kafka_client):
         kafka_client.subscribe_market_indicators()
-        kafka_client.consumer.subscribe.assert_called_once_with(["market_indicators"])
+        kafka_client.consumer.subscribe.assert_called_once_with(
+            ["market_indicators"], listener=ANY
+        )
 
     def test_subscribe_to_signals(self, kafka_client):
         kafka_client.subscribe_signals()
-        kafka_client.consumer.subscribe.assert_called_once_with(["signals"])
+        kafka_client.consumer.subscribe.assert_called_once_with(
+            ["signals"], listener=ANY
+        )
 
     def test_close_consumer(self, kafka_client):
         kafka_client.close_consumer()
@@ -91,26 +204,48 @@ class TestKafkaClient:
         kafka_client.consumer.poll = MagicMock()
         kafka_client.consumer.poll.return_value = {"topic_name": records}
 
-        value = kafka_client.pull_data("topic_name")
+        values = kafka_client.pull_data("topic_name")
         kafka_client.consumer.poll.assert_called_once()
-        assert value is records[0].value
+        assert values == ["message1"]
 
         kafka_client.consumer.poll.return_value = {}
-        value = kafka_client.pull_data("topic_name")
-        assert value is None
+        values = kafka_client.pull_data("topic_name")
+        assert values == []
 
         kafka_client.consumer.poll.return_value = {"topic_name": records}
-        value = kafka_client.pull_data("example_topic")
-        assert value is None
+        values = kafka_client.pull_data("example_topic")
+        assert values == []
+
+    def test_pull_data_returns_every_record(self, kafka_client):
+        kafka_client.consumer.poll.return_value = {
+            "partition_0": [
+                SimpleNamespace(topic="topic_name", value="message1"),
+                SimpleNamespace(topic="topic_name", value="message2"),
+            ],
+            "partition_1": [SimpleNamespace(topic="topic_name", value="message3")],
+        }
+
+        values = kafka_client.pull_data("topic_name")
+        assert values == ["message1", "message2", "message3"]
+
+    def test_commit(self, kafka_client):
+        kafka_client.commit()
+
+        kafka_client.producer.flush.assert_called_once()
+        kafka_client.consumer.commit.assert_called_once()
 
     def test_publish_signals(self, kafka_client):
-        mock_signals = {"Signal1": "Hold", "Signal2": "Buy"}
+        mock_signals = {
+            "symbol": "BTC/USD",
+            "timestamp": "2023-01-01T00:01:00+00:00",
+            "signals": {"Signal1": "Hold", "Signal2": "Buy"},
+        }
         kafka_client.publish_signals(mock_signals)
 
-        kafka_client.producer.send.assert_called_once_with(
-            "signals",
-            mock_signals,
-        )
+        kafka_client.producer.send.assert_called_once()
+        topic, value = kafka_client.producer.send.call_args.args
+        assert topic == "signals"
+        assert decode(value) == mock_signals
 
     def test_publish_market_indicators(self, kafka_client):
         market_indicators = self.MOCK_CANDLE_DATA.copy()
@@ -120,7 +255,48 @@ class TestKafkaClient:
 
         kafka_client.publish_market_indicators(market_indicators)
 
-        kafka_client.producer.send.assert_called_once_with(
-            "market_indicators",
-            market_indicators,
+        kafka_client.producer.send.assert_called_once()
+        topic, value = kafka_client.producer.send.call_args.args
+        assert topic == "market_indicators"
+        assert decode(value) == market_indicators
+
+
+class TestAsyncKafkaClient:
+    @pytest.fixture
+    def async_kafka_client(self):
+        async_kafka_client = AsyncKafkaClient()
+        async_kafka_client.client = MagicMock(spec=KafkaClient)
+        return async_kafka_client
+
+    @pytest.mark.asyncio
+    async def test_publish_on_io_thread(self, async_kafka_client):
+        threads = []
+        async_kafka_client.client.publish_market_data.side_effect = lambda market_data: (
+            threads.append(threading.current_thread())
         )
+
+        await async_kafka_client.publish_market_data({"close": 1})
+        await async_kafka_client.publish_market_data({"close": 2})
+
+        async_kafka_client.client.publish_market_data.assert_called_with({"close": 2})
+
+        # Every call runs on the same thread, outside of the event loop
+        assert threads[0] is threads[1]
+        assert threads[0] is not threading.current_thread()
+
+    @pytest.mark.asyncio
+    async def test_consume(self, async_kafka_client):
+        async_kafka_client.client.pull_data.side_effect = [["message1"], []]
+
+        consumer = async_kafka_client.consume("market_data")
+
+        assert await anext(consumer) == ["message1"]
+        assert await anext(consumer) == []
+        async_kafka_client.client.pull_data.assert_called_with("market_data")
+
+    def test_close(self, async_kafka_client):
+        async_kafka_client.close()
+
+        async_kafka_client.client.close.assert_called_once()
+        with pytest.raises(RuntimeError):
+            async_kafka_client.executor.submit(print)
@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from quantari.backtest import Backtest
+from quantari.optimizer import (
+    Optimizer,
+    SharedCandles,
+    attach,
+    grid,
+    random_search,
+    simple_macd,
+    walk_forward_splits,
+)
+
+
+def random_candles(count: int) -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(0)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, count)))
+    opens = np.concatenate((closes[:1], closes[:-1]))
+    return {
+        "timestamp": np.arange(count, dtype=np.int64) * 60_000_000,
+        "open": opens,
+        "high": np.maximum(opens, closes),
+        "low": np.minimum(opens, closes),
+        "close": closes,
+        "volume": np.ones(count),
+    }
+
+
+SPACE = {"fast": [6, 12], "slow": [26, 40], "signal": [9]}
+
+
+def test_grid():
+    assert grid(SPACE) == [
+        {"fast": 6, "slow": 26, "signal": 9},
+        {"fast": 6, "slow": 40, "signal": 9},
+        {"fast": 12, "slow": 26, "signal": 9},
+        {"fast": 12, "slow": 40, "signal": 9},
+    ]
+
+
+def test_random_search():
+    parameters = random_search(SPACE, 3, seed=1)
+
+    assert len(parameters) == 3
+    assert all(params in grid(SPACE) for params in parameters)
+    assert parameters == random_search(SPACE, 3, seed=1)
+    assert len(random_search(SPACE, 10)) == 4
+
+
+def test_walk_forward_splits():
+    assert walk_forward_splits(100, 50, 20) == [(0, 50, 70), (20, 70, 90)]
+    assert walk_forward_splits(100, 50, 20, step=10) == [
+        (0, 50, 70),
+        (10, 60, 80),
+        (20, 70, 90),
+        (30, 80, 100),
+    ]
+
+
+def test_shared_candles():
+    candles = random_candles(10)
+    shared = SharedCandles(candles)
+
+    try:
+        columns = attach(shared.memory, shared.count)
+        assert columns["timestamp"].tolist() == candles["timestamp"].tolist()
+        assert columns["close"].tolist() == candles["close"].tolist()
+    finally:
+        del columns
+        shared.close()
+
+
+def test_rank_without_metric():
+    optimizer = Optimizer()
+    table = []
+
+    optimizer.rank(table, {"fast": 1}, {"sharpe": 0.5})
+    optimizer.rank(table, {"fast": 2}, {})
+    optimizer.rank(table, {"fast": 3}, {"sharpe": float("nan")})
+    optimizer.rank(table, {"fast": 4}, {"sharpe": 1.5})
+
+    # Empty stats and NaN rank after every result
+    assert [row["fast"] for row in table][:2] == [4, 1]
+    assert {row["fast"] for row in table[2:]} == {2, 3}
+
+
+def test_rank_minimized_metric():
+    optimizer = Optimizer(metric="max_drawdown")
+    table = []
+
+    optimizer.rank(table, {"fast": 1}, {"max_drawdown": 0.3})
+    optimizer.rank(table, {"fast": 2}, {"max_drawdown": float("nan")})
+    optimizer.rank(table, {"fast": 3}, {"max_drawdown": 0.1})
+
+    # Smallest drawdown first, NaN still last
+    assert [row["fast"] for row in table] == [3, 1, 2]
+
+
+def test_optimize():
+    candles = random_candles(2_000)
+    optimizer = Optimizer(workers=2, chunk_size=1)
+
+    rows = list(optimizer.search(candles, grid(SPACE)))
+    table = optimizer.table
+
+    assert len(rows) == len(table) == 4
+    assert [row["sharpe"] for row in table] == sorted(
+        (row["sharpe"] for row in rows), reverse=True
+    )
+
+    # Same stats as a backtest in the current process
+    best = {name: table[0][name] for name in SPACE}
+    stats = Backtest(*simple_macd(**best)).run(candles).stats
+    assert table[0]["total_return"] == pytest.approx(stats["total_return"])
+
+
+def test_walk_forward():
+    candles = random_candles(3_000)
+    splits = walk_forward_splits(3_000, 1_500, 500)
+    optimizer = Optimizer(workers=2, metric="total_return")
+
+    results = optimizer.walk_forward(candles, grid(SPACE), splits)
+
+    assert len(results) == 3
+    for (start, split, end), result in zip(splits, results):
+        assert result["start"] == candles["timestamp"][split]
+        assert result["params"] in grid(SPACE)
+        assert result["train"]["candles"] == split - start
+        assert result["test"]["candles"] == end - split
+
+        # Test stats are warmed up on the training candles
+        window = {name: column[start:end] for name, column in candles.items()}
+        backtest = Backtest(*simple_macd(**result["params"]))
+        stats = backtest.run(window, split - start).stats
+        assert result["test"]["total_return"] == pytest.approx(stats["total_return"])
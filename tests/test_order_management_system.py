@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from quantari.kafka_client import AsyncKafkaClient
+from quantari.order_management_system import OrderManagementSystem
+
+
+class TestOrderManagementSystem:
+    @pytest.fixture
+    @patch("quantari.order_management_system.SpotClient")
+    @patch("quantari.order_management_system.TimescaleClient")
+    def order_management_system(self, mock_timescale_client, mock_spot_client):
+        return OrderManagementSystem(AsyncMock(spec=AsyncKafkaClient))
+
+    @pytest.mark.asyncio
+    async def test_run_processes_off_the_event_loop(self, order_management_system):
+        loop_thread = threading.get_ident()
+        threads = []
+
+        def process_signals(signals):
+            threads.append(threading.get_ident())
+            return [{"id": None, "signal_name": "Simple_MACD", "action": 1}]
+
+        def process_orders(orders):
+            threads.append(threading.get_ident())
+            assert orders[0]["signal_name"] == "Simple_MACD"
+
+        async def consume(topic_name):
+            assert topic_name == "signals"
+            yield [{"symbol": "BTC/USD", "signals": {"Simple_MACD": 1}}]
+            order_management_system.exception = True
+            yield []
+
+        order_management_system.process_signals = process_signals
+        order_management_system.process_orders = process_orders
+        order_management_system.kafka_client.consume = consume
+
+        await order_management_system.run(asyncio.Event())
+
+        assert len(threads) == 2
+        assert loop_thread not in threads
+        order_management_system.kafka_client.commit.assert_awaited_once()
+
+    def test_process_signals(self, order_management_system):
+        order_management_system.db_client.fetch_order_by_signal.return_value = None
+
+        orders = order_management_system.process_signals(
+            {
+                "symbol": "BTC/USD",
+                "timestamp": "2023-01-01T00:01:00+00:00",
+                "signals": {"Simple_MACD": 1},
+            }
+        )
+
+        assert orders == [
+            {
+                "id": None,
+                "signal_name": "Simple_MACD",
+                "symbol": "BTC/USD",
+                "action": 1,
+            }
+        ]
+        order_management_system.db_client.fetch_order_by_signal.assert_called_once_with(
+            "Simple_MACD", "BTC/USD"
+        )
+
+    def test_skip_signals_without_a_symbol(self, order_management_system):
+        orders = order_management_system.process_signals(
+            {"signals": {"Simple_MACD": 1}}
+        )
+
+        assert orders == []
+        order_management_system.db_client.fetch_order_by_signal.assert_not_called()
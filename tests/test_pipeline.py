@@ -0,0 +1,93 @@
+import asyncio
+import os
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+
+from quantari.data_processor_unit import DataProcessorUnit
+from quantari.pipeline import Pipeline
+from quantari.queue_client import QueueClient
+from quantari.strategies import Signals
+from quantari.strategy_management_system import StrategyManagementSystem
+from quantari.technical_analysis_unit import TechnicalAnalysisUnit
+from quantari.timescale_client import AsyncTimescaleClient
+
+
+def test_default_units():
+    units = {name: MagicMock(name=name) for name in ["dpu", "tau", "sms", "oms"]}
+
+    with patch.dict("quantari.pipeline.UNITS", units), patch.dict(os.environ):
+        os.environ.pop("PIPELINE_UNITS", None)
+        pipeline = Pipeline()
+
+        # The OMS is opt-in
+        assert pipeline.units == [
+            units[name].return_value for name in ["dpu", "tau", "sms"]
+        ]
+        units["oms"].assert_not_called()
+
+        os.environ["PIPELINE_UNITS"] = "tau,sms,oms"
+        assert Pipeline().units[-1] is units["oms"].return_value
+
+
+@pytest.mark.asyncio
+@patch("quantari.technical_analysis_unit.AsyncTimescaleClient")
+@patch("quantari.data_processor_unit.AsyncTimescaleClient")
+async def test_candles_to_signals(mock_dpu_db, mock_tau_db, tmp_path):
+    mock_dpu_db.return_value = AsyncMock(spec=AsyncTimescaleClient)
+    mock_tau_db.return_value = AsyncMock(spec=AsyncTimescaleClient)
+    mock_tau_db.return_value.fetch_latest_candles.return_value = {
+        "BTC/USD": {"timestamp": np.array([], dtype=np.int64), "close": np.array([])}
+    }
+
+    environment = {
+        "CHECKPOINT_PATH": str(tmp_path / "tau.ckpt"),
+        "KAFKA_POLL_TIMEOUT_MS": "10",
+    }
+    with patch.dict(os.environ, environment):
+        pipeline = Pipeline(["tau", "sms"])
+        dpu = DataProcessorUnit(QueueClient(pipeline.broker))
+
+    tau, sms = pipeline.units
+    assert isinstance(tau, TechnicalAnalysisUnit)
+    assert isinstance(sms, StrategyManagementSystem)
+
+    shutdown_event = asyncio.Event()
+    running = asyncio.create_task(pipeline.run(shutdown_event))
+
+    # A falling then rising market, each candle is closed by the next one
+    closes = [100.0 - i for i in range(30)] + [70.0 + 2 * i for i in range(20)]
+    for minute, close in enumerate(closes):
+        await dpu.process_market_data(
+            {
+                "symbol": "BTC/USD",
+                "interval_begin": f"2023-01-01T{minute // 60:02d}:{minute % 60:02d}:00Z",
+                "interval": 1,
+                "open": close,
+                "high": close,
+                "low": close,
+                "close": close,
+                "volume": 1.0,
+            }
+        )
+
+    signals = []
+    queue = pipeline.broker.queue("signals")
+    while len(signals) < len(closes) - 1:
+        signals.append(await asyncio.wait_for(queue.get(), 1))
+
+    shutdown_event.set()
+    await running
+    await pipeline.close()
+    await dpu.close()
+
+    # Every closed candle went through the indicators and the strategies
+    assert all(signal["symbol"] == "BTC/USD" for signal in signals)
+    assert all(set(signal["signals"]) == {"Simple_MACD"} for signal in signals)
+    assert {"Simple_MACD": Signals.BUY} in [signal["signals"] for signal in signals]
+    assert tau.active_symbols == {"BTC/USD"}
+    saved = mock_dpu_db.return_value.save_market_data_many.call_args_list
+    assert sum(len(call.args[0]) for call in saved) == len(closes) - 1
+    updated = mock_tau_db.return_value.save_indicators_many.call_args_list
+    assert sum(len(call.args[0]) for call in updated) == len(closes) - 1
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from quantari.queue_client import QueueBroker, QueueClient
+
+
+@pytest.fixture
+def queue_client():
+    client = QueueClient(QueueBroker(maxsize=2))
+    client.poll_timeout = 0.01
+    return client
+
+
+@pytest.mark.asyncio
+async def test_publish_and_consume(queue_client):
+    await queue_client.publish_signals({"Signal1": 1}, "BTC/USD")
+    await queue_client.publish_signals({"Signal1": -1}, "BTC/USD")
+
+    consumer = queue_client.consume("signals")
+
+    # Every queued message in a single batch, in order
+    assert await anext(consumer) == [{"Signal1": 1}, {"Signal1": -1}]
+
+    # Empty batch once the poll timed out
+    assert await anext(consumer) == []
+
+
+@pytest.mark.asyncio
+async def test_publish_market_data(queue_client):
+    await queue_client.publish_market_data(
+        {
+            "symbol": "BTC/USD",
+            "interval_begin": "2023-01-01T00:00:00Z",
+            "interval": 1,
+            "open": 1,
+            "high": 2,
+            "low": 3,
+            "close": 4,
+            "volume": 5,
+            "trades": 6,
+        }
+    )
+
+    # Same message as the one sent through Kafka
+    assert await anext(queue_client.consume("market_data")) == [
+        {
+            "symbol": "BTC/USD",
+            "timestamp": "2023-01-01T00:00:00Z",
+            "interval": 1,
+            "open": 1,
+            "high": 2,
+            "low": 3,
+            "close": 4,
+            "volume": 5,
+        }
+    ]
+
+
+@pytest.mark.asyncio
+async def test_publish_waits_when_queue_is_full(queue_client):
+    await queue_client.publish_signals({"Signal1": 1})
+    await queue_client.publish_signals({"Signal1": 1})
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(queue_client.publish_signals({"Signal1": 1}), 0.01)
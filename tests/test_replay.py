@@ -0,0 +1,287 @@
+import asyncio
+import os
+from contextlib import contextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+
+from quantari.kafka_client import market_data_value
+from quantari.pipeline import Pipeline
+from quantari.queue_client import QueueClient
+from quantari.replay import (
+    STAGES,
+    ConsumerLag,
+    Replay,
+    column_messages,
+    database_messages,
+    file_messages,
+)
+from quantari.strategies import Signals
+from quantari.timescale_client import (
+    POSTGRES_EPOCH_US,
+    SYMBOL_CANDLE_RECORD,
+    AsyncTimescaleClient,
+    TimescaleClient,
+)
+from quantari.timestamps import to_epoch_us
+
+MINUTE_US = 60_000_000
+
+
+def chunk(first: int, count: int, symbols=("BTC/USD",)) -> dict[str, np.ndarray]:
+    timestamps = np.arange(first, first + count, dtype=np.int64) * MINUTE_US
+    columns = {"timestamp": timestamps}
+    for name in ["open", "high", "low", "close", "volume"]:
+        columns[name] = timestamps / MINUTE_US
+    columns["symbol"] = np.resize(np.array(symbols, dtype=object), count)
+    return columns
+
+
+def messages(count: int, step: int = MINUTE_US) -> list[tuple[int, dict]]:
+    return [(index * step, {"symbol": "BTC/USD"}) for index in range(count)]
+
+
+@pytest.fixture
+def lag():
+    lag = MagicMock(spec=ConsumerLag)
+    lag.stages = STAGES
+    lag.measure.return_value = {stage: (0, 100) for stage in STAGES}
+    return lag
+
+
+@pytest.fixture
+def replay(lag):
+    return Replay(kafka_client=MagicMock(), lag=lag)
+
+
+def test_column_messages():
+    [(timestamp, message)] = column_messages([chunk(1, 1)], 1)
+
+    assert timestamp == MINUTE_US
+    # Published exactly like the candles of the Data Processor Unit
+    assert market_data_value(message) == {
+        "symbol": "BTC/USD",
+        "timestamp": "1970-01-01T00:01:00+00:00",
+        "interval": 1,
+        "open": 1.0,
+        "high": 1.0,
+        "low": 1.0,
+        "close": 1.0,
+        "volume": 1.0,
+    }
+
+
+class OneCopyCursor:
+    # A psycopg connection runs one COPY at a time, a second one waits on the
+    # connection lock of the first forever
+    def __init__(self, records: np.ndarray):
+        data = b"PGCOPY\n\xff\r\n\x00" + bytes(8) + records.tobytes() + b"\xff\xff"
+        self.blocks = [data[i : i + 65536] for i in range(0, len(data), 65536)]
+        self.copying = False
+
+    @contextmanager
+    def copy(self, query, params):
+        assert not self.copying, "COPY started while another one is open"
+        self.copying = True
+        try:
+            yield self.blocks
+        finally:
+            self.copying = False
+
+
+def test_database_messages():
+    # More candles per symbol than a chunk, so a COPY is still open when the
+    # first candles are replayed
+    count = 2 * 100_001
+    records = np.zeros(count, dtype=SYMBOL_CANDLE_RECORD)
+    records["count"] = 7
+    records["timestamp_size"] = 8
+    records["timestamp"] = np.arange(count) // 2 * MINUTE_US - POSTGRES_EPOCH_US
+    records["symbol_size"] = 4
+    records["symbol"] = np.arange(count) % 2 + 1
+    for name in ["open", "high", "low", "close", "volume"]:
+        records[f"{name}_size"] = 8
+        records[name] = np.arange(count) // 2
+
+    db_client = TimescaleClient(pooled=False)
+    db_client.cursor = OneCopyCursor(records)
+
+    replayed = list(database_messages(db_client, ["BTC/USD", "ETH/USD"], "a", "b", 1))
+
+    # Candles of all the symbols in time order, from a single COPY
+    assert len(replayed) == count
+    assert [timestamp // MINUTE_US for timestamp, _ in replayed[:4]] == [0, 0, 1, 1]
+    assert [message["symbol"] for _, message in replayed[:4]] == [
+        "BTC/USD",
+        "ETH/USD",
+        "BTC/USD",
+        "ETH/USD",
+    ]
+    assert replayed[-1][1]["close"] == 100_000.0
+
+
+def test_file_messages(tmp_path):
+    path = tmp_path / "candles.csv"
+    path.write_text(
+        "timestamp,open,high,low,close,volume,symbol\n"
+        "60,1,1,1,1,1,BTC/USD\n"
+        "120,2,2,2,2,1,BTC/USD\n"
+        "60,5,5,5,5,1,ETH/USD\n"
+    )
+
+    replayed = file_messages([str(path)], 1)
+
+    assert [timestamp for timestamp, _ in replayed] == [60e6, 60e6, 120e6]
+    assert replayed[1][1]["symbol"] == "ETH/USD"
+    assert to_epoch_us(replayed[2][1]["interval_begin"]) == 120_000_000
+
+
+@patch("quantari.replay.time.sleep")
+def test_run_as_fast_as_possible(mock_sleep, replay):
+    replay.run(messages(5))
+
+    assert replay.published == 5
+    assert replay.kafka_client.publish_market_data.call_count == 5
+    replay.kafka_client.flush.assert_called_once()
+    mock_sleep.assert_not_called()
+
+
+@patch("quantari.replay.time.sleep")
+@patch("quantari.replay.time.monotonic", return_value=0)
+def test_run_paced(mock_monotonic, mock_sleep, replay):
+    # Candles a minute apart replayed 60 times faster, a second apart
+    replay.speed = 60
+    replay.run(messages(3))
+
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [1, 2]
+
+
+def test_drain(replay, lag):
+    lag.measure.side_effect = [
+        {stage: (0, 100) for stage in STAGES},
+        {stage: (0, 100) for stage in STAGES},
+        # Indicators are consumed before all the candles are
+        {
+            "technical_analysis_unit": (10, 200),
+            "strategy_management_system": (0, 150),
+            "order_management_system": (0, 100),
+        },
+        {
+            "technical_analysis_unit": (0, 200),
+            "strategy_management_system": (5, 180),
+            "order_management_system": (0, 120),
+        },
+        {stage: (0, 200) for stage in STAGES},
+    ]
+
+    replay.run(messages(100))
+    with patch("quantari.replay.time.sleep"):
+        replay.drain()
+
+    report = replay.report()
+    stages = report["stages"]
+
+    assert report["published"] == 100
+    assert stages["technical_analysis_unit"]["messages"] == 100
+    assert stages["strategy_management_system"]["messages"] == 100
+    assert stages["order_management_system"]["messages"] == 100
+    assert all(stats["lag_when_published"] == 0 for stats in stages.values())
+
+
+def test_drain_timeout(replay, lag):
+    replay.run(messages(10))
+    lag.measure.return_value = {stage: (1, 100) for stage in STAGES}
+
+    replay.drain(timeout=0)
+    report = replay.report()
+
+    assert all("throughput" not in stats for stats in report["stages"].values())
+
+
+@patch("quantari.replay.KafkaConsumer")
+def test_consumer_lag(mock_kafka_consumer):
+    consumer = mock_kafka_consumer.return_value
+    consumer.partitions_for_topic.return_value = {0, 1}
+    consumer.end_offsets.side_effect = lambda partitions: {
+        partition: 50 for partition in partitions
+    }
+    consumer.committed.side_effect = [40, None]
+
+    lag = ConsumerLag({"technical_analysis_unit": ("market_data", "quantari-tau")})
+
+    assert lag.measure() == {"technical_analysis_unit": (60, 100)}
+    assert mock_kafka_consumer.call_args.kwargs["group_id"] == "quantari-tau"
+    # Only the committed offsets are read, the group is never joined
+    consumer.subscribe.assert_not_called()
+
+    lag.close()
+    consumer.close.assert_called_once()
+
+
+@patch.dict(os.environ, {"KAFKA_GROUP_ID_TAU": "quantari-tau-replay"})
+def test_consumer_lag_of_overridden_groups():
+    lag = ConsumerLag()
+
+    assert lag.stages["technical_analysis_unit"] == (
+        "market_data",
+        "quantari-tau-replay",
+    )
+    assert lag.stages["strategy_management_system"][1] == "quantari-sms"
+
+
+@pytest.mark.asyncio
+@patch("quantari.technical_analysis_unit.AsyncTimescaleClient")
+async def test_replayed_candles_reach_the_strategies(mock_tau_db, tmp_path):
+    # A falling then rising market already stored in market_ochl, replayed
+    # from its 10th candle
+    closes = [100.0 - i for i in range(30)] + [70.0 + 2 * i for i in range(20)]
+    timestamps = np.arange(len(closes), dtype=np.int64) * MINUTE_US
+    candles = {"timestamp": timestamps}
+    for name in ["open", "high", "low", "close"]:
+        candles[name] = np.array(closes)
+    candles["volume"] = np.ones(len(closes))
+
+    async def fetch_latest_candles(bounds, interval, limit):
+        # Stored candles before the bound of each symbol
+        before = timestamps < to_epoch_us(bounds["BTC/USD"])
+        return {"BTC/USD": {name: values[before] for name, values in candles.items()}}
+
+    mock_tau_db.return_value = AsyncMock(spec=AsyncTimescaleClient)
+    mock_tau_db.return_value.fetch_latest_candles.side_effect = fetch_latest_candles
+    replayed = {name: values[10:] for name, values in candles.items()}
+    replayed["symbol"] = np.full(len(closes) - 10, "BTC/USD", dtype=object)
+    db_client = MagicMock()
+    db_client.iter_symbols_candles.return_value = iter([replayed])
+
+    environment = {
+        "CHECKPOINT_PATH": str(tmp_path / "tau.ckpt"),
+        "KAFKA_POLL_TIMEOUT_MS": "10",
+    }
+    with patch.dict(os.environ, environment):
+        pipeline = Pipeline(["tau", "sms"])
+
+    shutdown_event = asyncio.Event()
+    running = asyncio.create_task(pipeline.run(shutdown_event))
+
+    publisher = QueueClient(pipeline.broker)
+    for _, message in database_messages(db_client, ["BTC/USD"], "a", "b", 1):
+        await publisher.publish_market_data(message)
+
+    signals = []
+    queue = pipeline.broker.queue("signals")
+    while len(signals) < len(closes) - 10:
+        signals.append(await asyncio.wait_for(queue.get(), 1))
+
+    shutdown_event.set()
+    await running
+    await pipeline.close()
+
+    # Warmed up on the candles before the replay, then every replayed candle
+    # went through the indicators and the strategies
+    (bounds, _, _), _ = mock_tau_db.return_value.fetch_latest_candles.call_args
+    assert to_epoch_us(bounds["BTC/USD"]) == 10 * MINUTE_US
+    assert [signal["timestamp"] for signal in signals] == [
+        message["interval_begin"] for _, message in column_messages([replayed], 1)
+    ]
+    assert {"Simple_MACD": Signals.BUY} in [signal["signals"] for signal in signals]
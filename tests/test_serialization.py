@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from quantari.serialization import (
+    MAGIC,
+    UNKEYED_SIGNALS_SCHEMA,
+    BinaryCodec,
+    JsonCodec,
+    decode,
+)
+
+MARKET_DATA = {
+    "symbol": "BTC/USD",
+    "timestamp": "2023-01-01T00:01:00+00:00",
+    "interval": 1,
+    "open": 1.5,
+    "high": 2.0,
+    "low": 1.0,
+    "close": 1.75,
+    "volume": 10.0,
+}
+
+
+def test_encode_market_data():
+    data = BinaryCodec().encode("market_data", MARKET_DATA)
+
+    assert data[0] == MAGIC
+    assert len(data) < len(JsonCodec().encode("market_data", MARKET_DATA))
+    assert decode(data) == MARKET_DATA
+
+
+def test_encode_market_indicators():
+    market_indicators = dict(MARKET_DATA)
+    market_indicators["indicators"] = {
+        "SMA_50": None,
+        "EMA_12": 1.25,
+        "MACD_12_26_9": [0.5, 0.25],
+        "Empty": [],
+    }
+
+    data = BinaryCodec().encode("market_indicators", market_indicators)
+
+    assert decode(data) == market_indicators
+
+
+def test_encode_missing_vector_values():
+    market_indicators = dict(MARKET_DATA)
+    market_indicators["indicators"] = {"MACD_12_26_9": [0.5, None]}
+
+    data = BinaryCodec().encode("market_indicators", market_indicators)
+
+    assert decode(data) == market_indicators
+
+
+def test_encode_without_indicators():
+    market_indicators = dict(MARKET_DATA, indicators={})
+
+    data = BinaryCodec().encode("market_indicators", market_indicators)
+
+    assert decode(data) == market_indicators
+
+
+def test_encode_signals():
+    signals = {
+        "symbol": "BTC/USD",
+        "timestamp": MARKET_DATA["timestamp"],
+        "signals": {"SimpleMACD": -1, "Other": 1},
+    }
+
+    data = BinaryCodec().encode("signals", signals)
+
+    assert decode(data) == signals
+
+
+def test_decode_unkeyed_signals():
+    data = bytes([MAGIC, UNKEYED_SIGNALS_SCHEMA, 1]) + b"\x0aSimpleMACD\xff"
+
+    assert decode(data) == {"signals": {"SimpleMACD": -1}}
+
+
+def test_timestamps_are_normalized_to_utc():
+    market_data = dict(MARKET_DATA)
+    market_data["timestamp"] = "2023-01-01T00:01:00.000000Z"
+
+    data = BinaryCodec().encode("market_data", market_data)
+
+    assert decode(data)["timestamp"] == MARKET_DATA["timestamp"]
+
+
+def test_unknown_topic_falls_back_to_json():
+    data = BinaryCodec().encode("other", {"value": 1})
+
+    assert json.loads(data) == {"value": 1}
+
+
+def test_decode_json():
+    data = JsonCodec().encode("market_data", MARKET_DATA)
+
+    assert decode(data) == MARKET_DATA
+
+
+def test_decode_unknown_schema():
+    with pytest.raises(ValueError):
+        decode(bytes([MAGIC, 99]))
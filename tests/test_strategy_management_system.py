@@ -1,22 +1,24 @@
 import asyncio
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
+from quantari.kafka_client import AsyncKafkaClient
 from quantari.strategies import Signals
 from quantari.strategy_management_system import StrategyManagementSystem
 
 
 class TestStrategyManagementSystem:
     @pytest.fixture
-    @patch("quantari.strategy_management_system.KafkaClient")
+    @patch("quantari.strategy_management_system.AsyncKafkaClient")
     def strategy_management_system(
         self,
         mock_timescale_client,
     ):
-        mock_timescale_client.return_value = MagicMock()
+        mock_timescale_client.return_value = AsyncMock(spec=AsyncKafkaClient)
 
         sms = StrategyManagementSystem()
+        sms.kafka_client.pop_revoked.return_value = set()
         return sms
 
     @pytest.fixture
@@ -31,6 +33,23 @@ class TestStrategyManagementSystem:
 
         return [mock1, mock2]
 
+    @patch.dict("os.environ", {"STRATEGIES": "SimpleMACD;SimpleMACD(fast=8)"})
+    @patch("quantari.strategy_management_system.AsyncKafkaClient")
+    def test_configured_strategies(self, mock_kafka_client):
+        sms = StrategyManagementSystem()
+
+        signals = sms.evaluate_strategies(
+            {
+                "symbol": "BTC/USD",
+                "indicators": {"MACD_12_26_9": [2.0, 1.0], "MACD_8_26_9": [1.0, 2.0]},
+            }
+        )
+
+        assert signals == {
+            "Simple_MACD": Signals.BUY,
+            "Simple_MACD_8_26_9": Signals.SELL,
+        }
+
     def test_close(
         self,
         strategy_management_system,
@@ -48,18 +67,18 @@ class TestStrategyManagementSystem:
     async def test_run_until_exception(
         self, mock_evaluate_strategies, strategy_management_system
     ):
-        strategy_management_system.kafka_client.pull_market_indicators.return_value = (
-            "message"
-        )
-
         strategy_management_system.exception = False
 
-        # Simulate the exception occurring after a short delay
-        async def stop_after_delay():
-            await asyncio.sleep(0.1)
+        async def consume(topic_name):
+            assert topic_name == "market_indicators"
+            yield [{"symbol": "BTC/USD", "timestamp": "2023-01-01T00:01:00+00:00"}]
+            yield []
+
+            # Simulate the exception occurring once the topic is empty
             strategy_management_system.exception = True
+            yield []
 
-        asyncio.create_task(stop_after_delay())
+        strategy_management_system.kafka_client.consume = consume
 
         shutdown_event = asyncio.Event()
         await strategy_management_system.run(shutdown_event)
@@ -70,20 +89,30 @@ class TestStrategyManagementSystem:
         strategy_management_system.kafka_client.subscribe_market_indicators.assert_called_once()
 
         # Receives data from Market Indicators topic through Kafka
-        strategy_management_system.kafka_client.pull_market_indicators.assert_called_once()
         mock_evaluate_strategies.assert_called_once_with(
-            strategy_management_system, "message"
+            strategy_management_system,
+            {"symbol": "BTC/USD", "timestamp": "2023-01-01T00:01:00+00:00"},
         )
+        strategy_management_system.kafka_client.commit.assert_awaited_once()
 
         # Publish data into Kafka
         strategy_management_system.kafka_client.publish_signals.assert_called_once_with(
-            {"Signal": Signals.BUY}
+            {
+                "symbol": "BTC/USD",
+                "timestamp": "2023-01-01T00:01:00+00:00",
+                "signals": {"Signal": Signals.BUY},
+            },
+            "BTC/USD",
         )
 
     def test_evaluate_strategies(self, strategy_management_system, mock_strategies):
-        strategy_management_system.strategies = mock_strategies
+        strategy_management_system.symbol_strategies = {"BTC/USD": mock_strategies}
 
-        mock_message = {"close": 1.0, "timestamp": "2025-05-10T09:11:41.000Z"}
+        mock_message = {
+            "symbol": "BTC/USD",
+            "close": 1.0,
+            "timestamp": "2025-05-10T09:11:41.000Z",
+        }
 
         signals = strategy_management_system.evaluate_strategies(mock_message)
         assert signals == {"MockSignal1": Signals.HOLD, "MockSignal2": Signals.BUY}
@@ -91,3 +120,34 @@ class TestStrategyManagementSystem:
         # Evaluates all the strategies
         for strategy in mock_strategies:
             strategy.evaluate.assert_called_with(mock_message)
+
+    def test_evaluate_strategies_per_symbol(self, strategy_management_system):
+        def message(symbol, macd):
+            return {"symbol": symbol, "indicators": {"MACD_12_26_9": [macd, 1.0]}}
+
+        evaluate_strategies = strategy_management_system.evaluate_strategies
+
+        assert evaluate_strategies(message("BTC/USD", 2.0)) == {
+            "Simple_MACD": Signals.BUY
+        }
+
+        # The BUY of BTC/USD does not hide the one of ETH/USD
+        assert evaluate_strategies(message("ETH/USD", 2.0)) == {
+            "Simple_MACD": Signals.BUY
+        }
+        assert evaluate_strategies(message("BTC/USD", 2.0)) == {
+            "Simple_MACD": Signals.HOLD
+        }
+
+    @pytest.mark.asyncio
+    async def test_drop_revoked_symbols(self, strategy_management_system):
+        strategy_management_system.symbol_strategies = {"BTC/USD": [], "ETH/USD": []}
+        kafka_client = strategy_management_system.kafka_client
+        kafka_client.pop_revoked.return_value = {("market_indicators", 1)}
+        kafka_client.partition_for.side_effect = lambda topic_name, symbol: (
+            1 if symbol == "ETH/USD" else 0
+        )
+
+        await strategy_management_system.drop_revoked_symbols()
+
+        assert list(strategy_management_system.symbol_strategies) == ["BTC/USD"]
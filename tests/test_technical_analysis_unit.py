@@ -1,43 +1,69 @@
 import asyncio
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import numpy as np
 import pytest
+from pytest import approx
 
+from quantari.indicators import EMA, IndicatorGraph, MultiSymbolEngine
+from quantari.kafka_client import AsyncKafkaClient
 from quantari.technical_analysis_unit import TechnicalAnalysisUnit
+from quantari.timescale_client import AsyncTimescaleClient
+from quantari.timestamps import from_epoch_us, to_epoch_us
 
 
 class TestTechnicalAnalysisUnit:
     @pytest.fixture
-    @patch("quantari.technical_analysis_unit.KafkaClient")
-    @patch("quantari.technical_analysis_unit.TimescaleClient")
+    @patch("quantari.technical_analysis_unit.Checkpoint")
+    @patch("quantari.technical_analysis_unit.AsyncKafkaClient")
+    @patch("quantari.technical_analysis_unit.AsyncTimescaleClient")
     def technical_analysis_unit(
         self,
         mock_timescale_client,
         mock_kafka_client,
+        mock_checkpoint,
     ):
-        mock_timescale_client.return_value = MagicMock()
-        mock_kafka_client.return_value = MagicMock()
+        mock_timescale_client.return_value = AsyncMock(spec=AsyncTimescaleClient)
+        mock_kafka_client.return_value = AsyncMock(spec=AsyncKafkaClient)
+        mock_checkpoint.return_value = MagicMock()
 
         tau = TechnicalAnalysisUnit()
+        tau.kafka_client.pop_revoked.return_value = set()
+        tau.db_client.fetch_latest_candles.return_value = {}
 
         return tau
 
     @pytest.fixture
     def mock_indicators(self):
         mock1 = MagicMock()
-        mock1.calculate = MagicMock(return_value=1.0)
+        mock1.INPUTS = ()
+        mock1.key = MagicMock(return_value=("MockIndicator",))
+        mock1.update = MagicMock(return_value=1.0)
         mock1.__str__ = MagicMock(return_value="MockIndicator")
 
         mock2 = MagicMock()
-        mock2.calculate = MagicMock(return_value=2.0)
+        mock2.INPUTS = ()
+        mock2.key = MagicMock(return_value=("MockIndicator2",))
+        mock2.update = MagicMock(return_value=2.0)
         mock2.__str__ = MagicMock(return_value="MockIndicator2")
 
         return [mock1, mock2]
 
-    def test_close(self, technical_analysis_unit):
-        technical_analysis_unit.close()
+    @patch.dict("os.environ", {"INTERVAL_MINS": "5"})
+    @patch("quantari.technical_analysis_unit.AsyncTimescaleClient")
+    @patch("quantari.technical_analysis_unit.AsyncKafkaClient")
+    def test_group_per_interval(self, mock_kafka_client, mock_timescale_client):
+        tau = TechnicalAnalysisUnit()
+
+        # Units of other intervals do not share the partitions of the topic
+        assert tau.interval == 5
+        mock_kafka_client.assert_called_once_with("quantari-tau-5", "quantari-tau-5")
+
+    @pytest.mark.asyncio
+    async def test_close(self, technical_analysis_unit):
+        await technical_analysis_unit.close()
         technical_analysis_unit.kafka_client.close.assert_called_once()
-        technical_analysis_unit.db_client.close_connection.assert_called_once()
+        technical_analysis_unit.db_client.close_connection.assert_awaited_once()
 
     @pytest.mark.asyncio
     @patch.object(
@@ -49,40 +75,54 @@ class TestTechnicalAnalysisUnit:
     async def test_run_until_an_exception(
         self, mock_calculate_indicators, technical_analysis_unit
     ):
-        market_data = {"close": 1.0, "timestamp": "2025-05-10T09:11:41.000Z"}
+        market_data = {
+            "symbol": "BTC/USD",
+            "close": 1.0,
+            "timestamp": "2025-05-10T09:11:41.000Z",
+        }
 
+        technical_analysis_unit.checkpoint.load.return_value = None
         technical_analysis_unit.exception = False
-        technical_analysis_unit.kafka_client.pull_market_data.return_value = market_data
 
-        # Simulate the exception occurring after a short delay
-        async def stop_after_delay():
-            await asyncio.sleep(0.1)
+        async def consume(topic_name):
+            yield [market_data]
+            yield []
+
+            # Simulate the exception occurring once the topic is empty
             technical_analysis_unit.exception = True
+            yield []
 
-        asyncio.create_task(stop_after_delay())
+        technical_analysis_unit.kafka_client.consume = consume
 
         shutdown_event = asyncio.Event()
         await technical_analysis_unit.run(shutdown_event)
 
         # Setup Database Connection
         technical_analysis_unit.db_client.connect.assert_called_once()
-        technical_analysis_unit.db_client.create_market_table.assert_called_once()
+        technical_analysis_unit.db_client.migrate.assert_awaited_once()
+
+        # Warm up indicators from history on the first message of the symbol
+        technical_analysis_unit.checkpoint.load.assert_called_once()
+        technical_analysis_unit.db_client.fetch_latest_candles.assert_called_once()
+        assert technical_analysis_unit.active_symbols == {"BTC/USD"}
 
         # Setup Kafka producer
         technical_analysis_unit.kafka_client.create_consumer.assert_called_once()
         technical_analysis_unit.kafka_client.create_producer.assert_called_once()
-        technical_analysis_unit.kafka_client.subscribe_market_data.assert_called_once()
+        technical_analysis_unit.kafka_client.subscribe_market_data.assert_called_once_with(
+            None
+        )
 
-        # Pull market data
-        technical_analysis_unit.kafka_client.pull_market_data.assert_called_once()
+        # Commit offsets once the batch is processed
+        technical_analysis_unit.kafka_client.commit.assert_awaited_once()
 
         # Calculate indicators with recevied message
         mock_calculate_indicators.assert_called_once_with(
             technical_analysis_unit, market_data
         )
 
-        technical_analysis_unit.db_client.update_indicators.assert_called_once_with(
-            market_data["timestamp"], {"Indicator": 1}
+        technical_analysis_unit.db_client.save_indicators_many.assert_called_once_with(
+            [(market_data["timestamp"], market_data["symbol"], 1, {"Indicator": 1})]
         )
 
         market_indicators = market_data
@@ -92,10 +132,71 @@ class TestTechnicalAnalysisUnit:
             market_indicators
         )
 
+        # Final checkpoint when the unit stops, once the indicators are delivered
+        technical_analysis_unit.kafka_client.flush.assert_awaited_once()
+        technical_analysis_unit.checkpoint.save.assert_called_once()
+
+        await technical_analysis_unit.close()
+        assert technical_analysis_unit.indicator_buffer.task.done()
+
+    @pytest.mark.asyncio
+    @patch.object(
+        TechnicalAnalysisUnit,
+        "calculate_indicators",
+        return_value={"Indicator": 1},
+        autospec=True,
+    )
+    async def test_run_stops_when_rows_are_lost(
+        self, mock_calculate_indicators, technical_analysis_unit
+    ):
+        technical_analysis_unit.checkpoint.load.return_value = None
+        technical_analysis_unit.indicator_buffer.failed = 1
+
+        async def consume(topic_name):
+            yield [
+                {
+                    "symbol": "BTC/USD",
+                    "close": 1.0,
+                    "timestamp": "2025-05-10T09:11:41.000Z",
+                }
+            ]
+
+        technical_analysis_unit.kafka_client.consume = consume
+
+        await technical_analysis_unit.run(asyncio.Event())
+
+        # Neither the offsets nor the checkpoint of the lost rows are stored
+        assert technical_analysis_unit.exception
+        technical_analysis_unit.kafka_client.commit.assert_not_awaited()
+        technical_analysis_unit.checkpoint.save.assert_not_called()
+
+        await technical_analysis_unit.close()
+
+    def test_indicators_of_the_strategies(self, technical_analysis_unit):
+        # Only the indicators read by the default SimpleMACD are published
+        assert list(technical_analysis_unit.graph.outputs) == ["MACD_12_26_9"]
+
+    @patch.dict("os.environ", {"STRATEGIES": "SimpleMACD;SimpleMACD(fast=8)"})
+    @patch("quantari.technical_analysis_unit.Checkpoint")
+    @patch("quantari.technical_analysis_unit.AsyncKafkaClient")
+    @patch("quantari.technical_analysis_unit.AsyncTimescaleClient")
+    def test_indicators_of_configured_strategies(self, *mocks):
+        tau = TechnicalAnalysisUnit()
+
+        assert list(tau.graph.outputs) == ["MACD_12_26_9", "MACD_8_26_9"]
+        tau.graphs = {"BTC/USD": tau.graph}
+
+        indicators = tau.calculate_indicators({"symbol": "BTC/USD", "close": 1.0})
+        assert set(indicators) == {"MACD_12_26_9", "MACD_8_26_9"}
+
     def test_calculate_indicators(self, technical_analysis_unit, mock_indicators):
-        technical_analysis_unit.indicators = mock_indicators
+        technical_analysis_unit.graphs = {"BTC/USD": IndicatorGraph(mock_indicators)}
 
-        mock_message = {"close": 1.0, "timestamp": "2025-05-10T09:11:41.000Z"}
+        mock_message = {
+            "symbol": "BTC/USD",
+            "close": 1.0,
+            "timestamp": "2025-05-10T09:11:41.000Z",
+        }
         indicators = technical_analysis_unit.calculate_indicators(mock_message)
 
         expected = {"MockIndicator": 1.0, "MockIndicator2": 2.0}
@@ -103,10 +204,241 @@ class TestTechnicalAnalysisUnit:
 
         # Calculate values for all indicators
         for indicator in mock_indicators:
-            indicator.calculate.assert_called_with(mock_message)
+            indicator.update.assert_called_once()
+            assert indicator.update.call_args.args[0] == mock_message
+
+    @pytest.mark.asyncio
+    async def test_warm_up(self, technical_analysis_unit):
+        technical_analysis_unit.graph = IndicatorGraph([EMA(2)])
+        technical_analysis_unit.warmup_candles = 2
+
+        candles = {
+            "timestamp": np.array([1_000_000, 2_000_000]),
+            "close": np.array([1.0, 2.0]),
+        }
+        technical_analysis_unit.db_client.fetch_latest_candles.return_value = {
+            "BTC/USD": candles
+        }
+
+        await technical_analysis_unit.warm_up({"BTC/USD": 3_000_000})
+
+        # Only the candles stored before the first consumed one
+        technical_analysis_unit.db_client.fetch_latest_candles.assert_called_once_with(
+            {"BTC/USD": from_epoch_us(3_000_000)}, 1, 2
+        )
+
+        # Seeds a graph of the symbol in a single batch, the template is untouched
+        ema = EMA(2)
+        ema.calculate({"close": 1.0})
+        ema.calculate({"close": 2.0})
+
+        graph = technical_analysis_unit.graphs["BTC/USD"]
+        assert graph.nodes[("EMA", "close", 2)].last_ema == approx(ema.last_ema)
+        assert graph is not technical_analysis_unit.graph
+        assert technical_analysis_unit.active_symbols == {"BTC/USD"}
+        assert technical_analysis_unit.last_timestamps == {}
+
+    @pytest.mark.asyncio
+    async def test_warm_up_multi_symbol(self, technical_analysis_unit):
+        technical_analysis_unit.engine = MultiSymbolEngine(
+            [EMA(2)], ["BTC/USD", "ETH/USD"]
+        )
+        technical_analysis_unit.graph = IndicatorGraph([EMA(2)])
+
+        technical_analysis_unit.db_client.fetch_latest_candles.return_value = {
+            "ETH/USD": {
+                "timestamp": np.array([1_000_000, 2_000_000]),
+                "close": np.array([3.0, 6.0]),
+            }
+        }
+
+        await technical_analysis_unit.warm_up({"ETH/USD": 3_000_000})
+
+        # The symbol row is seeded with the state of the batch
+        state = technical_analysis_unit.engine.states[("EMA", "close", 2)]
+        assert state.last.tolist() == [0, 2 * 6 / 3 + (3 * 2 / 3) / 3]
+        assert technical_analysis_unit.active_symbols == {"ETH/USD"}
+
+    @pytest.mark.asyncio
+    async def test_warm_up_without_history(
+        self, technical_analysis_unit, mock_indicators
+    ):
+        technical_analysis_unit.graph = IndicatorGraph(mock_indicators)
+        technical_analysis_unit.db_client.fetch_latest_candles.return_value = {
+            "BTC/USD": {"timestamp": np.array([]), "close": np.array([])}
+        }
+
+        await technical_analysis_unit.warm_up({"BTC/USD": 1_000_000})
+
+        for indicator in mock_indicators:
+            indicator.update_batch.assert_not_called()
+
+        # Indicators start from scratch
+        assert "BTC/USD" in technical_analysis_unit.graphs
+        assert technical_analysis_unit.last_timestamps == {}
+
+    @pytest.mark.asyncio
+    async def test_process_stored_backlog(self, technical_analysis_unit):
+        # Candles 0 to 4 are stored, 3 and 4 are still in the topic
+        technical_analysis_unit.graph = IndicatorGraph([EMA(2)])
+        stored = np.arange(5) * 60_000_000
+
+        async def fetch_latest_candles(bounds, interval, limit):
+            before = stored[stored < to_epoch_us(bounds["BTC/USD"])]
+            return {"BTC/USD": {"timestamp": before, "close": before / 1e6}}
+
+        technical_analysis_unit.db_client.fetch_latest_candles = fetch_latest_candles
+        messages = [
+            {
+                "symbol": "BTC/USD",
+                "close": float(timestamp / 1e6),
+                "timestamp": from_epoch_us(int(timestamp)).isoformat(),
+            }
+            for timestamp in stored[3:]
+        ]
+
+        await technical_analysis_unit.process_market_data(messages)
+
+        # Warmed up on 0 to 2, every consumed candle is published and stored
+        publish = technical_analysis_unit.kafka_client.publish_market_indicators
+        assert publish.await_count == 2
+        assert len(technical_analysis_unit.indicator_buffer.rows) == 2
+
+        ema = EMA(2)
+        for close in [0.0, 60.0, 120.0, 180.0, 240.0]:
+            ema.calculate({"close": close})
+        assert messages[1]["indicators"]["EMA_2"] == approx(ema.last_ema)
 
-        # Save calculated values into the database
-        expected = {"MockIndicators": 1.0, "MockIndicators2": 2.0}
-        technical_analysis_unit.db_client.update_indicators.asssert_called_once_with(
-            mock_message["timestamp"], expected
+    def test_drop_symbol(self, technical_analysis_unit):
+        technical_analysis_unit.graphs = {"BTC/USD": technical_analysis_unit.graph}
+        technical_analysis_unit.active_symbols = {"BTC/USD"}
+        technical_analysis_unit.last_timestamps = {"BTC/USD": 2_000_000}
+
+        technical_analysis_unit.drop_symbol("BTC/USD")
+
+        assert technical_analysis_unit.graphs == {}
+        assert technical_analysis_unit.active_symbols == set()
+        assert technical_analysis_unit.last_timestamps == {}
+
+    @pytest.mark.asyncio
+    async def test_drop_revoked_symbols(self, technical_analysis_unit):
+        technical_analysis_unit.active_symbols = {"BTC/USD", "ETH/USD"}
+        technical_analysis_unit.kafka_client.pop_revoked.return_value = {
+            ("market_data", 1)
+        }
+        technical_analysis_unit.kafka_client.partition_for.side_effect = (
+            lambda topic_name, symbol: 1 if symbol == "ETH/USD" else 0
         )
+
+        await technical_analysis_unit.drop_revoked_symbols()
+
+        assert technical_analysis_unit.active_symbols == {"BTC/USD"}
+
+    def test_is_processed(self, technical_analysis_unit):
+        message = {"symbol": "BTC/USD", "timestamp": "1970-01-01T00:00:02Z"}
+
+        # Nothing processed yet
+        assert not technical_analysis_unit.is_processed(message)
+
+        technical_analysis_unit.last_timestamps = {"BTC/USD": 2_000_000}
+        assert technical_analysis_unit.is_processed(message)
+
+        message = {"symbol": "BTC/USD", "timestamp": "1970-01-01T00:00:03Z"}
+        assert not technical_analysis_unit.is_processed(message)
+
+        # Each symbol is tracked on its own
+        message = {"symbol": "ETH/USD", "timestamp": "1970-01-01T00:00:01Z"}
+        assert not technical_analysis_unit.is_processed(message)
+
+    @pytest.mark.asyncio
+    async def test_process_market_data(self, technical_analysis_unit):
+        technical_analysis_unit.graphs = {"BTC/USD": technical_analysis_unit.graph}
+        technical_analysis_unit.active_symbols = {"BTC/USD"}
+        technical_analysis_unit.last_timestamps = {"BTC/USD": 2_000_000}
+        messages = [
+            {"symbol": "BTC/USD", "close": 1.0, "timestamp": "1970-01-01T00:00:02Z"},
+            {"symbol": "BTC/USD", "close": 2.0, "timestamp": "1970-01-01T00:00:03Z"},
+        ]
+
+        await technical_analysis_unit.process_market_data(messages)
+
+        # Already processed candles are skipped
+        technical_analysis_unit.db_client.fetch_latest_candles.assert_not_called()
+        await technical_analysis_unit.indicator_buffer.flush()
+        (rows,) = technical_analysis_unit.db_client.save_indicators_many.call_args.args
+        assert [row[1] for row in rows] == ["BTC/USD"]
+        technical_analysis_unit.kafka_client.publish_market_indicators.assert_called_once_with(
+            messages[1]
+        )
+        assert "indicators" in messages[1]
+        assert technical_analysis_unit.last_timestamps == {"BTC/USD": 3_000_000}
+
+    def test_calculate_indicators_batch_multi_symbol(self, technical_analysis_unit):
+        technical_analysis_unit.engine = MultiSymbolEngine([EMA(2)])
+
+        messages = [
+            {"symbol": "BTC/USD", "close": 3.0},
+            {"symbol": "ETH/USD", "close": 6.0},
+        ]
+
+        assert technical_analysis_unit.calculate_indicators_batch(messages) == [
+            {"EMA_2": approx(2.0)},
+            {"EMA_2": approx(4.0)},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_save_checkpoint(self, technical_analysis_unit):
+        technical_analysis_unit.last_timestamps = {"BTC/USD": 2_000_000}
+        technical_analysis_unit.kafka_client.positions.return_value = {
+            ("market_data", 0): 10
+        }
+
+        await technical_analysis_unit.save_checkpoint()
+
+        state, offsets = technical_analysis_unit.checkpoint.save.call_args.args
+        assert state["outputs"] == technical_analysis_unit.graph.outputs
+        assert state["graphs"] is technical_analysis_unit.graphs
+        assert state["engine"] is None
+        assert state["last_timestamps"] == {"BTC/USD": 2_000_000}
+        assert offsets == {("market_data", 0): 10}
+
+    def test_restore_checkpoint(self, technical_analysis_unit):
+        graph = IndicatorGraph(technical_analysis_unit.indicators)
+        offsets = {("market_data", 0): 10}
+
+        technical_analysis_unit.checkpoint.load.return_value = (
+            {
+                "outputs": graph.outputs,
+                "graphs": {"BTC/USD": graph},
+                "engine": None,
+                "active_symbols": {"BTC/USD"},
+                "last_timestamps": {"BTC/USD": 2_000_000},
+            },
+            offsets,
+        )
+
+        assert technical_analysis_unit.restore_checkpoint() == offsets
+        assert technical_analysis_unit.graphs == {"BTC/USD": graph}
+        assert technical_analysis_unit.active_symbols == {"BTC/USD"}
+        assert technical_analysis_unit.last_timestamps == {"BTC/USD": 2_000_000}
+
+    def test_restore_checkpoint_with_different_indicators(
+        self, technical_analysis_unit
+    ):
+        technical_analysis_unit.checkpoint.load.return_value = (
+            {
+                "outputs": IndicatorGraph([EMA(10)]).outputs,
+                "graphs": {},
+                "engine": None,
+                "active_symbols": set(),
+                "last_timestamps": {"BTC/USD": 2_000_000},
+            },
+            {("market_data", 0): 10},
+        )
+
+        assert technical_analysis_unit.restore_checkpoint() is None
+        assert technical_analysis_unit.last_timestamps == {}
+
+    def test_restore_missing_checkpoint(self, technical_analysis_unit):
+        technical_analysis_unit.checkpoint.load.return_value = None
+        assert technical_analysis_unit.restore_checkpoint() is None
@@ -1,9 +1,23 @@
-import json
-from unittest.mock import MagicMock, patch
+import struct
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import numpy as np
+import psycopg
 import pytest
 
-from quantari.timescale_client import TimescaleClient
+from quantari.timescale_client import (
+    CREATE_SCHEMA_VERSION,
+    INSERT_SCHEMA_VERSION,
+    LOCK_SCHEMA,
+    MIGRATIONS,
+    POSTGRES_EPOCH_US,
+    SELECT_SCHEMA_VERSION,
+    AsyncTimescaleClient,
+    TimescaleClient,
+    connection_kwargs,
+    policy_statements,
+)
 
 
 class TestTimescaleClient:
@@ -15,6 +29,7 @@ class TestTimescaleClient:
         "close": 4,
         "volume": 5,
         "symbol": "BTCUSD",
+        "interval": 1,
     }
 
     @pytest.fixture
@@ -29,6 +44,8 @@ class TestTimescaleClient:
         tc = TimescaleClient()
         assert tc.client is None
         assert tc.cursor is None
+        assert tc.pool is None
+        assert not tc.pooled
 
     def test_delete(self, timescale_client):
         with patch.object(TimescaleClient, "close_connection") as mock_close_connection:
@@ -43,7 +60,9 @@ class TestTimescaleClient:
             timescale_client.connect()
 
             mock_connect.assert_called_once_with(
-                " ".join(timescale_client.DB_SETTINGS), autocommit=True
+                " ".join(timescale_client.DB_SETTINGS),
+                autocommit=True,
+                options="-c statement_timeout=30000",
             )
 
             assert timescale_client.client == mock_connect.return_value
@@ -51,6 +70,44 @@ class TestTimescaleClient:
                 timescale_client.cursor == timescale_client.client.cursor.return_value
             )
 
+    @patch.dict("os.environ", {"TIMESCALEDB_STATEMENT_TIMEOUT_MS": "0"})
+    def test_connection_kwargs_without_statement_timeout(self):
+        assert connection_kwargs() == {"autocommit": True}
+
+    @patch.dict(
+        "os.environ",
+        {"TIMESCALEDB_POOL_MIN_SIZE": "2", "TIMESCALEDB_POOL_MAX_SIZE": "8"},
+    )
+    @patch("quantari.timescale_client.ConnectionPool")
+    def test_connect_pooled(self, mock_pool):
+        tc = TimescaleClient(pooled=True)
+        tc.connect()
+
+        mock_pool.assert_called_once_with(
+            " ".join(TimescaleClient.DB_SETTINGS),
+            check=mock_pool.check_connection,
+            min_size=2,
+            max_size=8,
+            kwargs=connection_kwargs(),
+            open=False,
+        )
+        mock_pool.return_value.open.assert_called_once_with(wait=True)
+        assert tc.client is None
+
+        # Each call takes a connection of the pool
+        tc.save_market_data(self.MOCK_CANDLE_DATA)
+
+        connection = mock_pool.return_value.connection.return_value.__enter__()
+        cursor = connection.cursor.return_value.__enter__()
+        cursor.execute.assert_called_once_with(
+            TimescaleClient.UPSERT_MARKET_DATA,
+            TimescaleClient.market_data_params(self.MOCK_CANDLE_DATA),
+        )
+
+        mock_pool.return_value.closed = False
+        tc.close_connection()
+        mock_pool.return_value.close.assert_called_once()
+
     def test_close_connection(self, timescale_client):
         timescale_client.client.closed = False
 
@@ -67,75 +124,348 @@ class TestTimescaleClient:
         timescale_client.cursor.close.assert_not_called()
         timescale_client.client.close.assert_not_called()
 
-    def test_create_market_table_if_exists(self, timescale_client):
-        # If table does not exist we create it
-        timescale_client.cursor.fetchone.return_value = [False]
-        timescale_client.create_market_table()
-        assert timescale_client.cursor.execute.call_count == 3
+    def test_migrate(self, timescale_client):
+        timescale_client.cursor.fetchone.return_value = [0]
+
+        timescale_client.migrate()
+
+        executed = [
+            call.args[0] for call in timescale_client.cursor.execute.call_args_list
+        ]
+        assert executed[:3] == [
+            LOCK_SCHEMA,
+            CREATE_SCHEMA_VERSION,
+            SELECT_SCHEMA_VERSION,
+        ]
+
+        # Every migration is applied in order and recorded
+        assert executed[3 : 3 + len(MIGRATIONS[0])] == MIGRATIONS[0]
+        versions = [
+            call.args[1]
+            for call in timescale_client.cursor.execute.call_args_list
+            if call.args[0] == INSERT_SCHEMA_VERSION
+        ]
+        assert versions == [(number,) for number in range(1, len(MIGRATIONS) + 1)]
+        assert any("timestamp DESC" in query for query in executed)
+
+        timescale_client.cursor.connection.transaction.assert_called_once()
+
+    def test_migrate_up_to_date(self, timescale_client):
+        timescale_client.cursor.fetchone.return_value = [len(MIGRATIONS)]
+
+        timescale_client.migrate()
+
+        # Only the policies are applied again
+        executed = timescale_client.cursor.execute.call_args_list[3:]
+        assert [(call.args[0], call.args[1]) for call in executed] == (
+            policy_statements()
+        )
+
+    @patch.dict(
+        "os.environ",
+        {"TIMESCALEDB_COMPRESS_AFTER": "", "TIMESCALEDB_RETENTION": "365 days"},
+    )
+    def test_policy_statements(self):
+        statements = policy_statements()
 
-        # If table exists we do not create it again
-        timescale_client.cursor.fetchone.return_value = [True]
-        timescale_client.create_market_table()
-        assert timescale_client.cursor.execute.call_count == 4
+        assert statements[0][1] == ("1 day",)
+        assert not any("add_compression_policy" in query for query, _ in statements)
+
+        # Candles and indicators follow the same policies
+        for table in ("market_ochl", "market_indicators"):
+            assert (
+                f"SELECT add_retention_policy('{table}', %s::INTERVAL);",
+                ("365 days",),
+            ) in statements
 
     def test_fetch_market_data(self, timescale_client):
         timescale_client.cursor.fetchone = MagicMock(return_value=[1])
 
-        result = timescale_client.fetch_market_data("2023-01-01T00:00:00")
+        result = timescale_client.fetch_market_data("2023-01-01T00:00:00", "BTCUSD", 1)
 
         timescale_client.cursor.execute.assert_called_once_with(
-            "SELECT * FROM market_ochl WHERE timestamp = %s;", ("2023-01-01T00:00:00",)
+            "SELECT * FROM market_ochl WHERE timestamp = %s AND symbol = %s AND interval = %s;",
+            ("2023-01-01T00:00:00", "BTCUSD", 1),
         )
 
         assert result == [1]
 
-    def test_update_market_data(self, timescale_client):
-        timescale_client.update_market_data(self.MOCK_CANDLE_DATA)
+    def test_save_market_data(self, timescale_client):
+        timescale_client.save_market_data(self.MOCK_CANDLE_DATA)
 
+        # A single upsert, no lookup of the existing row
         timescale_client.cursor.execute.assert_called_once_with(
-            "UPDATE market_ochl SET open = %s, high = %s, low = %s, close = %s, volume = %s WHERE timestamp = %s AND symbol = %s;",
-            (1, 2, 3, 4, 5, "2023-01-01T00:00:00", "BTCUSD"),
+            "INSERT INTO market_ochl (timestamp, open, high, low, close, volume, symbol, interval) VALUES (%s, %s, %s, %s, %s, %s, %s, %s) ON CONFLICT (symbol, interval, timestamp) DO UPDATE SET open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low, close = EXCLUDED.close, volume = EXCLUDED.volume;",
+            ("2023-01-01T00:00:00", 1, 2, 3, 4, 5, "BTCUSD", 1),
         )
 
-    def test_insert_market_data(self, timescale_client):
-        timescale_client.insert_market_data(self.MOCK_CANDLE_DATA)
+    def test_save_market_data_many(self, timescale_client):
+        other = {**self.MOCK_CANDLE_DATA, "symbol": "ETHUSD"}
 
-        timescale_client.cursor.execute.assert_called_once_with(
-            "INSERT INTO market_ochl (timestamp, open, high, low, close, volume, symbol, indicators) VALUES (%s, %s, %s, %s, %s, %s, %s, %s);",
-            ("2023-01-01T00:00:00", 1, 2, 3, 4, 5, "BTCUSD", "{}"),
+        timescale_client.save_market_data_many([self.MOCK_CANDLE_DATA, other])
+
+        timescale_client.cursor.executemany.assert_called_once_with(
+            TimescaleClient.UPSERT_MARKET_DATA,
+            [
+                ("2023-01-01T00:00:00", 1, 2, 3, 4, 5, "BTCUSD", 1),
+                ("2023-01-01T00:00:00", 1, 2, 3, 4, 5, "ETHUSD", 1),
+            ],
         )
 
-    def test_save_market_data(self, timescale_client):
-        timescale_client.fetch_market_data = MagicMock(return_value=None)
-        timescale_client.insert_market_data = MagicMock()
-        timescale_client.update_market_data = MagicMock()
+        timescale_client.save_market_data_many([])
+        timescale_client.cursor.executemany.assert_called_once()
 
-        timescale_client.save_market_data(self.MOCK_CANDLE_DATA)
+    def test_fetch_latest_candles(self, timescale_client):
+        timestamp = datetime(1970, 1, 1, 0, 0, 1, tzinfo=timezone.utc)
+        timescale_client.cursor.fetchall.return_value = [
+            ("BTCUSD", timestamp, 1, 2, 3, 4, 5),
+            ("BTCUSD", timestamp, 6, 7, 8, 9, 10),
+        ]
 
-        timescale_client.insert_market_data.assert_called_once_with(
-            self.MOCK_CANDLE_DATA
+        candles = timescale_client.fetch_latest_candles(
+            {"BTCUSD": "1970-01-01T00:00:02Z", "ETHUSD": "1970-01-01T00:00:03Z"}, 1, 2
         )
-        timescale_client.update_market_data.assert_not_called()
 
-        timescale_client.fetch_market_data.return_value = [1]
-        timescale_client.save_market_data(self.MOCK_CANDLE_DATA)
+        # All the symbols in one statement, each one bounded by its timestamp
+        query, params = timescale_client.cursor.execute.call_args.args
+        assert "market_ochl.timestamp < bound.timestamp" in query
+        assert "ORDER BY market_ochl.timestamp DESC LIMIT %s" in query
+        assert params == (
+            ["BTCUSD", "ETHUSD"],
+            ["1970-01-01T00:00:02Z", "1970-01-01T00:00:03Z"],
+            1,
+            2,
+        )
+        timescale_client.cursor.execute.assert_called_once()
+
+        assert candles["BTCUSD"]["timestamp"].tolist() == [1_000_000, 1_000_000]
+        assert candles["BTCUSD"]["open"].tolist() == [1, 6]
+        assert candles["BTCUSD"]["close"].tolist() == [4, 9]
+        assert candles["BTCUSD"]["volume"].dtype == "float64"
+        assert len(candles["ETHUSD"]["close"]) == 0
+
+    @staticmethod
+    def copy_blocks(candles: list[tuple], block_size: int) -> list[bytes]:
+        # Binary COPY output split in blocks not aligned on the candles,
+        # candles of 7 values hold the position of their symbol first
+        data = b"PGCOPY\n\xff\r\n\x00" + bytes(8)
+        for timestamp, *values in candles:
+            data += struct.pack(
+                ">hiq", len(values) + 1, 8, timestamp - POSTGRES_EPOCH_US
+            )
+            if len(values) == 6:
+                data += struct.pack(">ii", 4, values.pop(0))
+            for value in values:
+                data += struct.pack(">id", 8, value)
+        data += struct.pack(">h", -1)
+
+        return [data[i : i + block_size] for i in range(0, len(data), block_size)]
+
+    def test_iter_candles(self, timescale_client):
+        candles = [(60_000_000 * i, i, i + 1, i - 1, i + 0.5, 10 * i) for i in range(5)]
+        copy = timescale_client.cursor.copy.return_value.__enter__.return_value
+        copy.__iter__.return_value = self.copy_blocks(candles, 7)
+
+        chunks = list(
+            timescale_client.iter_candles(
+                "BTCUSD", "2023-01-01", "2023-01-02", 1, chunk_size=2
+            )
+        )
 
-        timescale_client.insert_market_data.assert_called_once()
-        timescale_client.update_market_data.assert_called_once_with(
-            self.MOCK_CANDLE_DATA
+        timescale_client.cursor.copy.assert_called_once_with(
+            TimescaleClient.COPY_CANDLES, ("BTCUSD", 1, "2023-01-01", "2023-01-02")
+        )
+        assert [len(chunk["timestamp"]) for chunk in chunks] == [2, 2, 1]
+        assert chunks[1]["timestamp"].tolist() == [120_000_000, 180_000_000]
+        assert chunks[1]["timestamp"].dtype == np.int64
+        assert chunks[2]["close"].tolist() == [4.5]
+        assert chunks[2]["volume"].dtype == np.float64
+
+    def test_iter_symbols_candles(self, timescale_client):
+        candles = [(60_000_000 * i, i % 2 + 1, i, i, i, i, i) for i in range(5)]
+        copy = timescale_client.cursor.copy.return_value.__enter__.return_value
+        copy.__iter__.return_value = self.copy_blocks(candles, 5)
+
+        chunks = list(
+            timescale_client.iter_symbols_candles(
+                ["BTCUSD", "ETHUSD"], "2023-01-01", "2023-01-02", 1, chunk_size=3
+            )
         )
 
-    def test_update_indicators(self, timescale_client):
-        timestamp = "2023-01-01T00:00:00"
-        indicators = {"EMA": 1.0, "SMA": 2.0}
+        # A single COPY for all the symbols
+        timescale_client.cursor.copy.assert_called_once_with(
+            TimescaleClient.COPY_SYMBOLS_CANDLES,
+            (["BTCUSD", "ETHUSD"], ["BTCUSD", "ETHUSD"], 1, "2023-01-01", "2023-01-02"),
+        )
+        assert [len(chunk["timestamp"]) for chunk in chunks] == [3, 2]
+        assert chunks[0]["symbol"].tolist() == ["BTCUSD", "ETHUSD", "BTCUSD"]
+        assert chunks[1]["timestamp"].tolist() == [180_000_000, 240_000_000]
+        assert chunks[1]["close"].tolist() == [3, 4]
+
+    def test_fetch_candles(self, timescale_client):
+        candles = [(60_000_000 * i, i, i + 1, i - 1, i + 0.5, 10 * i) for i in range(3)]
+        copy = timescale_client.cursor.copy.return_value.__enter__.return_value
+        copy.__iter__.return_value = self.copy_blocks(candles, 1024)
+
+        columns = timescale_client.fetch_candles(
+            "BTCUSD", "2023-01-01", "2023-01-02", 1
+        )
 
-        timescale_client.update_indicators(timestamp, indicators)
+        assert columns["timestamp"].tolist() == [0, 60_000_000, 120_000_000]
+        assert columns["open"].tolist() == [0, 1, 2]
 
-        timescale_client.cursor.execute.assert_called_once_with(
-            "UPDATE market_ochl SET indicators = %s WHERE timestamp = %s;",
-            (json.dumps(indicators), timestamp),
+        # No candles in the range
+        copy.__iter__.return_value = self.copy_blocks([], 1024)
+        columns = timescale_client.fetch_candles(
+            "BTCUSD", "2023-01-01", "2023-01-02", 1
+        )
+        assert set(columns) == {"timestamp", "open", "high", "low", "close", "volume"}
+        assert len(columns["close"]) == 0
+
+    def test_save_indicators(self, timescale_client):
+        timestamp = "2023-01-01T00:00:00"
+        indicators = {"EMA": 1.0, "MACD": [2.0, 3.0], "RSI": None}
+
+        timescale_client.save_indicators(timestamp, "BTCUSD", 1, indicators)
+
+        # One row per value, vectors are stored from component 1
+        timescale_client.cursor.executemany.assert_called_once_with(
+            "INSERT INTO market_indicators (timestamp, symbol, interval, indicator, component, value) VALUES (%s, %s, %s, %s, %s, %s) ON CONFLICT (symbol, interval, indicator, component, timestamp) DO UPDATE SET value = EXCLUDED.value;",
+            [
+                (timestamp, "BTCUSD", 1, "EMA", 0, 1.0),
+                (timestamp, "BTCUSD", 1, "MACD", 1, 2.0),
+                (timestamp, "BTCUSD", 1, "MACD", 2, 3.0),
+            ],
         )
 
+    def test_save_indicators_many(self, timescale_client):
+        timestamp = "2023-01-01T00:00:00"
+        rows = [
+            (timestamp, "BTCUSD", 1, {"EMA": 1.0}),
+            (timestamp, "ETHUSD", 1, {"EMA": 2.0}),
+        ]
+
+        timescale_client.save_indicators_many(rows)
+
+        timescale_client.cursor.executemany.assert_called_once_with(
+            TimescaleClient.UPSERT_INDICATORS,
+            [
+                (timestamp, "BTCUSD", 1, "EMA", 0, 1.0),
+                (timestamp, "ETHUSD", 1, "EMA", 0, 2.0),
+            ],
+        )
+
+        # Nothing to write without values
+        timescale_client.save_indicators_many([(timestamp, "BTCUSD", 1, {})])
+        timescale_client.cursor.executemany.assert_called_once()
+
     def test_drop_table(self, timescale_client):
         timescale_client.drop_table()
-        timescale_client.cursor.execute("DROP TABLE IF EXISTS market_ochl;")
+
+        query = timescale_client.cursor.execute.call_args.args[0]
+        assert query.startswith("DROP TABLE IF EXISTS market_ochl, market_indicators")
+        assert "schema_version" in query
+
+
+class TestAsyncTimescaleClient:
+    @pytest.fixture
+    def cursor(self):
+        return AsyncMock()
+
+    @pytest.fixture
+    def timescale_client(self, cursor):
+        connection = MagicMock()
+        connection.cursor.return_value.__aenter__.return_value = cursor
+
+        tc = AsyncTimescaleClient()
+        tc.pool = MagicMock()
+        tc.pool.connection.return_value.__aenter__.return_value = connection
+        return tc
+
+    @pytest.mark.asyncio
+    @patch("quantari.timescale_client.AsyncConnectionPool")
+    async def test_connect(self, mock_pool):
+        mock_pool.return_value.open = AsyncMock()
+        mock_pool.return_value.close = AsyncMock()
+        mock_pool.return_value.closed = False
+
+        tc = AsyncTimescaleClient()
+        await tc.connect()
+
+        assert mock_pool.call_args.kwargs["check"] is mock_pool.check_connection
+        assert mock_pool.call_args.kwargs["kwargs"] == connection_kwargs()
+        mock_pool.return_value.open.assert_awaited_once_with(wait=True)
+
+        await tc.close_connection()
+        mock_pool.return_value.close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_save_market_data_many(self, timescale_client, cursor):
+        await timescale_client.save_market_data_many(
+            [TestTimescaleClient.MOCK_CANDLE_DATA]
+        )
+
+        cursor.executemany.assert_awaited_once_with(
+            TimescaleClient.UPSERT_MARKET_DATA,
+            [("2023-01-01T00:00:00", 1, 2, 3, 4, 5, "BTCUSD", 1)],
+        )
+
+        await timescale_client.save_market_data_many([])
+        cursor.executemany.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_save_indicators_many(self, timescale_client, cursor):
+        timestamp = "2023-01-01T00:00:00"
+
+        await timescale_client.save_indicators_many(
+            [(timestamp, "BTCUSD", 1, {"EMA": 1.0})]
+        )
+
+        cursor.executemany.assert_awaited_once_with(
+            TimescaleClient.UPSERT_INDICATORS,
+            [(timestamp, "BTCUSD", 1, "EMA", 0, 1.0)],
+        )
+
+    @pytest.mark.asyncio
+    async def test_fetch_latest_candles(self, timescale_client, cursor):
+        cursor.fetchall.return_value = [
+            ("BTCUSD", datetime(2023, 1, 1, tzinfo=timezone.utc), 1, 2, 0, 1.5, 10),
+        ]
+
+        candles = await timescale_client.fetch_latest_candles(
+            {"BTCUSD": "2023-01-01T00:01:00Z"}, 1, 500
+        )
+
+        cursor.execute.assert_awaited_once_with(
+            TimescaleClient.FETCH_LATEST_CANDLES,
+            (["BTCUSD"], ["2023-01-01T00:01:00Z"], 1, 500),
+        )
+        assert candles["BTCUSD"]["close"].tolist() == [1.5]
+
+    @pytest.mark.asyncio
+    async def test_migrate(self, timescale_client, cursor):
+        cursor.connection = MagicMock()
+        cursor.fetchone.return_value = [len(MIGRATIONS) - 1]
+
+        await timescale_client.migrate()
+
+        # Only the last migration is pending
+        executed = [call.args[0] for call in cursor.execute.await_args_list]
+        assert executed[3 : -len(policy_statements())] == [
+            *MIGRATIONS[-1],
+            INSERT_SCHEMA_VERSION,
+        ]
+        cursor.connection.transaction.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_run_retries_dropped_connection(self, timescale_client, cursor):
+        cursor.execute.side_effect = [psycopg.OperationalError("closed"), None]
+
+        await timescale_client.run(lambda c: c.execute("SELECT 1;"))
+
+        assert cursor.execute.await_count == 2
+
+        # Only once, a database down is still an error
+        cursor.execute.side_effect = psycopg.OperationalError("closed")
+        with pytest.raises(psycopg.OperationalError):
+            await timescale_client.run(lambda c: c.execute("SELECT 1;"))
@@ -0,0 +1,20 @@
+from datetime import datetime, timezone
+
+from quantari.timestamps import from_epoch_us, to_datetime, to_epoch_us
+
+
+def test_to_datetime():
+    # Naive timestamps are considered UTC
+    assert to_datetime("2023-01-01T00:00:00") == datetime(
+        2023, 1, 1, tzinfo=timezone.utc
+    )
+    assert to_datetime("2023-01-01T00:00:00.000000000Z") == datetime(
+        2023, 1, 1, tzinfo=timezone.utc
+    )
+
+
+def test_epoch_round_trip():
+    epoch = to_epoch_us("2023-01-01T00:00:00.123456Z")
+
+    assert epoch == 1_672_531_200_123_456
+    assert from_epoch_us(epoch) == datetime(2023, 1, 1, 0, 0, 0, 123456, timezone.utc)
@@ -0,0 +1,161 @@
+import asyncio
+import os
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from quantari.write_buffer import WriteBuffer
+
+
+def write_buffer(write_many, **environment) -> WriteBuffer:
+    environment = {key: str(value) for key, value in environment.items()}
+    with patch.dict(os.environ, environment):
+        return WriteBuffer(write_many, "rows")
+
+
+@pytest.mark.asyncio
+async def test_flush_in_batches():
+    write_many = AsyncMock()
+    buffer = write_buffer(write_many, TIMESCALEDB_BATCH_SIZE=2)
+
+    await buffer.put([1, 2, 3])
+    write_many.assert_not_called()
+
+    await buffer.flush()
+
+    assert [call.args[0] for call in write_many.await_args_list] == [[1, 2], [3]]
+    assert not buffer.rows
+
+
+@pytest.mark.asyncio
+async def test_run_flushes_on_size_and_time():
+    write_many = AsyncMock()
+    buffer = write_buffer(
+        write_many, TIMESCALEDB_BATCH_SIZE=2, TIMESCALEDB_FLUSH_INTERVAL_MS=10
+    )
+    buffer.start()
+
+    # A full batch is written right away
+    await buffer.put([1, 2])
+    await asyncio.sleep(0)
+    write_many.assert_awaited_once_with([1, 2])
+
+    # A partial one once the interval elapsed
+    await buffer.put([3])
+    await asyncio.sleep(0.05)
+    write_many.assert_awaited_with([3])
+
+    await buffer.close()
+    assert buffer.task.done()
+
+
+@pytest.mark.asyncio
+async def test_close_drains_the_buffer():
+    write_many = AsyncMock()
+    buffer = write_buffer(write_many, TIMESCALEDB_FLUSH_INTERVAL_MS=60000)
+    buffer.start()
+
+    await buffer.put([1, 2, 3])
+    await buffer.close()
+
+    write_many.assert_awaited_once_with([1, 2, 3])
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_rows_when_full():
+    write_many = AsyncMock()
+    buffer = write_buffer(
+        write_many, TIMESCALEDB_BUFFER_SIZE=2, TIMESCALEDB_BUFFER_POLICY="drop"
+    )
+
+    await buffer.put([1, 2, 3])
+
+    assert list(buffer.rows) == [2, 3]
+    assert buffer.dropped == 1
+
+    # Dropped rows are lost, the callers are told on flush
+    with pytest.raises(RuntimeError):
+        await buffer.flush()
+    write_many.assert_awaited_once_with([2, 3])
+
+
+@pytest.mark.asyncio
+async def test_block_when_full():
+    write_many = AsyncMock()
+    buffer = write_buffer(write_many, TIMESCALEDB_BUFFER_SIZE=2)
+
+    await buffer.put([1, 2])
+    put = asyncio.create_task(buffer.put([3]))
+    await asyncio.sleep(0)
+    assert not put.done()
+
+    # Room is made by writing the buffered rows
+    await buffer.flush()
+    await put
+
+    assert list(buffer.rows) == [3]
+    assert buffer.dropped == 0
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        write_buffer(AsyncMock(), TIMESCALEDB_BUFFER_POLICY="spill")
+
+
+@pytest.mark.asyncio
+@patch("quantari.write_buffer.asyncio.sleep", new_callable=AsyncMock)
+async def test_retry_failed_writes(mock_sleep):
+    write_many = AsyncMock(side_effect=[OSError("down"), None])
+    buffer = write_buffer(write_many, TIMESCALEDB_BUFFER_POLICY="drop")
+
+    await buffer.put([1])
+    await buffer.flush()
+
+    assert write_many.await_count == 2
+    assert buffer.failed == 0
+
+    # Rows are discarded once the retries are exhausted
+    write_many.side_effect = OSError("down")
+    await buffer.put([2])
+    with pytest.raises(RuntimeError):
+        await buffer.flush()
+
+    assert write_many.await_count == 2 + 1 + buffer.retries
+    assert buffer.failed == 1
+
+    # Closing still drains what is left
+    write_many.side_effect = None
+    await buffer.put([3])
+    await buffer.close()
+    write_many.assert_awaited_with([3])
+
+
+@pytest.mark.asyncio
+@patch("quantari.write_buffer.asyncio.sleep", new_callable=AsyncMock)
+async def test_block_keeps_failed_writes(mock_sleep):
+    buffer = write_buffer(AsyncMock(), TIMESCALEDB_BATCH_SIZE=2)
+    buffer.write_many.side_effect = [OSError("down")] * (buffer.retries + 2) + [
+        None
+    ] * 2
+
+    await buffer.put([1, 2, 3])
+    await buffer.flush()
+
+    # The failed batch is retried before the rest, nothing is lost
+    written = [call.args[0] for call in buffer.write_many.await_args_list]
+    assert written[-2:] == [[1, 2], [3]]
+    assert buffer.failed == 0
+    assert not buffer.rows
+
+
+@pytest.mark.asyncio
+@patch("quantari.write_buffer.asyncio.sleep", new_callable=AsyncMock)
+async def test_block_discards_failed_writes_on_close(mock_sleep):
+    write_many = AsyncMock(side_effect=OSError("down"))
+    buffer = write_buffer(write_many)
+
+    await buffer.put([1])
+    await buffer.close()
+
+    assert write_many.await_count == 1 + buffer.retries
+    assert buffer.failed == 1